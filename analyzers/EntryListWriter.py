@@ -0,0 +1,67 @@
+from heppy.framework.analyzer import Analyzer
+
+from ROOT import TFile, TEntryList, TObject
+
+class EntryListWriter(Analyzer):
+    '''Records the input entries of the events reaching this analyzer
+    in a ROOT TEntryList.
+
+    Put it after the filters of your sequence to skim the input::
+
+        from heppy.analyzers.EntryListWriter import EntryListWriter
+        skim = cfg.Analyzer(
+            EntryListWriter
+        )
+
+    The TEntryList, called entry_list, is written to entry_list.root
+    in the directory of the analyzer. The entries are stored
+    for each input file, so that the entry lists of several chunks
+    can be merged with heppy_hadd.py.
+
+    In a later run, only the selected entries are processed if the
+    entry_list attribute of the component is set to this file::
+
+        comp.entry_list = 'Outdir/comp/heppy.analyzers.EntryListWriter.EntryListWriter_1/entry_list.root'
+
+    Only works with heppy.framework.chain.Chain events.
+    '''
+
+    consumes = []
+    produces = []
+
+    def beginLoop(self, setup):
+        super(EntryListWriter, self).beginLoop(setup)
+        self.rootfile = TFile('/'.join([self.dirName,
+                                        'entry_list.root']),
+                              'update' if self.resumed else 'recreate')
+        self.entry_list = None
+        if self.resumed:
+            self.entry_list = self.rootfile.Get('entry_list')
+        if not self.entry_list:
+            self.entry_list = TEntryList('entry_list', 'selected entries')
+
+    def process(self, event):
+        chain = event.input
+        self.entry_list.Enter(chain.GetReadEntry(), chain)
+
+    def checkpoint(self, setup):
+        state = super(EntryListWriter, self).checkpoint(setup)
+        self.rootfile.cd()
+        self.entry_list.Write('', TObject.kOverwrite)
+        self.rootfile.SaveSelf()
+        state['entries'] = self.entry_list.GetN()
+        return state
+
+    def restore(self, setup, state):
+        super(EntryListWriter, self).restore(setup, state)
+        if self.entry_list.GetN() != state['entries']:
+            msg = 'entry list has {nfile} entries in file, instead of {nentries}' \
+                  ' at the last checkpoint'
+            raise RuntimeError(msg.format(nfile=self.entry_list.GetN(),
+                                          nentries=state['entries']))
+
+    def write(self, setup):
+        super(EntryListWriter, self).write(setup)
+        self.rootfile.cd()
+        self.entry_list.Write('', TObject.kOverwrite)
+        self.rootfile.Close()
@@ -31,6 +31,10 @@ class EventFilter  (Analyzer):
       - if True: events are rejected if there are >= min_number objects in input_objects.
     '''
 
+    consumes = ['input_objects']
+    produces = []
+    is_filter = True
+
     def process(self, event):
         '''event should contain:
         
@@ -39,9 +43,23 @@ class EventFilter  (Analyzer):
              with the name specified in self.cfg_ana
         '''
         input_collection = getattr(event, self.cfg_ana.input_objects)
-        if self.cfg_ana.veto:
-            return not len(input_collection) >= self.cfg_ana.min_number
-        else:
-            return len(input_collection) >= self.cfg_ana.min_number
-         
+        return self.accept(input_collection,
+                           self.cfg_ana.min_number, self.cfg_ana.veto)
 
+    def process_batch(self, events):
+        '''Same as process, for a list of events.
+        Returns the list of filter decisions.'''
+        input_name = self.cfg_ana.input_objects
+        min_number = self.cfg_ana.min_number
+        veto = self.cfg_ana.veto
+        return [self.accept(getattr(event, input_name), min_number, veto)
+                for event in events]
+
+    @staticmethod
+    def accept(input_collection, min_number, veto):
+        '''Returns the filter decision for an event
+        with this input collection.'''
+        if veto:
+            return not len(input_collection) >= min_number
+        else:
+            return len(input_collection) >= min_number
@@ -29,7 +29,10 @@ class GaussianSmearer(Analyzer):
     accept: function object returning True if a particle is accepted and False otherwise
     mu_sigma: mean and width of the gaussian model (response and resolution)
     '''
-    
+
+    consumes = ['input_objects']
+    produces = ['output']
+
     def process(self, event):
         '''event must contain:
         
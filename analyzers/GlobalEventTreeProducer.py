@@ -16,14 +16,18 @@ class GlobalEventTreeProducer(Analyzer):
     other global event quantities can be added as needed
     '''
 
+    consumes = ['sum_all', 'sum_all_gen']
+    produces = []
+
     def beginLoop(self, setup):
         '''create the output root file and book the tree.
         '''
         super(GlobalEventTreeProducer, self).beginLoop(setup)
         self.rootfile = TFile('/'.join([self.dirName,
                                         'tree.root']),
-                              'recreate')
-        self.tree = Tree( 'events', '')
+                              'update' if self.resumed else 'recreate')
+        self.tree = Tree( 'events', '',
+                          tree=self.rootfile.Get('events') if self.resumed else None)
         bookJet(self.tree, 'sum_all')
         bookJet(self.tree, 'sum_all_gen')
       
@@ -42,6 +46,15 @@ class GlobalEventTreeProducer(Analyzer):
         fillJet(self.tree, 'sum_all_gen', sum_all_gen)
         self.tree.tree.Fill()
         
+    def checkpoint(self, setup):
+        state = super(GlobalEventTreeProducer, self).checkpoint(setup)
+        state['entries'] = self.tree.checkpoint()
+        return state
+
+    def restore(self, setup, state):
+        super(GlobalEventTreeProducer, self).restore(setup, state)
+        self.tree.restore(state['entries'])
+
     def write(self, setup):
         '''write root file.
         '''
@@ -51,7 +51,10 @@ class IsolationAnalyzer(Analyzer):
     @param iso_area: area where to look for isolation particles around the candidate
 
     '''
-    
+
+    consumes = ['particles', 'candidates']
+    produces = ['candidates']
+
     def beginLoop(self, setup):
         super(IsolationAnalyzer, self).beginLoop(setup)
         # now using same isolation definition for all pdgids
@@ -74,17 +77,20 @@ class IsolationAnalyzer(Analyzer):
         candidates = getattr(event, self.cfg_ana.candidates)
         for candidate in candidates:
             isosum = IsolationInfo('all', candidate)
-            self.logger.info(str(candidate))
+            if self.logInfo:
+                self.logger.info('%s', candidate)
             for pdgid in pdgids:
                 sel_ptcs = [ptc for ptc in particles if abs(self.pdgid(ptc))==pdgid]
                 iso = self.iso_computers[pdgid].compute(candidate, sel_ptcs)
                 isosum += iso 
                 setattr(candidate, 'iso_{pdgid}'.format(pdgid=pdgid), iso)
-                self.logger.info(str(iso))
-                if iso.num:
-                    self.logger.info(pprint.pformat(iso.particles))
+                if self.logInfo:
+                    self.logger.info('%s', iso)
+                    if iso.num:
+                        self.logger.info(pprint.pformat(iso.particles))
             candidate.iso = isosum
-            self.logger.info(str(isosum))
+            if self.logInfo:
+                self.logger.info('%s', isosum)
         
     def pdgid(self, ptc): 
         '''returns summary pdg id:
@@ -36,14 +36,18 @@ class JetTreeProducer(Analyzer):
     @jets: input jet collection
     '''
 
+    consumes = ['jets']
+    produces = []
+
     def beginLoop(self, setup):
         '''create the output root file and book the tree.
         '''
         self.rootfile = TFile('/'.join([self.dirName,
                                         'jet_tree.root']),
-                              'recreate')
+                              'update' if self.resumed else 'recreate')
         self.tree = Tree( self.cfg_ana.tree_name,
-                          self.cfg_ana.tree_title )
+                          self.cfg_ana.tree_title,
+                          tree=self.rootfile.Get(self.cfg_ana.tree_name) if self.resumed else None)
         bookJet(self.tree, 'jet1')
         bookJet(self.tree, 'jet1_match')
         bookJet(self.tree, 'jet2')
@@ -86,6 +90,15 @@ class JetTreeProducer(Analyzer):
         self.tree.tree.Fill()
         
         
+    def checkpoint(self, setup):
+        state = super(JetTreeProducer, self).checkpoint(setup)
+        state['entries'] = self.tree.checkpoint()
+        return state
+
+    def restore(self, setup, state):
+        super(JetTreeProducer, self).restore(setup, state)
+        self.tree.restore(state['entries'])
+
     def write(self, setup):
         '''write root file.
         '''
@@ -28,7 +28,10 @@ class LeptonFsrDresser(Analyzer):
 
     * area : size of the cone where particles can be counted for dressing
     '''
-    
+
+    consumes = ['particles', 'leptons']
+    produces = ['output']
+
     def process(self, event):
         particles = getattr(event, self.cfg_ana.particles)
         leptons = getattr(event, self.cfg_ana.leptons)
@@ -5,7 +5,10 @@ import pprint
 import itertools
 
 class M3Builder(Analyzer):
-    
+
+    consumes = ['jets']
+    produces = ['instance_label']
+
     def process(self, event):
         jets = getattr(event, self.cfg_ana.jets)
 
@@ -4,7 +4,10 @@ from heppy.particles.tlv.met import MET
 from ROOT import TLorentzVector 
 
 class METBuilder(Analyzer):
-    
+
+    consumes = ['particles']
+    produces = ['instance_label']
+
     def process(self, event):
         particles = getattr(event, self.cfg_ana.particles)
         missingp4 = TLorentzVector()
@@ -2,7 +2,10 @@ from heppy.framework.analyzer import Analyzer
 import math
 
 class MTW(Analyzer):
-    
+
+    consumes = ['electron', 'muon', 'met']
+    produces = ['instance_label']
+
     def process(self, event):
         ele = getattr(event, self.cfg_ana.electron)
         mu = getattr(event, self.cfg_ana.muon)
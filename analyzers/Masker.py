@@ -23,7 +23,10 @@ class Masker(Analyzer):
     @param mask: masking collection
     @param output: output collection (created)
     '''
-    
+
+    consumes = ['input', 'mask']
+    produces = ['output']
+
     def process(self, event):
         '''process event
         
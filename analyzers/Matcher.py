@@ -76,6 +76,16 @@ class Matcher(Analyzer):
                is to be found. 
     '''
     
+    consumes = ['particles', 'match_particles']
+    produces = ['particles']
+
+    @classmethod
+    def consumed(cls, cfg_ana):
+        match_particles = cfg_ana.match_particles
+        if isinstance(match_particles, basestring):
+            match_particles = [(match_particles, None)]
+        return [cfg_ana.particles] + [name for name, pdgid in match_particles]
+
     def beginLoop(self, setup):
         super(Matcher, self).beginLoop(setup)
         self.match_collections = []
@@ -29,7 +29,10 @@ class Merger(Analyzer):
       E or pT depending on the type of collider defined in the configuration
       file, see L{heppy.configuration.Collider}.
     '''
-    
+
+    consumes = ['inputs']
+    produces = ['output']
+
     def process(self, event):
         '''Process event
         
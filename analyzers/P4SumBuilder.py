@@ -29,7 +29,10 @@ class P4SumBuilder(Analyzer):
                L{jet constituents<particles.jet.JetConstituents>}.
     
     '''
-    
+
+    consumes = ['particles']
+    produces = ['output']
+
     def process(self, event):
         '''Process event.
         
@@ -45,4 +45,5 @@ class PDebugger(Analyzer):
             pdebug.pdebugger.setLevel(logging.INFO)
 
     def process(self, event):
-        pdebug.pdebugger.info(str('Event: {}'.format(event.iEv)))
+        if pdebug.pdebugger.enabled:
+            pdebug.pdebugger.info('Event: %s', event.iEv)
@@ -2,6 +2,7 @@ from heppy.framework.analyzer import Analyzer
 from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder
 from heppy.papas.data.pfevent import PFEvent
 from heppy.papas.pfalgo.distance  import Distance
+from heppy.papas.pfalgo.neighbours import all_pairs, grid_neighbours
 
 
 class PapasPFBlockBuilder(Analyzer):
@@ -25,8 +26,15 @@ class PapasPFBlockBuilder(Analyzer):
         hcals: Name of dict in Event where hcals are stored
         history: Name of history_nodes, can be set to None.
         output_blocks: Name to be used for the blocks dict
+        neighbours: optional, 'grid' (default) to only measure the distance between
+                    neighbouring elements, or 'all' to measure all pairs of elements.
+                    The blocks are the same.
         
     '''
+
+    consumes = ['tracks', 'ecals', 'hcals', 'history']
+    produces = ['output_blocks', 'history']
+
     def __init__(self, *args, **kwargs):
         super(PapasPFBlockBuilder, self).__init__(*args, **kwargs)
         
@@ -35,6 +43,8 @@ class PapasPFBlockBuilder(Analyzer):
         self.hcalsname = self.cfg_ana.hcals;
         self.blocksname = self.cfg_ana.output_blocks;
         self.historyname = self.cfg_ana.history;
+        neighbours = getattr(self.cfg_ana, 'neighbours', 'grid')
+        self.neighbours = all_pairs if neighbours == 'all' else grid_neighbours
         
                 
     def process(self, event):
@@ -46,7 +56,7 @@ class PapasPFBlockBuilder(Analyzer):
         history_nodes =  None
         if hasattr(event, self.historyname) :
             history_nodes = getattr(event,  self.historyname)
-        blockbuilder = PFBlockBuilder(pfevent, distance, history_nodes)
+        blockbuilder = PFBlockBuilder(pfevent, distance, history_nodes, self.neighbours)
         #print blockbuilder
             
         setattr(event, self.blocksname, blockbuilder.blocks)
@@ -25,6 +25,15 @@ class PapasPFReconstructor(Analyzer):
         output_particles_list =  Name for recosntructed particles (as list)
     '''
     
+    consumes = ['input_blocks', 'history']
+    produces = ['output_particles_dict', 'output_particles_list', 'history']
+
+    @classmethod
+    def produced(cls, cfg_ana):
+        return ['_'.join([cfg_ana.instance_label, cfg_ana.output_particles_dict]),
+                '_'.join([cfg_ana.instance_label, cfg_ana.output_particles_list]),
+                cfg_ana.history]
+
     def __init__(self, *args, **kwargs):
         super(PapasPFReconstructor, self).__init__(*args, **kwargs)  
         self.detector = self.cfg_ana.detector
@@ -3,6 +3,7 @@ from heppy.papas.simulator import Simulator
 from heppy.papas.papas_exceptions import PropagationError, SimulationError
 from heppy.papas.pfalgo.distance  import Distance
 from heppy.papas.mergedclusterbuilder import MergedClusterBuilder
+from heppy.papas.pfalgo.neighbours import grid_neighbours
 from heppy.papas.data.pfevent import PFEvent
 from heppy.papas.graphtools.DAG import Node
 
@@ -34,7 +35,8 @@ class PapasSim(Analyzer):
         output_history = 'history_nodes',
         display_filter_func = lambda ptc: ptc.e()>1.,
         display = False,
-        verbose = True
+        verbose = True,
+        batch_propagation = False # optional
     )
     detector:      Detector model to be used.
     gen_particles: Name of the input gen particle collection
@@ -58,6 +60,9 @@ class PapasSim(Analyzer):
     history: Optional name for the history nodes, set to None if not needed
     display      : Enable the event display
     verbose      : Enable the detailed printout.
+    batch_propagation: Optional, False by default. If True, the particles of each event
+                   are propagated to all detector cylinders at once, with numpy,
+                   see papas.propagator.BatchPropagator
 
         event must contain
           todo once history is implemented
@@ -70,10 +75,22 @@ class PapasSim(Analyzer):
         
     '''
 
+    consumes = ['gen_particles']
+    produces = ['sim_particles', 'merged_ecals', 'merged_hcals', 'output_history']
+    is_filter = True
+
+    @classmethod
+    def produced(cls, cfg_ana):
+        return ['_'.join([cfg_ana.instance_label, cfg_ana.sim_particles]),
+                'tracks', 'ecal_clusters', 'hcal_clusters',
+                cfg_ana.merged_ecals, cfg_ana.merged_hcals,
+                cfg_ana.output_history, 'simulator']
+
     def __init__(self, *args, **kwargs):
         super(PapasSim, self).__init__(*args, **kwargs)
         self.detector = self.cfg_ana.detector
-        self.simulator = Simulator(self.detector, self.mainLogger)
+        self.simulator = Simulator(self.detector, self.mainLogger,
+                                   getattr(self.cfg_ana, 'batch_propagation', False))
         self.simname = '_'.join([self.instance_label, self.cfg_ana.sim_particles])
         self.tracksname = self.cfg_ana.tracks
         self.mergedecalsname = self.cfg_ana.merged_ecals
@@ -123,9 +140,11 @@ class PapasSim(Analyzer):
         #Now merge the simulated clusters and tracks as a separate pre-stage (prior to new reconstruction)
         # and set the event to point to the merged cluster
         pfevent = PFEvent(event, 'tracks', 'ecal_clusters', 'hcal_clusters')
-        merged_ecals = MergedClusterBuilder(pfevent.ecal_clusters, ruler, history)
+        merged_ecals = MergedClusterBuilder(pfevent.ecal_clusters, ruler, history,
+                                            grid_neighbours)
         setattr(event, self.mergedecalsname, merged_ecals.merged)
-        merged_hcals = MergedClusterBuilder(pfevent.hcal_clusters, ruler, merged_ecals.history_nodes)
+        merged_hcals = MergedClusterBuilder(pfevent.hcal_clusters, ruler, merged_ecals.history_nodes,
+                                            grid_neighbours)
         setattr(event, self.mergedhcalsname, merged_hcals.merged)
         setattr(event, self.historyname, merged_hcals.history_nodes)
 
@@ -27,6 +27,10 @@ class ParametrizedBTagger(Analyzer):
       L{matched<heppy.analyzers.Matcher.Matcher>} to b quarks before this module.
     @param roc: L{ROC curve<heppy.analyzers.roc.ROC>}
     '''
+
+    consumes = ['input_jets']
+    produces = ['input_jets']
+
     def process(self, event):
         '''Process the event.
         
@@ -6,12 +6,16 @@ from ROOT import TFile
 
 class ParticleTreeProducer(Analyzer):
 
+    consumes = ['particles']
+    produces = []
+
     def beginLoop(self, setup):
         super(ParticleTreeProducer, self).beginLoop(setup)
         self.rootfile = TFile('/'.join([self.dirName,
                                         'tree.root']),
-                              'recreate')
-        self.tree = Tree('particles', '')
+                              'update' if self.resumed else 'recreate')
+        self.tree = Tree('particles', '',
+                         tree=self.rootfile.Get('particles') if self.resumed else None)
         bookParticle(self.tree, 'ptc')
         bookCluster(self.tree, 'ptc_ecal')
         bookParticle(self.tree, 'ptc_match')
@@ -54,6 +58,15 @@ class ParticleTreeProducer(Analyzer):
             self.tree.tree.Fill()
         
         
+    def checkpoint(self, setup):
+        state = super(ParticleTreeProducer, self).checkpoint(setup)
+        state['entries'] = self.tree.checkpoint()
+        return state
+
+    def restore(self, setup, state):
+        super(ParticleTreeProducer, self).restore(setup, state)
+        self.tree.restore(state['entries'])
+
     def write(self, setup):
         self.rootfile.Write()
         self.rootfile.Close()
@@ -0,0 +1,324 @@
+'''Cache of event products, to skip expensive analyzers when re-processing.'''
+
+import os
+import json
+import zlib
+import struct
+import pickle
+import hashlib
+import types
+
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.parallel import range_base_name
+
+MAGIC = 'HEPPYPC1'
+# record header: event index, size of the compressed products
+RECORD = struct.Struct('<qI')
+# size of the json file header
+HEADER_SIZE = struct.Struct('<I')
+
+# parameters that do not change the products of an analyzer
+COSMETIC_PARAMS = set(['name', 'verbose', 'log_level'])
+
+def stable_repr(value, _seen=()):
+    '''Returns a representation of value that does not depend on the
+    memory addresses of the objects, unlike the default repr.
+
+    Classes are represented by their full name. Functions are also
+    represented by their code, default arguments and closure, so that
+    changing the body of a lambda changes the representation.
+    Other objects are represented by their class and attributes.'''
+    if id(value) in _seen:
+        # reference cycle
+        return '<...>'
+    seen = _seen + (id(value),)
+    if isinstance(value, (list, tuple)):
+        return '[{}]'.format(', '.join(stable_repr(val, seen) for val in value))
+    elif isinstance(value, (set, frozenset)):
+        return '{{{}}}'.format(', '.join(
+            sorted(stable_repr(val, seen) for val in value)))
+    elif isinstance(value, dict):
+        return '{{{}}}'.format(', '.join(
+            '{}: {}'.format(stable_repr(key, seen), stable_repr(val, seen))
+            for key, val in sorted(value.iteritems())))
+    elif isinstance(value, (basestring, int, long, float, bool, types.NoneType)):
+        return repr(value)
+    elif isinstance(value, (type, types.ClassType, types.BuiltinFunctionType)):
+        return '.'.join([value.__module__ or '', value.__name__])
+    elif isinstance(value, types.FunctionType):
+        closure = [cell.cell_contents for cell in value.__closure__ or []]
+        return '<function {}.{} {} {} {}>'.format(
+            value.__module__, value.__name__,
+            stable_repr(value.__code__, seen),
+            stable_repr(value.__defaults__, seen),
+            stable_repr(closure, seen))
+    elif isinstance(value, types.MethodType):
+        return '<method {} of {}>'.format(stable_repr(value.im_func, seen),
+                                          stable_repr(value.im_self, seen))
+    elif isinstance(value, types.CodeType):
+        return '<code {} {} {}>'.format(repr(value.co_code),
+                                        stable_repr(value.co_consts, seen),
+                                        stable_repr(value.co_names, seen))
+    else:
+        cls = value.__class__
+        attrs = getattr(value, '__dict__', None)
+        if not isinstance(attrs, dict):
+            return '<{}.{}>'.format(cls.__module__, cls.__name__)
+        return '<{}.{} {}>'.format(cls.__module__, cls.__name__,
+                                   stable_repr(attrs, seen))
+
+
+def config_hash(cfg_anas):
+    '''Returns a hash of the configuration of the analyzers cfg_anas.'''
+    digest = hashlib.sha1()
+    for cfg_ana in cfg_anas:
+        params = dict( (key, value) for key, value in vars(cfg_ana).iteritems()
+                       if key not in COSMETIC_PARAMS )
+        digest.update(stable_repr(params))
+    return digest.hexdigest()
+
+
+class CacheWriter(object):
+    '''Writes the products of each event to a cache file.
+
+    The file starts with a json header,
+    followed by a record for each event:
+    the event index, the size of the products,
+    and the compressed pickle of the dictionary of products.
+    '''
+
+    def __init__(self, fname, header, compression=1, offset=None):
+        '''If offset is provided, the existing file is truncated at this
+        offset and new records are appended, e.g. when resuming a loop.'''
+        self.compression = compression
+        if offset is None:
+            self.file = open(fname, 'wb')
+            header = json.dumps(header, sort_keys=True)
+            self.file.write(MAGIC)
+            self.file.write(HEADER_SIZE.pack(len(header)))
+            self.file.write(header)
+        else:
+            self.file = open(fname, 'r+b')
+            self.file.truncate(offset)
+            self.file.seek(offset)
+
+    def write(self, iEv, products):
+        data = zlib.compress(pickle.dumps(products, pickle.HIGHEST_PROTOCOL),
+                             self.compression)
+        self.file.write(RECORD.pack(iEv, len(data)))
+        self.file.write(data)
+
+    def flush(self):
+        '''Flushes the file to disk, and returns the current offset.'''
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def read_header(infile):
+    '''Reads the header of the cache file infile,
+    and returns it with the offset of the first record.'''
+    if infile.read(len(MAGIC)) != MAGIC:
+        raise ValueError('{} is not a product cache file'.format(infile.name))
+    size, = HEADER_SIZE.unpack(infile.read(HEADER_SIZE.size))
+    header = json.loads(infile.read(size))
+    return header, len(MAGIC) + HEADER_SIZE.size + size
+
+
+class CacheReader(object):
+    '''Reads the products of the events from a cache file.'''
+
+    def __init__(self, fname):
+        self.file = open(fname, 'rb')
+        self.header, offset = read_header(self.file)
+        # index of the records: iEv -> (offset, size)
+        self.index = dict()
+        while True:
+            self.file.seek(offset)
+            record = self.file.read(RECORD.size)
+            if len(record) < RECORD.size:
+                break
+            iEv, size = RECORD.unpack(record)
+            offset += RECORD.size
+            self.index[iEv] = (offset, size)
+            offset += size
+
+    def __contains__(self, iEv):
+        return iEv in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, iEv):
+        '''Returns the dictionary of products for event iEv.'''
+        offset, size = self.index[iEv]
+        self.file.seek(offset)
+        return pickle.loads(zlib.decompress(self.file.read(size)))
+
+    def close(self):
+        self.file.close()
+
+
+def merge_caches(ofname, ifnames):
+    '''Concatenates the records of the cache files ifnames,
+    which must have the same header, to ofname.'''
+    headers = []
+    for ifname in ifnames:
+        with open(ifname, 'rb') as infile:
+            headers.append(read_header(infile))
+    for ifname, (header, offset) in zip(ifnames, headers):
+        if header != headers[0][0]:
+            raise ValueError('cannot merge product caches '
+                             'with different headers: {} {}'.format(
+                                 ifnames[0], ifname))
+    with open(ofname, 'wb') as out:
+        for index, (ifname, (header, offset)) in enumerate(zip(ifnames, headers)):
+            with open(ifname, 'rb') as infile:
+                if index > 0:
+                    infile.seek(offset)
+                for block in iter(lambda: infile.read(1 << 20), ''):
+                    out.write(block)
+
+
+class ProductCache(Analyzer):
+    '''Records event products to a cache file,
+    or replays them from the cache, skipping the analyzers before it.
+
+    Example: record the output of the PAPAS simulation::
+
+        from heppy.analyzers.ProductCache import ProductCache
+        sim_cache = cfg.Analyzer(
+            ProductCache,
+            mode = 'record',
+            products = ['tracks', 'ecal_clusters', 'hcal_clusters',
+                        'merged_ecals', 'merged_hcals', 'history_nodes',
+                        'papas_sim_particles']
+        )
+        sequence = cfg.Sequence(
+            source,
+            papas_sim,
+            sim_cache,
+            papas_pfblocks,
+            ...
+        )
+
+    The cache is written to products.cache in the analyzer directory.
+    To tune the reconstruction without redoing the simulation,
+    run the same configuration again with::
+
+        sim_cache.mode = 'replay'
+        sim_cache.cache_dir = 'Outdir_sim'  # output directory of the record run
+
+    In replay mode, the Looper does not run the analyzers before
+    the ProductCache. For each event, the products are restored from the
+    cache file of the same component, and the events that did not reach
+    the cache in the record run are rejected.
+    The configuration of the analyzers before the cache is hashed, and an
+    error is raised if it changed since the record run.
+    The components must be split in the same way in both runs,
+    except for the splitting in entry ranges (heppy_loop -w).
+
+    @param mode: 'record' or 'replay'
+    @param products: names of the event products to cache
+    @param cache_dir: in replay mode, output directory of the record run
+    @param compression: zlib compression level, 1 by default
+    '''
+
+    consumes = ['products']
+    produces = ['products']
+    # in replay mode, the events that are not in the cache are rejected
+    is_filter = True
+
+    fname = 'products.cache'
+
+    @classmethod
+    def replaces_upstream(cls, cfg_ana):
+        return cfg_ana.mode == 'replay'
+
+    @classmethod
+    def consumed(cls, cfg_ana):
+        if cls.replaces_upstream(cfg_ana):
+            return []
+        return list(cfg_ana.products)
+
+    @classmethod
+    def produced(cls, cfg_ana):
+        if cls.replaces_upstream(cfg_ana):
+            return list(cfg_ana.products)
+        return []
+
+    def __init__(self, *args, **kwargs):
+        super(ProductCache, self).__init__(*args, **kwargs)
+        if self.cfg_ana.mode not in ['record', 'replay']:
+            raise ValueError('mode must be record or replay, not {}'.format(
+                self.cfg_ana.mode))
+        self.products = list(self.cfg_ana.products)
+        self.replay = self.replaces_upstream(self.cfg_ana)
+        self.cache = None
+
+    def header(self, setup):
+        '''Returns the header identifying the cache.'''
+        sequence = setup.config.sequence
+        upstream = sequence[:[id(cfg) for cfg in sequence].index(id(self.cfg_ana))]
+        return dict(key=config_hash(upstream),
+                    component=range_base_name(self.cfg_comp.name),
+                    products=self.products)
+
+    def beginLoop(self, setup):
+        super(ProductCache, self).beginLoop(setup)
+        header = self.header(setup)
+        if self.replay:
+            fname = '/'.join([self.cfg_ana.cache_dir, header['component'],
+                              self.name, self.fname])
+            self.cache = CacheReader(fname)
+            recorded = self.cache.header
+            if recorded['key'] != header['key']:
+                raise ValueError(
+                    'stale product cache {}: the configuration of the analyzers '
+                    'before {} changed since it was recorded'.format(fname, self.name))
+            missing = set(self.products) - set(recorded['products'])
+            if missing:
+                raise ValueError('products {} not recorded in {}'.format(
+                    sorted(missing), fname))
+            self.counters.addCounter('replay')
+            self.counters['replay'].register('all events')
+            self.counters['replay'].register('cached events')
+        elif not self.resumed:
+            fname = '/'.join([self.dirName, self.fname])
+            self.cache = CacheWriter(fname, header,
+                                     getattr(self.cfg_ana, 'compression', 1))
+
+    def process(self, event):
+        if self.replay:
+            self.counters['replay'].inc('all events')
+            if event.iEv not in self.cache:
+                return False
+            self.counters['replay'].inc('cached events')
+            products = self.cache.read(event.iEv)
+            for name in self.products:
+                setattr(event, name, products[name])
+        else:
+            products = dict( (name, getattr(event, name))
+                             for name in self.products )
+            self.cache.write(event.iEv, products)
+
+    def checkpoint(self, setup):
+        state = super(ProductCache, self).checkpoint(setup)
+        if not self.replay:
+            state['offset'] = self.cache.flush()
+        return state
+
+    def restore(self, setup, state):
+        super(ProductCache, self).restore(setup, state)
+        if not self.replay:
+            fname = '/'.join([self.dirName, self.fname])
+            self.cache = CacheWriter(fname, None,
+                                     getattr(self.cfg_ana, 'compression', 1),
+                                     offset=state['offset'])
+
+    def write(self, setup):
+        super(ProductCache, self).write(setup)
+        self.cache.close()
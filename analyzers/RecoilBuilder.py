@@ -26,7 +26,10 @@ class RecoilBuilder(Analyzer):
     in the event, the missing p4 is computed.
 
     '''
-    
+
+    consumes = ['to_remove']
+    produces = ['output']
+
     def process(self, event):
         sqrts = self.cfg_ana.sqrts
         to_remove = getattr(event, self.cfg_ana.to_remove) 
@@ -33,6 +33,13 @@ class ResonanceBuilder(Analyzer):
     See Resonance2 and heppy.particles.tlv.Resonance for more information 
     '''
     
+    consumes = ['leg_collection']
+    produces = ['output']
+
+    @classmethod
+    def produced(cls, cfg_ana):
+        return [cfg_ana.output, '_'.join([cfg_ana.output, 'legs'])]
+
     def process(self, event):
         legs = getattr(event, self.cfg_ana.leg_collection)
         resonances = []
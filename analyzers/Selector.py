@@ -36,6 +36,9 @@ class Selector(Analyzer):
     
     '''
 
+    consumes = ['input_objects']
+    produces = ['output']
+
     def process(self, event):
         '''event must contain
         
@@ -44,11 +47,25 @@ class Selector(Analyzer):
            self.cfg_ana.filter_func.
         '''
         input_collection = getattr(event, self.cfg_ana.input_objects)
-        output_collection = None
+        output_collection = self.select(input_collection,
+                                        self.cfg_ana.filter_func)
+        setattr(event, self.cfg_ana.output, output_collection)
+
+    def process_batch(self, events):
+        '''Same as process, for a list of events.'''
+        input_name = self.cfg_ana.input_objects
+        output_name = self.cfg_ana.output
+        filter_func = self.cfg_ana.filter_func
+        for event in events:
+            output_collection = self.select(getattr(event, input_name),
+                                            filter_func)
+            setattr(event, output_name, output_collection)
+
+    @staticmethod
+    def select(input_collection, filter_func):
+        '''Returns the objects of input_collection passing filter_func.'''
         if isinstance(input_collection, collections.Mapping):
-            output_collection = dict( [(key, val) for key, val in input_collection.iteritems()
-                                       if self.cfg_ana.filter_func(val)] ) 
+            return dict( [(key, val) for key, val in input_collection.iteritems()
+                          if filter_func(val)] )
         else:
-            output_collection = [obj for obj in input_collection \
-                                 if self.cfg_ana.filter_func(obj)]
-        setattr(event, self.cfg_ana.output, output_collection)
+            return [obj for obj in input_collection if filter_func(obj)]
@@ -18,6 +18,9 @@ class Subtractor(Analyzer):
         )
         '''
 
+    consumes = ['inputA', 'inputB']
+    produces = ['output']
+
     def process(self, event):
         inputA = getattr(event, self.cfg_ana.inputA)
         inputB = getattr(event, self.cfg_ana.inputB)
@@ -1,5 +1,5 @@
 from heppy.framework.analyzer import Analyzer
-from ROOT import TH1F
+from heppy.utils.lazyimport import ROOT
 
 class Histogrammer(Analyzer):
 
@@ -10,7 +10,7 @@ class Histogrammer(Analyzer):
                          ]) 
         tfileservice = setup.services[servname]
         tfileservice.file.cd()
-        self.hist = TH1F("hist", "an histogram", 200, 0, 200)
+        self.hist = ROOT.TH1F("hist", "an histogram", 200, 0, 200)
         
     def process(self, event):
         self.hist.Fill(event.iEv)
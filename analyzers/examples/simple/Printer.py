@@ -6,9 +6,6 @@ class Printer(Analyzer):
         super(Printer, self).beginLoop(setup)
         
     def process(self, event):
-        self.logger.info(
-            "event {iEv}, var1 {var1}".format(
-                iEv = event.iEv, var1 = event.input.var1
-            ))
+        self.logger.info("event %d, var1 %s", event.iEv, event.input.var1)
                              
         
@@ -1,16 +1,17 @@
 from heppy.framework.analyzer import Analyzer
 from heppy.statistics.tree import Tree
-from ROOT import TFile
+from heppy.utils.lazyimport import ROOT
 
 class SimpleTreeProducer(Analyzer):
 
     def beginLoop(self, setup):
         super(SimpleTreeProducer, self).beginLoop(setup)
-        self.rootfile = TFile('/'.join([self.dirName,
+        self.rootfile = ROOT.TFile('/'.join([self.dirName,
                                         'simple_tree.root']),
-                              'recreate')
+                              'update' if self.resumed else 'recreate')
         self.tree = Tree( self.cfg_ana.tree_name,
-                          self.cfg_ana.tree_title )
+                          self.cfg_ana.tree_title,
+                          tree=self.rootfile.Get(self.cfg_ana.tree_name) if self.resumed else None)
         self.tree.var('test_variable')
         self.tree.var('test_variable_random')
 
@@ -19,6 +20,15 @@ class SimpleTreeProducer(Analyzer):
         self.tree.fill('test_variable_random', event.var_random)
         self.tree.tree.Fill()
 
+    def checkpoint(self, setup):
+        state = super(SimpleTreeProducer, self).checkpoint(setup)
+        state['entries'] = self.tree.checkpoint()
+        return state
+
+    def restore(self, setup, state):
+        super(SimpleTreeProducer, self).restore(setup, state)
+        self.tree.restore(state['entries'])
+
     def write(self, setup):
         self.rootfile.Write()
         self.rootfile.Close()
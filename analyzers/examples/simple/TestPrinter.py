@@ -3,6 +3,8 @@ import pdb
 
 class TestPrinter(Analyzer):
 
+    input_branches = ['branch']
+
     def beginLoop(self, setup):
         super(TestPrinter, self).beginLoop(setup)
         self.branch = self.cfg_ana.branch
@@ -10,10 +12,8 @@ class TestPrinter(Analyzer):
 
     def process(self, event):
         #pdb.set_trace()
-        if(self.leaf != None):
+        if(self.leaf != None and self.logInfo):
             t = event.input.GetLeaf(self.branch, self.leaf)
             for i in range(t.GetLen()):
-                self.logger.info(
-                    "event {iEv}, {leafname} {var1}".format(
-                        iEv = event.iEv, var1 = t.GetValue(i), leafname=self.leaf
-                    ))
+                self.logger.info("event %d, %s %s",
+                                 event.iEv, self.leaf, t.GetValue(i))
@@ -71,6 +71,12 @@ class Reader(Analyzer):
     - event.jets: reconstructed jets  
     '''
     
+    # collections read from the input, see Analyzer.input_branches
+    input_branches = ['gen_particles', 'gen_vertices', 'gen_jets', 'jets',
+                      'bTags', 'electrons', 'electronITags',
+                      'muons', 'muonITags', 'photons', 'photonITags',
+                      'pfcharged', 'pfphotons', 'pfneutrals', 'met']
+
     def process(self, event):
         store = event.input
 
@@ -71,6 +71,12 @@ class TestReader(Analyzer):
     - event.jets: reconstructed jets  
     '''
     
+    # collections read from the input, see Analyzer.input_branches
+    input_branches = ['gen_particles', 'gen_vertices', 'gen_jets', 'jets',
+                      'bTags', 'electrons', 'electronITags',
+                      'muons', 'muonITags', 'photons', 'photonITags',
+                      'pfcharged', 'pfphotons', 'pfneutrals', 'met']
+
     def process(self, event):
 
         store = event.input
@@ -92,8 +98,9 @@ class TestReader(Analyzer):
             return pycoll
 
         g = get_collection(Particle, 'gen_particles')
-        for p in g:
-            self.logger.info("Found : {:}".format(p))
+        if self.logInfo:
+            for p in g:
+                self.logger.info("Found : %s", p)
         get_collection(Vertex, 'gen_vertices', False)
         get_collection(Jet, 'gen_jets')
         jetcoll = get_collection(Jet, 'jets')
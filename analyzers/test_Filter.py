@@ -3,6 +3,7 @@ import os
 import shutil
 import tempfile
 from Selector import Selector 
+from EventFilter import EventFilter
 from heppy.framework.event import Event
 import heppy.framework.config as cfg
 
@@ -48,5 +49,56 @@ class SelectorTestCase(unittest.TestCase):
         filter.process(event)
         self.assertDictEqual(event.filtered, {3:9})
         
+    def test_batch(self):
+        events = [Event(i) for i in range(3)]
+        for event in events:
+            event.the_list = range(event.iEv * 2)
+        cfg_ana = cfg.Analyzer(
+            Selector,
+            output = 'filtered',
+            input_objects = 'the_list',
+            filter_func = lambda x : x%2 == 0
+            )
+        cfg_comp = cfg.Component(
+            'test',
+            files = []
+            )
+        filter = Selector(cfg_ana, cfg_comp, self.outdir)
+        self.assertTrue(filter.batch_processing())
+        # all events are accepted
+        self.assertIsNone(filter.process_batch(events))
+        self.assertEqual([event.filtered for event in events],
+                         [[], [0], [0, 2]])
+
+
+class EventFilterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_batch(self):
+        events = [Event(i) for i in range(3)]
+        for event in events:
+            event.the_list = range(event.iEv)
+        cfg_comp = cfg.Component(
+            'test',
+            files = []
+            )
+        for veto in [False, True]:
+            cfg_ana = cfg.Analyzer(
+                EventFilter,
+                input_objects = 'the_list',
+                min_number = 1,
+                veto = veto
+                )
+            filter = EventFilter(cfg_ana, cfg_comp, self.outdir)
+            self.assertTrue(filter.batch_processing())
+            self.assertEqual(filter.process_batch(events),
+                             [filter.process(event) for event in events])
+        self.assertEqual(filter.process_batch(events), [True, False, False])
+
 if __name__ == '__main__':
     unittest.main()
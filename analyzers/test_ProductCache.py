@@ -0,0 +1,151 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from heppy.analyzers.ProductCache import ProductCache, CacheWriter, \
+     CacheReader, merge_caches, config_hash
+from heppy.framework.analyzer import Analyzer
+
+class FakeCfg(object):
+    def __init__(self, class_object, name, **params):
+        self.class_object = class_object
+        self.name = name
+        self.instance_label = name
+        self.verbose = False
+        for key, value in params.iteritems():
+            setattr(self, key, value)
+
+
+class FakeComponent(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeConfig(object):
+    def __init__(self, sequence):
+        self.sequence = sequence
+
+
+class FakeSetup(object):
+    def __init__(self, sequence):
+        self.config = FakeConfig(sequence)
+
+
+class FakeEvent(object):
+    def __init__(self, iEv):
+        self.iEv = iEv
+
+
+class Detector(object):
+    pass
+
+
+class ProductCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_config_hash(self):
+        sim1 = FakeCfg(Analyzer, 'sim', detector=Detector(), pt=1.)
+        sim2 = FakeCfg(Analyzer, 'sim', detector=Detector(), pt=1.)
+        self.assertEqual(config_hash([sim1]), config_hash([sim2]))
+        sim2.verbose = True
+        self.assertEqual(config_hash([sim1]), config_hash([sim2]))
+        sim2.pt = 2.
+        self.assertNotEqual(config_hash([sim1]), config_hash([sim2]))
+        # the parameters of the objects are hashed
+        sim2 = FakeCfg(Analyzer, 'sim', detector=Detector(), pt=1.)
+        sim2.detector.field = 3.8
+        self.assertNotEqual(config_hash([sim1]), config_hash([sim2]))
+
+    def test_config_hash_function(self):
+        sel1 = FakeCfg(Analyzer, 'sel', filter_func=lambda ptc: ptc.pt() > 10.)
+        sel2 = FakeCfg(Analyzer, 'sel', filter_func=lambda ptc: ptc.pt() > 10.)
+        self.assertEqual(config_hash([sel1]), config_hash([sel2]))
+        sel2.filter_func = lambda ptc: ptc.pt() > 20.
+        self.assertNotEqual(config_hash([sel1]), config_hash([sel2]))
+        sel2.filter_func = lambda ptc: ptc.e() > 10.
+        self.assertNotEqual(config_hash([sel1]), config_hash([sel2]))
+        # closures
+        def make_filter(ptmin):
+            return lambda ptc: ptc.pt() > ptmin
+        sel1.filter_func = make_filter(10.)
+        sel2.filter_func = make_filter(10.)
+        self.assertEqual(config_hash([sel1]), config_hash([sel2]))
+        sel2.filter_func = make_filter(20.)
+        self.assertNotEqual(config_hash([sel1]), config_hash([sel2]))
+
+    def test_write_read_merge(self):
+        fnames = []
+        for ifile, entries in enumerate([[0, 2], [5]]):
+            fname = '/'.join([self.outdir, 'products{}.cache'.format(ifile)])
+            writer = CacheWriter(fname, dict(key='a'))
+            for iEv in entries:
+                writer.write(iEv, dict(tracks=range(iEv)))
+            writer.close()
+            fnames.append(fname)
+        reader = CacheReader(fnames[0])
+        self.assertEqual(reader.header, dict(key='a'))
+        self.assertEqual(len(reader), 2)
+        self.assertFalse(1 in reader)
+        self.assertEqual(reader.read(2), dict(tracks=[0, 1]))
+        merged = '/'.join([self.outdir, 'products.cache'])
+        merge_caches(merged, fnames)
+        reader = CacheReader(merged)
+        self.assertEqual(sorted(reader.index), [0, 2, 5])
+        self.assertEqual(reader.read(5)['tracks'], range(5))
+
+    def test_truncate(self):
+        fname = '/'.join([self.outdir, 'products.cache'])
+        writer = CacheWriter(fname, dict(key='a'))
+        writer.write(0, dict(tracks=[]))
+        offset = writer.flush()
+        writer.write(1, dict(tracks=[1]))
+        writer.close()
+        # resuming from the checkpoint taken after event 0
+        writer = CacheWriter(fname, None, offset=offset)
+        writer.write(2, dict(tracks=[2]))
+        writer.close()
+        self.assertEqual(sorted(CacheReader(fname).index), [0, 2])
+
+    def run_cache(self, sim, cache, events):
+        setup = FakeSetup([sim, cache])
+        looperdir = '/'.join([self.outdir, 'comp_Range0'])
+        if not os.path.isdir(looperdir):
+            os.mkdir(looperdir)
+        analyzer = ProductCache(cache, FakeComponent('comp_Range0'), looperdir)
+        analyzer.beginLoop(setup)
+        results = [analyzer.process(event) for event in events]
+        analyzer.write(setup)
+        return results
+
+    def test_record_replay(self):
+        sim = FakeCfg(Analyzer, 'sim', pt=1.)
+        cache = FakeCfg(ProductCache, 'cache', mode='record',
+                        products=['tracks'])
+        events = [FakeEvent(iEv) for iEv in [3, 7]]
+        for event in events:
+            event.tracks = [event.iEv]
+        self.run_cache(sim, cache, events)
+        # outputs of the range merged into the component directory
+        os.rename('/'.join([self.outdir, 'comp_Range0']),
+                  '/'.join([self.outdir, 'comp']))
+        replay = FakeCfg(ProductCache, 'cache', mode='replay',
+                         products=['tracks'], cache_dir=self.outdir)
+        self.assertTrue(ProductCache.replaces_upstream(replay))
+        self.assertEqual(ProductCache.produced(replay), ['tracks'])
+        events = [FakeEvent(iEv) for iEv in [3, 5, 7]]
+        results = self.run_cache(sim, replay, events)
+        self.assertEqual(results, [None, False, None])
+        self.assertEqual(events[2].tracks, [7])
+        # stale cache
+        sim.pt = 2.
+        self.assertRaises(ValueError, self.run_cache, sim, replay, events)
+
+
+if __name__ == '__main__':
+    unittest.main()
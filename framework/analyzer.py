@@ -7,6 +7,26 @@ import logging
 
 from heppy.statistics.counter import Counters
 from heppy.statistics.average import Averages
+from heppy.statistics import rrandom as random
+
+def _products(cfg_ana, params):
+    """Returns the list of product names held by the parameters params of cfg_ana,
+    or None if params is None.
+    Each parameter can hold a product name, or a list of product names. 
+    Missing parameters are ignored."""
+    if params is None:
+        return None
+    names = []
+    for param in params:
+        value = getattr(cfg_ana, param, None)
+        if value is None:
+            continue
+        elif isinstance(value, basestring):
+            names.append(value)
+        else:
+            names.extend(value)
+    return names
+
 
 class Analyzer(object):
     """Base Analyzer class. Used in Looper.
@@ -14,6 +34,52 @@ class Analyzer(object):
     Your custom analyzers should inherit from this class
     """
 
+    # Event products read (consumes) and created (produces) by the analyzer,
+    # given as the names of the cfg_ana parameters holding the product names.
+    # An analyzer modifying the objects of a collection should declare 
+    # this collection both in consumes and produces.
+    # None means that the products are not declared: the analyzer is then 
+    # always kept in the sequence, see heppy.framework.dependencies
+    consumes = None
+    produces = None
+
+    # True if the analyzer may reject events
+    is_filter = False
+
+    # Names of the cfg_ana parameters holding the branches or collections
+    # read by the analyzer from event.input.
+    # None means that they are not declared: an analyzer declaring its
+    # products is then assumed not to read event.input,
+    # see heppy.framework.dependencies.input_branches
+    input_branches = None
+
+    @classmethod
+    def consumed(cls, cfg_ana):
+        """Returns the names of the event products read by an analyzer 
+        configured with cfg_ana, or None if they are not declared."""
+        return _products(cfg_ana, cls.consumes)
+
+    @classmethod
+    def produced(cls, cfg_ana):
+        """Returns the names of the event products created or modified
+        by an analyzer configured with cfg_ana, 
+        or None if they are not declared."""
+        return _products(cfg_ana, cls.produces)
+
+    @classmethod
+    def branches(cls, cfg_ana):
+        """Returns the names of the branches or collections read from 
+        event.input by an analyzer configured with cfg_ana,
+        or None if they are not declared."""
+        return _products(cfg_ana, cls.input_branches)
+
+    @classmethod
+    def replaces_upstream(cls, cfg_ana):
+        """Returns True if an analyzer configured with cfg_ana restores 
+        the products of the analyzers before it, which are then not run
+        by the Looper. See heppy.analyzers.ProductCache."""
+        return False
+
     def __init__(self, cfg_ana, cfg_comp, looperName ):
         """Create an analyzer.
 
@@ -36,7 +102,9 @@ class Analyzer(object):
             self.dirName = self.looperName
         else:
             self.dirName = '/'.join( [self.looperName, self.name] )
-            os.mkdir( self.dirName )
+            if not os.path.isdir( self.dirName ):
+                # the directory exists when resuming from a checkpoint
+                os.mkdir( self.dirName )
 
 
         # this is the main logger corresponding to the looper.
@@ -52,8 +120,13 @@ class Analyzer(object):
         if hasattr(self.cfg_ana, 'log_level'):
             log_level = self.cfg_ana.log_level
         self.logger.setLevel(log_level)
+        # True if the info messages are output.
+        # expensive messages in process should be guarded with it
+        self.logInfo = self.logger.isEnabledFor(logging.INFO)
 
         self.beginLoopCalled = False
+        # True if the loop is resumed from a checkpoint, see restore
+        self.resumed = False
 
 
     def beginLoop(self, setup):
@@ -64,6 +137,32 @@ class Analyzer(object):
         self.beginLoopCalled = True
 
 
+    def checkpoint(self, setup):
+        """Called by Looper when saving a checkpoint.
+
+        Returns the state of the analyzer, which must be picklable, 
+        and will be passed to restore when resuming the loop.
+        Overload it if your analyzer accumulates other results, 
+        and to flush your output files. 
+        """
+        return dict(counters=getattr(self, 'counters', None),
+                    averages=getattr(self, 'averages', None))
+
+    def restore(self, setup, state):
+        """Called by Looper instead of beginLoop when resuming a loop
+        from a checkpoint, with the state returned by checkpoint.
+
+        beginLoop is called with self.resumed set to True, 
+        so that existing output files can be opened in update mode,
+        and the counters and averages are restored.
+        """
+        self.resumed = True
+        self.beginLoop(setup)
+        if state['counters'] is not None:
+            self.counters = state['counters']
+        if state['averages'] is not None:
+            self.averages = state['averages']
+
     def endLoop(self, setup):
         """Automatically called by Looper, for all analyzers."""
         #print self.cfg_ana
@@ -77,6 +176,40 @@ class Analyzer(object):
         each analyzer can access, modify, and store event information, of any type."""
         print self.cfg_ana.name
 
+    def process_batch(self, events):
+        """Optional hook called by the Looper in batch mode instead of process, 
+        with a list of events.
+
+        Overload it to process all events at once, e.g. with vectorized 
+        operations. The input of the events (event.input) should not be used, 
+        as it is not positioned on the events of the batch. 
+
+        Returns a list of booleans, one per event, set to False for the events
+        to be rejected, or None if all events are accepted. 
+        This default implementation calls process on each event.
+
+        If random numbers are drawn, call seed_event before drawing
+        the numbers of each event, so that they do not depend on the batches.
+        """
+        return [self.process(event) != False for event in events]
+
+    def seed_event(self, event):
+        """Seeds the random numbers for event, as the Looper does before
+        calling process, if the random numbers are seeded per event,
+        see heppy.statistics.rrandom. To be called in process_batch."""
+        if random.per_event():
+            random.seed_event(*(event.random_key + (self.name,)))
+
+    def batch_processing(self):
+        """Returns True if this analyzer overloads process_batch."""
+        return self.__class__.process_batch != Analyzer.process_batch
+
+    def checkpoints_outputs(self):
+        """Returns False if this analyzer writes its own outputs
+        (overloads write) without overloading checkpoint to save them."""
+        cls = self.__class__
+        return cls.write == Analyzer.write or cls.checkpoint != Analyzer.checkpoint
+
 
     def write(self, setup):
         """Called by Looper.write, for all analyzers.
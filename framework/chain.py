@@ -4,7 +4,9 @@
 import glob
 import os
 import pprint
-from ROOT import TChain, TFile, TTree, gSystem
+from heppy.utils.lazyimport import ROOT
+from heppy.framework.fileindex import FileIndex, read_metadata, \
+     entry_offsets, locate
 
 #TODO should use eostools
 def is_pfn(fn):
@@ -30,9 +32,36 @@ class Chain( object ):
 
        for event in the_chain:
            print event.var1
+
+    An entry list written by EntryListWriter can be given 
+    to process only the selected entries: 
+
+       skim = Chain('../test/test_*.root', 'test_tree', 
+                    entry_list='Outdir/comp/EntryListWriter/entry_list.root')
+       event0 = skim[0] # first selected entry
+
+    Reading can be tuned with the options dictionary, 
+    e.g. to read only two branches through a 10 MB TTreeCache:
+
+       fast = Chain('../test/test_*.root', 'test_tree', 
+                    options=dict(branches=['var1', 'var2'], 
+                                 cache_size=10000000))
+
+    In a configuration file, these options are set in the options 
+    attribute of the component.
+
+    For components with many files, a FileIndex avoids opening
+    all files to build the chain:
+
+       big = Chain('data/*.root', index='file_index.json')
+       fname, entry = big.locate(123456) # file containing entry 123456
     """
 
-    def __init__(self, input_filenames, tree_name=None):
+    # options understood by the Chain, see _configure
+    OPTIONS = set(['branches', 'cache_size', 'learn_entries', 'implicit_mt'])
+
+    def __init__(self, input_filenames, tree_name=None, entry_list=None,
+                 options=None, index=None):
         """
         Create a chain.
 
@@ -43,13 +72,26 @@ class Chain( object ):
           tree_name = key of the tree in each file.
                       if None and if each file contains only one TTree,
                       this TTree is used.
+          entry_list = name of a root file containing a TEntryList called 
+                      entry_list. If provided, the chain only contains 
+                      the entries of this list.
+          options   = dictionary of reading options, see _configure.
+          index     = FileIndex, or name of the json file of a FileIndex,
+                      holding the tree names and number of entries 
+                      of the files. The files are then not opened
+                      to build the chain.
         """
+        if isinstance(index, basestring):
+            index = FileIndex(index)
+        self.index = index
+        self.offsets = None
         self.files = input_filenames
         if isinstance(input_filenames, basestring): # input is a pattern
             self.files = glob.glob(input_filenames)
             if len(self.files)==0:
                 raise ValueError('no matching file name: '+input_filenames)
-        else: # case of a list of files
+        elif index is None: # case of a list of files
+            # with an index, the files are checked when indexed
             if False in [
                 ((is_pfn(fnam) and os.path.isfile(fnam)) or
                 is_lfn(fnam)) or is_rootfn(fnam)
@@ -59,9 +101,127 @@ class Chain( object ):
                 raise ValueError(err)
         if tree_name is None:
             tree_name = self._guessTreeName(input_filenames)
-        self.chain = TChain(tree_name)
-        for file in self.files:
-            self.chain.Add(file)
+        self.chain = ROOT.TChain(tree_name)
+        if self.index is None:
+            for file in self.files:
+                self.chain.Add(file)
+        else:
+            self._addIndexedFiles(tree_name)
+        self.entry_list = None
+        if entry_list is not None:
+            self._setEntryList(entry_list, tree_name)
+        if options:
+            unknown = set(options) - self.OPTIONS
+            if unknown:
+                raise ValueError('unknown Chain options: {}'.format(
+                    ', '.join(sorted(unknown))))
+            self._configure(**options)
+
+    def _configure(self, branches=None, cache_size=None, learn_entries=None,
+                   implicit_mt=None):
+        """
+        Configure the reading of the chain.
+
+        Parameters:
+          branches  = list of the branches to read, possibly with wildcards.
+                      The other branches are disabled and never decompressed.
+                      For a collection of the FCC EDM, the branches of its
+                      members (e.g. GenParticle#0) are also read.
+                      If None, all branches are read.
+          cache_size = size of the TTreeCache in bytes. 0 disables the cache.
+                      If None, the ROOT default is used.
+          learn_entries = number of entries used by the TTreeCache to learn
+                      which branches are read. If None, the cache is filled 
+                      with the branches given above (or all branches)
+                      from the first entry, without a learning phase.
+          implicit_mt = if True, or a number of threads, enable the implicit
+                      multi-threading of ROOT to decompress the baskets of
+                      the branches in parallel. This setting is global.
+        """
+        if implicit_mt:
+            nthreads = 0 if implicit_mt is True else int(implicit_mt)
+            ROOT.EnableImplicitMT(nthreads)
+        if branches is not None:
+            self.chain.SetBranchStatus('*', 0)
+            for branch in self._branchPatterns(branches):
+                self.chain.SetBranchStatus(branch, 1)
+        if cache_size is not None:
+            self.chain.SetCacheSize(int(cache_size))
+        if cache_size != 0:
+            if learn_entries is not None:
+                self.chain.SetCacheLearnEntries(int(learn_entries))
+            elif cache_size is not None or branches is not None:
+                # the cache must exist to add branches to it
+                self.chain.LoadTree(0)
+                if branches is None:
+                    self.chain.AddBranchToCache('*', True)
+                else:
+                    for branch in self._branchPatterns(branches):
+                        self.chain.AddBranchToCache(branch, True)
+                self.chain.StopCacheLearningPhase()
+
+    def _branchPatterns(self, branches):
+        """
+        Returns the branch name patterns for branches,
+        including the member branches of the FCC EDM collections.
+        """
+        listOfBranches = self.chain.GetListOfBranches()
+        patterns = []
+        for branch in branches:
+            patterns.append(branch)
+            if '*' not in branch and listOfBranches and \
+                    listOfBranches.FindObject(branch + '#0'):
+                patterns.append(branch + '#*')
+        return patterns
+
+    def _addIndexedFiles(self, tree_name):
+        """
+        Add the files to the chain with their number of entries taken from
+        the index, so that they are not opened before being read.
+        """
+        nentries = [self.index.entries(fnam, tree_name) for fnam in self.files]
+        for fnam, nentry in zip(self.files, nentries):
+            if nentry:
+                self.chain.Add(fnam, nentry)
+            else:
+                # not indexed, or empty: TChain opens the file when needed
+                self.chain.Add(fnam)
+        if None not in nentries:
+            self.offsets = entry_offsets(nentries)
+        self.index.save()
+
+    def locate(self, entry):
+        """
+        Returns the name of the file containing entry, 
+        and the entry number in this file.
+        The files are not opened if all of them are indexed.
+        """
+        if self.entry_list is not None:
+            entry = self.chain.GetEntryNumber(entry)
+        if self.offsets is not None:
+            ifile, local = locate(self.offsets, entry)
+            return self.files[ifile], local
+        local = self.chain.LoadTree(entry)
+        if local < 0:
+            raise IndexError('entry {} out of range'.format(entry))
+        return self.chain.GetFile().GetName(), local
+
+    def _setEntryList(self, fname, tree_name):
+        """
+        Restrict the chain to the entries listed in file fname, 
+        for the files of this chain.
+        """
+        self.entry_list_file = ROOT.TFile(fname)
+        full_list = self.entry_list_file.Get('entry_list')
+        if not full_list:
+            raise ValueError('no entry_list in '+fname)
+        self.entry_list = ROOT.TEntryList('entry_list_{}'.format(id(self)), '')
+        self.entry_list.SetDirectory(0)
+        for fnam in self.files:
+            sublist = full_list.GetEntryList(tree_name, fnam)
+            if sublist:
+                self.entry_list.Add(sublist)
+        self.chain.SetEntryList(self.entry_list)
 
     def _guessTreeName(self, pattern):
         """
@@ -72,11 +232,12 @@ class Chain( object ):
         """
         names = []
         for fnam in self.files:
-            rfile = TFile(fnam)
-            for key in rfile.GetListOfKeys():
-                obj = rfile.Get(key.GetName())
-                if type(obj) is TTree:
-                    names.append( key.GetName() )
+            trees = None
+            if self.index is not None:
+                trees = self.index.trees(fnam)
+            if trees is None:
+                trees = read_metadata(fnam)
+            names.extend(trees)
         thename = set(names)
         if len(thename)==1:
             return list(thename)[0]
@@ -96,15 +257,23 @@ class Chain( object ):
         return getattr(self.chain, attr)
 
     def __iter__(self):
+        if self.entry_list is not None:
+            return (self[index] for index in xrange(len(self)))
         return iter(self.chain)
 
     def __len__(self):
+        if self.entry_list is not None:
+            return int(self.entry_list.GetN())
+        elif self.offsets is not None:
+            return self.offsets[-1]
         return int(self.chain.GetEntries())
 
     def __getitem__(self, index):
         """
         Returns the event at position index.
         """
+        if self.entry_list is not None:
+            index = self.chain.GetEntryNumber(index)
         self.chain.GetEntry(index)
         return self.chain
 
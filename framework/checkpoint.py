@@ -0,0 +1,74 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Checkpoints of the state of a Looper, used to resume an interrupted loop.
+
+When checkpointInterval is set, the Looper periodically asks each
+analyzer for its state (see Analyzer.checkpoint), and writes a Checkpoint
+holding these states, the index of the next event to process,
+and the state of the random number generator, to checkpoint.pkl in the
+looper directory.
+
+When the Looper is created with resume=True, the loop starts
+from the last checkpoint, and the analyzers are restored from their
+saved state (see Analyzer.restore) instead of starting a new loop.
+The final outputs are then identical to the ones of an uninterrupted loop,
+provided that all analyzers writing outputs save them in their checkpoint
+method, as the tree producers do.
+
+The services are started again when resuming. The analyzers filling 
+objects owned by a service, e.g. histograms in a TFileService, 
+should save and restore these objects in their checkpoint and restore methods.
+Otherwise, these objects only contain the events processed after resuming,
+and the Looper prints a warning.
+'''
+
+import os
+import pickle
+
+CHECKPOINT_FILE = 'checkpoint.pkl'
+
+class Checkpoint(object):
+    '''State of a Looper.
+
+    Attributes:
+      iEv : index of the next event to process
+      nEvProcessed : number of events processed so far
+      states : dictionary of the analyzer states, by analyzer name
+      random_state : state of the random number generator
+      done : True if the loop is over and its outputs are written
+    '''
+
+    def __init__(self, iEv, nEvProcessed, states, random_state=None, done=False):
+        self.iEv = iEv
+        self.nEvProcessed = nEvProcessed
+        self.states = states
+        self.random_state = random_state
+        self.done = done
+
+    def write(self, dirname):
+        '''Write the checkpoint to dirname.
+        The previous checkpoint is only replaced once the new one
+        is completely written.'''
+        fname = '/'.join([dirname, CHECKPOINT_FILE])
+        tmpname = fname + '.tmp'
+        with open(tmpname, 'wb') as out:
+            pickle.dump(self, out, pickle.HIGHEST_PROTOCOL)
+            out.flush()
+            os.fsync(out.fileno())
+        os.rename(tmpname, fname)
+
+    @classmethod
+    def read(cls, dirname):
+        '''Returns the checkpoint written to dirname,
+        or None if there is no checkpoint.'''
+        fname = '/'.join([dirname, CHECKPOINT_FILE])
+        if not os.path.isfile(fname):
+            return None
+        with open(fname, 'rb') as infile:
+            return pickle.load(infile)
+
+    def __str__(self):
+        return 'Checkpoint: next event {iEv}, {nEv} events processed{done}'.format(
+            iEv=self.iEv, nEv=self.nEvProcessed,
+            done=', done' if self.done else '')
@@ -4,13 +4,10 @@
 from weight import Weight
 import glob
 import analyzer
+from dependencies import optimize
+from parallel import split_by_entries
 import copy
 
-# Forbidding PyROOT to hijack help system,
-# in case the configuration module is used as a script.
-import ROOT 
-ROOT.PyConfig.IgnoreCommandLineOptions = True
-
 def printComps(comps, details=False):
     '''
     Summary printout for  a list of components comps.
@@ -54,6 +51,9 @@ def split(comps):
                 newComp.name = '{name}_Chunk{index}'.format(name=newComp.name,
                                                        index=ichunk)
                 splitComps.append( newComp )
+        elif hasattr( comp, 'entrySplitFactor') and comp.entrySplitFactor>1:
+            # chunks with the same number of entries, see parallel.split_by_entries
+            splitComps.extend( split_by_entries(comp, comp.entrySplitFactor) )
         elif hasattr( comp, 'splitFactor') and comp.splitFactor>1:
             chunkSize = len(comp.files) / comp.splitFactor
             if len(comp.files) % comp.splitFactor:
@@ -275,6 +275,15 @@ You provided an object of type {}
             tmp.append( '{ana} :'.format(ana=ana) )
         return '\n'.join(tmp)
 
+    def optimized(self, keep=None):
+        '''Returns a new sequence, optimized using the products declared
+        by the analyzers, see heppy.framework.dependencies.
+
+        keep: names of the event products that must be created,
+          e.g. to be used by an analyzer that does not declare its products.
+        '''
+        return Sequence(optimize(self, keep))
+
 #TODO review inheritance, and in particular constructor args - this is a mess.
 
 class Component( CFG ):
@@ -384,9 +393,15 @@ class MCComponent( Component ):
 
 class Config( object ):
     '''Main configuration object, holds a sequence of analyzers, and
-    a list of components.'''
-    def __init__(self, components, sequence, services, events_class,preprocessor=None):
+    a list of components.
+
+    keep_products: names of the event products that must not be released
+    before the end of the sequence, see heppy.framework.products
+    '''
+    def __init__(self, components, sequence, services, events_class,preprocessor=None,
+                 keep_products=None):
         self.preprocessor = preprocessor
+        self.keep_products = keep_products
         self.components = components
         self.sequence = sequence
         self.services = services
@@ -0,0 +1,274 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Processing of the components by workers running on several machines.
+
+The Coordinator serves the components (usually entry ranges created by
+split_in_ranges) on a TCP or Unix socket, to any number of worker processes
+started on the same or on other machines with::
+
+  heppy_loop --worker <host:port> <work_dir> <config_file>
+
+Each worker asks for a component as soon as it is free, like the workers
+of a Scheduler, and processes it in its local work_dir.
+When there are no more components to hand out, the worker merges its
+ranges into <component>_Worker<id>.<n> directories, and sends them back
+to the coordinator as a compressed tar archive, which is extracted in the
+output directory of the coordinator. The final reduction is done by
+merge_ranges, as for the Scheduler.
+
+The ranges of a worker are considered done only when its outputs
+are received. The ranges of a worker that disconnects before
+are handed out again. A component failing with an exception is
+reported and retried, up to maxRetries times.
+
+The workers connect with the authentication key of the coordinator,
+taken from the HEPPY_AUTHKEY environment variable by heppy_loop, which
+refuses to start a coordinator or a worker without it. The messages are
+pickled: anyone knowing the key can run code in the coordinator and in
+the workers, so the key must be kept secret.
+Everything can run on localhost, e.g. for testing::
+
+  export HEPPY_AUTHKEY=<secret key>
+  heppy_loop Outdir analysis.py --coordinator localhost:6000 --range-size 5000
+  heppy_loop --worker localhost:6000 /tmp/work1 analysis.py
+  heppy_loop --worker localhost:6000 /tmp/work2 analysis.py
+'''
+
+import os
+import io
+import time
+import shutil
+import tarfile
+import threading
+import traceback
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+from heppy.framework.parallel import RANGE_TAG, range_base_name, \
+     worker_dir, merge_dirs
+
+# requests of the workers
+GET, DONE, FAILED, OUTPUTS = 'get', 'done', 'failed', 'outputs'
+# replies of the coordinator
+TASK, WAIT, STOP = 'task', 'wait', 'stop'
+
+def parse_address(address):
+    '''Returns the (host, port) tuple for a host:port address,
+    and the path of the Unix socket otherwise.'''
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address
+
+
+def archive(dirs):
+    '''Returns the compressed tar archive of directories dirs.'''
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as tar:
+        for path in dirs:
+            tar.add(path, arcname=os.path.basename(path))
+    return data.getvalue()
+
+
+def extract(data, outDir):
+    '''Extracts the archive data sent by a worker in outDir.
+    Raises ValueError, extracting nothing, if the archive contains
+    anything else than regular files and directories, or paths
+    leading outside of outDir.'''
+    root = os.path.realpath(outDir)
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as tar:
+        members = tar.getmembers()
+        for member in members:
+            if not (member.isfile() or member.isdir()):
+                raise ValueError('not a regular file or directory '
+                                 'in the archive: {}'.format(member.name))
+            path = os.path.realpath(os.path.join(root, member.name))
+            if os.path.isabs(member.name) or \
+               not path.startswith(root + os.sep):
+                raise ValueError('path outside of the output directory '
+                                 'in the archive: {}'.format(member.name))
+        tar.extractall(outDir, members)
+
+
+class Coordinator(object):
+    '''Hands out components to the workers connecting to address,
+    and collects their outputs in outDir.'''
+
+    def __init__(self, address, outDir, authkey, maxRetries=1, timeout=10.):
+        self.outDir = outDir
+        self.maxRetries = maxRetries
+        self.timeout = timeout
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.lock = threading.Condition()
+        self.nworkers = 0
+        self.closed = False
+        # errors of the failed attempts, by component name
+        self.errors = dict()
+
+    def run(self, comps):
+        '''Processes the components comps, and returns the names of
+        the components that failed more than maxRetries times.'''
+        self.comps = list(comps)
+        self.pending = deque(range(len(self.comps)))
+        self.attempts = [0] * len(self.comps)
+        self.finished = set()
+        self.failed = []
+        handlers = []
+        acceptor = threading.Thread(target=self._accept, args=(handlers,))
+        acceptor.daemon = True
+        acceptor.start()
+        with self.lock:
+            while len(self.finished) < len(self.comps):
+                self.lock.wait(self.timeout)
+        # the connected workers get STOP at their next request
+        for handler in list(handlers):
+            handler.join(self.timeout)
+        self.closed = True
+        self.listener.close()
+        return sorted(self.failed)
+
+    def _accept(self, handlers):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                # closed listener, or failed authentication
+                if self.closed:
+                    return
+                continue
+            with self.lock:
+                iworker = self.nworkers
+                self.nworkers += 1
+            handler = threading.Thread(target=self._serve, args=(conn, iworker))
+            handler.daemon = True
+            handler.start()
+            handlers.append(handler)
+
+    def _serve(self, conn, iworker):
+        '''Serves the requests of worker iworker.'''
+        # components handed out to the worker, without outputs received yet
+        assigned = set()
+        try:
+            while True:
+                request = conn.recv()
+                with self.lock:
+                    reply = self._handle(iworker, assigned, *request)
+                if reply is not None:
+                    conn.send(reply)
+                if reply and reply[0] == STOP:
+                    break
+        except (EOFError, IOError):
+            with self.lock:
+                lost = assigned - self.finished
+                if lost:
+                    print 'worker {iworker} disconnected, handing out ' \
+                          'its {n} components again'.format(iworker=iworker,
+                                                            n=len(lost))
+                self.pending.extend(sorted(lost))
+                self.lock.notify_all()
+        finally:
+            conn.close()
+
+    def _handle(self, iworker, assigned, kind, *args):
+        if kind == GET:
+            if self.pending:
+                index = self.pending.popleft()
+                assigned.add(index)
+                return (TASK, iworker, index, self.comps[index])
+            elif len(self.finished) < len(self.comps):
+                return (WAIT,)
+            return (STOP,)
+        elif kind == FAILED:
+            index, error = args
+            assigned.discard(index)
+            self._fail(iworker, index, error)
+        elif kind == OUTPUTS:
+            indices, data = args
+            try:
+                extract(data, self.outDir)
+            except (ValueError, tarfile.TarError) as err:
+                # the components are processed again
+                for index in indices:
+                    assigned.discard(index)
+                    self._fail(iworker, index,
+                               'invalid outputs: {}'.format(err))
+                return (DONE,)
+            self.finished.update(indices)
+            assigned.difference_update(indices)
+            self.lock.notify_all()
+            return (DONE,)
+
+    def _fail(self, iworker, index, error):
+        '''Records the failure of component index in worker iworker,
+        and hands it out again up to maxRetries times.'''
+        name = self.comps[index].name
+        self.errors.setdefault(name, []).append(error)
+        print 'ERROR processing component {name} in worker {iworker}:'.format(
+            name=name, iworker=iworker)
+        print error
+        self.attempts[index] += 1
+        if self.attempts[index] <= self.maxRetries:
+            print 'retrying component {name}'.format(name=name)
+            self.pending.append(index)
+        else:
+            self.failed.append(name)
+            self.finished.add(index)
+            self.lock.notify_all()
+
+
+def work(address, authkey, run, outDir, poll=1.):
+    '''Processes the components served by the coordinator at address,
+    calling run(comp, outDir) for each of them,
+    and sends the outputs back to the coordinator.'''
+    conn = Client(address, authkey=authkey)
+    # {component : [range directories]} of the ranges not sent yet
+    done = dict()
+    indices = []
+    nsent = 0
+    iworker = None
+    while True:
+        conn.send((GET,))
+        reply = conn.recv()
+        if reply[0] == STOP:
+            break
+        elif reply[0] == WAIT:
+            # the other workers may disconnect before
+            # sending their outputs: staying around
+            if indices:
+                _send(conn, outDir, iworker, nsent, done, indices)
+                nsent += 1
+            time.sleep(poll)
+            continue
+        iworker, index, comp = reply[1:]
+        try:
+            run(comp, outDir)
+        except Exception:
+            conn.send((FAILED, index, traceback.format_exc()))
+            continue
+        compDir = '/'.join([outDir, comp.name])
+        base = range_base_name(comp.name) if RANGE_TAG in comp.name \
+               else comp.name
+        done.setdefault(base, []).append(compDir)
+        indices.append(index)
+    conn.close()
+
+
+def _send(conn, outDir, iworker, nsent, done, indices):
+    '''Merges the ranges of the worker, sends the outputs to the
+    coordinator, and waits for its acknowledgement.'''
+    dirs = []
+    for base, idirs in done.iteritems():
+        if RANGE_TAG in os.path.basename(idirs[0]):
+            odir = worker_dir(outDir, base, '{}.{}'.format(iworker, nsent))
+            merge_dirs(odir, idirs)
+            dirs.append(odir)
+        else:
+            dirs.extend(idirs)
+    conn.send((OUTPUTS, list(indices), archive(dirs)))
+    conn.recv()
+    for path in dirs:
+        shutil.rmtree(path)
+    done.clear()
+    del indices[:]
@@ -0,0 +1,196 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Dependencies between the analyzers of a sequence.
+
+The analyzers may declare the event products they read and create,
+see Analyzer.consumes and Analyzer.produces. From these declarations,
+a DependencyGraph is built and used to optimize the sequence:
+
+* the analyzers creating products that are not used by any other analyzer
+  are removed;
+* the filters are moved as early as possible in the sequence,
+  so that the analyzers that are not needed to take the filtering decision
+  only run on the selected events.
+
+Analyzers that do not declare their products, or declare that they do not
+create any product (e.g. tree producers), as well as filters,
+are always kept.
+
+Example::
+
+  sequence = cfg.Sequence(
+    ...
+  ).optimized(keep=['zeds'])
+'''
+
+def consumed(cfg_ana):
+    '''Returns the names of the products read by the analyzer configured
+    by cfg_ana, or None if they are not declared.'''
+    method = getattr(cfg_ana.class_object, 'consumed', None)
+    return method(cfg_ana) if method else None
+
+def produced(cfg_ana):
+    '''Returns the names of the products created by the analyzer configured
+    by cfg_ana, or None if they are not declared.'''
+    method = getattr(cfg_ana.class_object, 'produced', None)
+    return method(cfg_ana) if method else None
+
+def is_filter(cfg_ana):
+    return getattr(cfg_ana.class_object, 'is_filter', False)
+
+def input_branches(sequence):
+    '''Returns the sorted names of the input branches or collections
+    read by the analyzers of the sequence, see Analyzer.branches.
+
+    Analyzers declaring their products but not their input branches
+    do not read event.input.
+    Returns None if the branches cannot be inferred,
+    i.e. if an analyzer declares neither its input branches nor its products.
+    '''
+    names = set()
+    for cfg_ana in sequence:
+        method = getattr(cfg_ana.class_object, 'branches', None)
+        branches = method(cfg_ana) if method else None
+        if branches is None:
+            if consumed(cfg_ana) is None:
+                return None
+            continue
+        names.update(branches)
+    return sorted(names)
+
+
+class DependencyGraph(object):
+    '''Dependency graph of the analyzers of a sequence.
+
+    Analyzer i depends on analyzer j (j is a parent of i) if j is the last
+    analyzer before i to produce one of the products read by i.
+    An analyzer that does not declare its products
+    depends on all analyzers before it.
+    A product that is read but not produced by a declared analyzer may come
+    from any analyzer before that does not declare its products.
+    '''
+
+    def __init__(self, sequence):
+        self.sequence = list(sequence)
+        self.consumed = map(consumed, self.sequence)
+        self.produced = map(produced, self.sequence)
+        self.filters = map(is_filter, self.sequence)
+        self.parents = [self._find_parents(i) for i in range(len(self.sequence))]
+
+    def declared(self, index):
+        return self.consumed[index] is not None and \
+               self.produced[index] is not None
+
+    def pure_producer(self, index):
+        '''Returns True if the analyzer only creates products, without
+        any other effect that would depend on the events it sees.'''
+        return self.declared(index) and len(self.produced[index])>0 \
+               and not self.filters[index]
+
+    def _find_parents(self, index):
+        if not self.declared(index):
+            return set(range(index))
+        parents = set()
+        for product in self.consumed[index]:
+            producers = [i for i in range(index)
+                         if self.produced[i] is not None and
+                         product in self.produced[i]]
+            if producers:
+                parents.add(producers[-1])
+            else:
+                parents.update(i for i in range(index) if not self.declared(i))
+        return parents
+
+    def needed(self, keep=None):
+        '''Returns the set of indices of the analyzers needed to produce
+        the products in keep, and to run the analyzers that must be kept:
+        filters, analyzers that do not declare their products,
+        and analyzers that do not create any product.'''
+        keep = set(keep) if keep else set()
+        roots = [i for i in range(len(self.sequence))
+                 if not self.declared(i) or
+                 not self.produced[i] or
+                 self.filters[i] or
+                 keep & set(self.produced[i])]
+        needed = set()
+        while roots:
+            index = roots.pop()
+            if index in needed:
+                continue
+            needed.add(index)
+            roots.extend(self.parents[index])
+        return needed
+
+    def pruned(self, keep=None):
+        '''Returns the sequence without the analyzers that are not needed.'''
+        needed = self.needed(keep)
+        return [ana for i, ana in enumerate(self.sequence) if i in needed]
+
+    def ancestors(self, index):
+        '''Returns the set of analyzers on which analyzer index depends,
+        directly or not.'''
+        ancestors = set()
+        parents = list(self.parents[index])
+        while parents:
+            parent = parents.pop()
+            if parent not in ancestors:
+                ancestors.add(parent)
+                parents.extend(self.parents[parent])
+        return ancestors
+
+    def _can_move_after(self, other, group):
+        '''Returns True if analyzer other can be moved after the analyzers
+        in group: other must not create a product used or created by
+        the group, nor read a product created by the group.'''
+        if not self.pure_producer(other):
+            return False
+        produced = set(self.produced[other])
+        consumed = set(self.consumed[other])
+        for index in group:
+            if other in self.parents[index] or \
+               produced & set(self.produced[index]) or \
+               produced & set(self.consumed[index]) or \
+               consumed & set(self.produced[index]):
+                return False
+        return True
+
+    def filters_moved_up(self):
+        '''Returns the sequence with the declared filters moved
+        as early as possible: the analyzers that only create products and
+        that are not needed by a filter are moved after this filter.'''
+        order = range(len(self.sequence))
+        for index in range(len(self.sequence)):
+            if not self.filters[index] or not self.declared(index):
+                continue
+            ancestors = self.ancestors(index)
+            position = order.index(index)
+            group = [index]
+            for other in reversed(order[:position]):
+                if other in ancestors:
+                    group.append(other)
+                elif self._can_move_after(other, group):
+                    order.remove(other)
+                    order.insert(order.index(index)+1, other)
+                else:
+                    break
+        return [self.sequence[i] for i in order]
+
+    def __str__(self):
+        lines = []
+        for index, ana in enumerate(self.sequence):
+            lines.append('{index} : {name}'.format(index=index, name=ana.name))
+            lines.append('\tconsumes : {products}'.format(products=self.consumed[index]))
+            lines.append('\tproduces : {products}'.format(products=self.produced[index]))
+            lines.append('\tdepends on : {parents}'.format(
+                parents=sorted(self.parents[index])))
+        return '\n'.join(lines)
+
+
+def optimize(sequence, keep=None):
+    '''Returns the optimized sequence:
+    the analyzers that are not needed to produce the products in keep or
+    to run the analyzers that must be kept are removed,
+    and the filters are moved up, see DependencyGraph.'''
+    pruned = DependencyGraph(sequence).pruned(keep)
+    return DependencyGraph(pruned).filters_moved_up()
@@ -0,0 +1,123 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Persistent index of the metadata of the input root files.
+
+Building a Chain normally opens every input file twice: once to guess
+the name of the tree, and once to count the entries.
+For components with thousands of files, this takes minutes.
+
+The FileIndex stores, for each file, the names of its trees and their
+number of entries in a json file. A file is identified by its path,
+and its metadata are only read again if its size or modification time
+changed. The Chain uses the index to build its TChain without opening
+the files, and to map the global entries to the files::
+
+  chain = Chain('data/*.root', index='file_index.json')
+  fname, entry = chain.locate(123456)
+
+In a configuration file, set the file_index attribute of the component
+to the name of the index file.
+Remote files (e.g. root://) cannot be indexed, and are always opened.
+'''
+
+import os
+import json
+import bisect
+
+from heppy.utils.lazyimport import ROOT
+
+def read_metadata(fname):
+    '''Opens root file fname and returns a dictionary
+    {tree name : number of entries} for all its TTrees.'''
+    rfile = ROOT.TFile(fname)
+    if not rfile or rfile.IsZombie():
+        raise ValueError('cannot open root file ' + fname)
+    trees = dict()
+    for key in rfile.GetListOfKeys():
+        obj = rfile.Get(key.GetName())
+        if type(obj) is ROOT.TTree:
+            trees[key.GetName()] = int(obj.GetEntries())
+    rfile.Close()
+    return trees
+
+
+def entry_offsets(nentries):
+    '''Returns the cumulative entry offsets for files holding
+    nentries entries, starting with 0 and ending with the total.'''
+    offsets = [0]
+    for n in nentries:
+        offsets.append(offsets[-1] + n)
+    return offsets
+
+
+def locate(offsets, entry):
+    '''Returns the index of the file containing the global entry,
+    and the entry number in this file, given the entry offsets of the files.'''
+    if entry < 0 or entry >= offsets[-1]:
+        raise IndexError('entry {} out of range [0, {}['.format(entry, offsets[-1]))
+    ifile = bisect.bisect_right(offsets, entry) - 1
+    return ifile, entry - offsets[ifile]
+
+
+class FileIndex(object):
+    '''Index of the tree names and numbers of entries of root files,
+    stored in a json file.'''
+
+    def __init__(self, fname, reader=read_metadata):
+        '''Loads the index from file fname, if it exists.
+        If fname is None, the index is only kept in memory.
+        reader is the function returning the trees of a root file,
+        with their number of entries.'''
+        self.fname = fname
+        self.reader = reader
+        self.files = dict()
+        self.modified = False
+        if fname is not None and os.path.isfile(fname):
+            with open(fname) as infile:
+                self.files = json.load(infile)
+
+    def is_indexable(self, path):
+        return '://' not in path and not path.startswith('/store')
+
+    def trees(self, path):
+        '''Returns a dictionary {tree name : number of entries} for
+        the root file at path, reading the file only if it is not indexed
+        or has changed. Returns None if the file cannot be indexed.'''
+        if not self.is_indexable(path):
+            return None
+        key = os.path.abspath(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            raise ValueError('input file does not exist: ' + path)
+        info = self.files.get(key)
+        if info is None or info['size'] != stat.st_size or \
+                info['mtime'] != stat.st_mtime:
+            info = dict(size=stat.st_size, mtime=stat.st_mtime,
+                        trees=self.reader(key))
+            self.files[key] = info
+            self.modified = True
+        return info['trees']
+
+    def entries(self, path, tree_name):
+        '''Returns the number of entries of tree tree_name in the file at path,
+        or None if the file cannot be indexed.'''
+        trees = self.trees(path)
+        if trees is None:
+            return None
+        if tree_name not in trees:
+            raise ValueError('no tree {} in {}'.format(tree_name, path))
+        return trees[tree_name]
+
+    def save(self):
+        '''Writes the index if it has been modified.
+        The previous index is only replaced once the new one
+        is completely written.'''
+        if not self.modified or self.fname is None:
+            return
+        tmpname = '{}.{}.tmp'.format(self.fname, os.getpid())
+        with open(tmpname, 'w') as out:
+            json.dump(self.files, out)
+        os.rename(tmpname, self.fname)
+        self.modified = False
@@ -8,27 +8,26 @@ import glob
 import sys
 import imp
 import copy
+import json
+import binascii
 import multiprocessing 
 from pprint import pprint
 
-# import root in batch mode if "-i" is not among the options
-if "-i" not in sys.argv:
-    oldv = sys.argv[:]
-    sys.argv = [ "-b-"]
-    import ROOT
-    ROOT.gROOT.SetBatch(True)
-    sys.argv = oldv
-
+# ROOT is imported when first needed,
+# in batch mode if "-i" is not among the options
+from heppy.utils import lazyimport
+lazyimport.root_batch = "-i" not in sys.argv
 
 from heppy.framework.looper import Looper
 from heppy.framework.config import split
+from heppy.framework.parallel import split_in_ranges, merge_ranges
+from heppy.framework.checkpoint import Checkpoint
+from heppy.framework.scheduler import Scheduler
+from heppy.framework.coordinator import Coordinator, parse_address, work
 
 # global, to be used interactively when only one component is processed.
 loop = None
 
-def callBack( result ):
-    pass
-
 def runLoopAsync(comp, outDir, configName, options):
     try:
         loop = runLoop( comp, outDir, copy.copy(sys.modules[configName].config), options)
@@ -58,7 +57,15 @@ def runLoop( comp, outDir, config, options):
                    timeReport = options.timeReport,
                    quiet = options.quiet,
                    memCheckFromEvent = memcheck,
-                   stopFlag = _globalGracefulStopFlag)
+                   stopFlag = _globalGracefulStopFlag,
+                   batchSize = options.batchSize,
+                   releaseProducts = getattr(options, 'releaseProducts', False),
+                   productReport = getattr(options, 'productReport', False),
+                   checkpointInterval = getattr(options, 'checkpointInterval', None),
+                   resume = getattr(options, 'resume', None) is not None,
+                   nWorkers = getattr(options, 'pipelineWorkers', 0),
+                   nReaders = getattr(options, 'pipelineReaders', 1),
+                   readerStage = getattr(options, 'readerStage', 1))
     # print loop
     if options.iEvent is None:
         loop.loop()
@@ -101,6 +108,83 @@ def createOutputDir(dirname, components, force):
                     raise ValueError( ' '.join(['answer can not have this value!',
                                                 answer]) )
 
+RUN_FILE = 'heppy_loop.json'
+
+def saveRun(outDir, options, args, done=False):
+    '''Saves the arguments and options of heppy_loop to outDir,
+    so that the processing can be resumed with --resume.'''
+    args = [os.path.abspath(args[0]), os.path.abspath(args[1])]
+    with open('/'.join([outDir, RUN_FILE]), 'w') as out:
+        json.dump(dict(args=args, options=vars(options), done=done),
+                  out, indent=2, sort_keys=True)
+
+def loadRun(outDir, parser):
+    '''Returns the options, the arguments, and the status of the run 
+    saved to outDir by saveRun.'''
+    fname = '/'.join([outDir, RUN_FILE])
+    if not os.path.isfile(fname):
+        print 'ERROR: cannot resume, no {fname}. Was --checkpoint used?'.format(
+            fname=fname)
+        sys.exit(4)
+    with open(fname) as infile:
+        run = json.load(infile)
+    options = parser.get_default_values()
+    for key, value in run['options'].iteritems():
+        setattr(options, key, value)
+    return options, run['args'], run['done']
+
+def componentsToResume(outDir, comps):
+    '''Returns the components of a previous run that are not done yet.
+    The components that were started without writing a checkpoint
+    will be processed from the beginning.'''
+    toResume = []
+    for comp in comps:
+        compDir = '/'.join([outDir, comp.name])
+        checkpoint = Checkpoint.read(compDir)
+        if checkpoint and checkpoint.done:
+            continue
+        elif checkpoint is None and os.path.isdir(compDir):
+            shutil.rmtree(compDir)
+        toResume.append(comp)
+    return toResume
+
+def makePlan(comps, config, options):
+    '''Measures the cost of the components comps on a sample of events,
+    and returns the Plan fitting the processing in options.targetTime.'''
+    from heppy.framework.planner import measure, Plan
+    from heppy.framework.parallel import count_entries
+    costs = []
+    for comp in comps:
+        nentries = count_entries(comp, config.events_class)
+        if options.nevents is not None:
+            nentries = min(nentries, options.nevents)
+        print 'measuring {name} on {n} events'.format(name=comp.name,
+                                                      n=options.planEvents)
+        costs.append(measure(comp, config, options.planEvents, nentries))
+    return Plan(costs, options.targetTime, options.maxMemory)
+
+def authKey():
+    '''Authentication key shared by the coordinator and its workers,
+    from the HEPPY_AUTHKEY environment variable. None if it is not set.
+    The messages are pickled, so the key must be kept secret:
+    there is no default key.'''
+    return os.environ.get('HEPPY_AUTHKEY') or None
+
+def randomKey():
+    '''Returns a new random key, to be used as HEPPY_AUTHKEY.'''
+    return binascii.hexlify(os.urandom(16))
+
+def runWorker(address, workDir, options):
+    '''Processes the components served by the coordinator at address.'''
+    if not os.path.isdir(workDir):
+        os.makedirs(workDir)
+    import heppy.framework.heppy_loop as ML
+    work(parse_address(address), authKey(),
+         lambda comp, outDir: ML.runLoopAsync(comp, outDir,
+                                              'heppy.__cfg_to_run__',
+                                              options),
+         workDir)
+
 _heppyGlobalOptions = {}
 
 def getHeppyOption(name,default=None):
@@ -112,6 +196,16 @@ def setHeppyOption(name,value=True):
 
 def main( options, args, parser ):
 
+    if options.resume:
+        resumeDir = options.resume
+        options, args, done = loadRun(resumeDir, parser)
+        if done:
+            print 'nothing to resume, the processing in {outDir} is done'.format(
+                outDir=resumeDir)
+            return None
+        options.resume = resumeDir
+        options.force = True
+
     if len(args) != 2:
         parser.print_help()
         print 'ERROR: please provide the processing name and the component list'
@@ -127,6 +221,10 @@ def main( options, args, parser ):
         parser.print_help()
         print 'ERROR: second argument must be an existing file (your input cfg).'
         sys.exit(3)
+    if (options.coordinator or options.worker) and authKey() is None:
+        print 'ERROR: --coordinator and --worker need a secret authentication key in the HEPPY_AUTHKEY environment variable, the same for the coordinator and its workers, e.g.:'
+        print 'export HEPPY_AUTHKEY={key}'.format(key=randomKey())
+        sys.exit(5)
 
     if options.verbose:
         import logging
@@ -143,36 +241,98 @@ def main( options, args, parser ):
         else:
             _heppyGlobalOptions[opt] = True
 
+    # the configuration usually imports ROOT directly,
+    # it must be set up before (batch mode, command line options)
+    lazyimport.preload(['ROOT'])
+
     file = open( cfgFileName, 'r' )
     sys.path.append( os.path.dirname(cfgFileName) )
 
     cfg = imp.load_source( 'heppy.__cfg_to_run__', 
                            cfgFileName, file)
 
+    if options.worker:
+        runWorker(options.worker, outDir, options)
+        return None
+
     selComps = [comp for comp in cfg.config.components if len(comp.files)>0]
+    if options.plan or options.autoPlan:
+        plan = makePlan(selComps, cfg.config, options)
+        print '\n'.join(plan.summary())
+        if options.plan:
+            return None
+        plan.apply(selComps)
+        options.ntasks = plan.nworkers
     selComps = split(selComps)
+    ranges = options.nworkers > 1 or options.rangeSize or options.coordinator
+    if ranges:
+        # each component is further divided in entry ranges
+        # processed in parallel, see merge_ranges below
+        selComps = split_in_ranges(selComps, options.nworkers,
+                                   cfg.config.events_class, options.nevents,
+                                   range_size=options.rangeSize)
     # for comp in selComps:
     #    print comp
-    if len(selComps)>options.ntasks:
+    if len(selComps)>options.ntasks and not options.rangeSize:
         print "WARNING: too many threads {tnum}, will just use a maximum of {jnum}.".format(tnum=len(selComps),jnum=options.ntasks)
     if not createOutputDir(outDir, selComps, options.force):
         print 'exiting'
         sys.exit(0)
-    if len(selComps)>1:
+    runComps = selComps
+    if options.resume:
+        runComps = componentsToResume(outDir, selComps)
+    elif options.checkpointInterval:
+        saveRun(outDir, options, args)
+    if options.coordinator:
+        shutil.copy( cfgFileName, outDir )
+        # the components are handed out to the heppy_loop --worker processes
+        coordinator = Coordinator(parse_address(options.coordinator),
+                                  outDir, authKey(),
+                                  maxRetries = options.retries)
+        print 'serving {n} components on {address}'.format(
+            n=len(runComps), address=options.coordinator)
+        failed = coordinator.run(runComps)
+    elif len(runComps)>1:
         shutil.copy( cfgFileName, outDir )
-        pool = multiprocessing.Pool(processes=min(len(selComps),options.ntasks))
         ## workaround for a scoping problem in ipython+multiprocessing
         import heppy.framework.heppy_loop as ML 
-        for comp in selComps:
-            pool.apply_async( ML.runLoopAsync, [comp, outDir, 'heppy.__cfg_to_run__', options],
-                              callback=ML.callBack)
-        pool.close()
-        pool.join()
-    else:
+        if options.preload:
+            # the workers are forked with these modules already imported
+            lazyimport.preload()
+        # the components are handed out to the workers on demand.
+        # with checkpoints, the ranges are kept for --resume
+        scheduler = Scheduler(
+            outDir,
+            lambda comp, outDir: ML.runLoopAsync(comp, outDir,
+                                                 'heppy.__cfg_to_run__',
+                                                 options),
+            options.ntasks,
+            maxRetries = options.retries,
+            localMerge = not options.checkpointInterval,
+            stopFlag = _globalGracefulStopFlag,
+            maxMemory = options.maxMemory
+        )
+        failed = scheduler.run(runComps)
+    elif runComps:
         # when running only one loop, do not use multiprocessor module.
         # then, the exceptions are visible -> use only one sample for testing
         global loop
-        loop = runLoop( comp, outDir, cfg.config, options )
+        loop = runLoop( runComps[0], outDir, cfg.config, options )
+        failed = []
+    else:
+        # resuming, and all components are done
+        failed = []
+    stopped = _globalGracefulStopFlag.value
+    if ranges:
+        if failed:
+            print 'ERROR: the following ranges failed, outputs not merged:'
+            pprint(failed)
+        elif stopped:
+            print 'processing stopped before the end, outputs not merged'
+        else:
+            merge_ranges(outDir, selComps)
+    if options.checkpointInterval and not failed and not stopped:
+        saveRun(outDir, options, args, done=True)
     return loop
 
 
@@ -210,7 +370,7 @@ def create_parser():
     parser.add_option("-t", "--timereport", 
                       dest="timeReport",
                       action='store_true',
-                      help="Make a report of the time used by each analyzer",
+                      help="Make a report of the time used by each analyzer, also written to timing.json in each output directory",
                       default=False)
     parser.add_option("-v", "--verbose",
                       dest="verbose",
@@ -233,11 +393,106 @@ def create_parser():
                       type="int",
                       help="number of parallel tasks to span",
                       default=10)
+    parser.add_option("-w", "--nworkers",
+                      dest="nworkers",
+                      type="int",
+                      help="number of worker processes sharing the events of each component. The outputs of the workers are merged at the end of the processing.",
+                      default=1)
+    parser.add_option("--range-size",
+                      dest="rangeSize",
+                      type="int",
+                      help="divide the components in ranges of at most RANGESIZE entries, handed out on demand to the -j worker processes. The outputs of the ranges are merged at the end of the processing.",
+                      default=None)
+    parser.add_option("--retries",
+                      dest="retries",
+                      type="int",
+                      help="number of times a failed component or range is processed again",
+                      default=1)
+    parser.add_option("--coordinator",
+                      dest="coordinator",
+                      type="string",
+                      help="serve the components (or the ranges, see --range-size) on COORDINATOR, host:port or the path of a Unix socket, to heppy_loop --worker processes running on any machine. The outputs sent back by the workers are merged at the end of the processing. The secret authentication key is read from the HEPPY_AUTHKEY environment variable, which must be set.",
+                      default=None)
+    parser.add_option("--worker",
+                      dest="worker",
+                      type="string",
+                      help="process the components served by the heppy_loop --coordinator at address WORKER, in the output directory given as first argument, and send the outputs back to the coordinator",
+                      default=None)
+    parser.add_option("--preload",
+                      dest="preload",
+                      action='store_true',
+                      help="import ROOT and the other heavy modules once in the main process, before starting the worker processes, instead of in each worker",
+                      default=False)
+    parser.add_option("--pipeline-workers",
+                      dest="pipelineWorkers",
+                      type="int",
+                      help="process the events of each looper with a pipeline of processes: the analyzers of the reader stage run in the reader processes, the other ones in PIPELINEWORKERS worker processes",
+                      default=0)
+    parser.add_option("--pipeline-readers",
+                      dest="pipelineReaders",
+                      type="int",
+                      help="number of reader processes of the pipeline",
+                      default=1)
+    parser.add_option("--reader-stage",
+                      dest="readerStage",
+                      type="int",
+                      help="number of analyzers, at the beginning of the sequence, run by the reader processes of the pipeline",
+                      default=1)
+    parser.add_option("--plan",
+                      dest="plan",
+                      action='store_true',
+                      help="dry run: process PLANEVENTS events of each component, and print the entrySplitFactor of the components and the number of tasks (-j) fitting the processing in TARGETTIME seconds, with the predicted processing time",
+                      default=False)
+    parser.add_option("--auto-plan",
+                      dest="autoPlan",
+                      action='store_true',
+                      help="like --plan, and process the components with the planned entrySplitFactor and number of tasks",
+                      default=False)
+    parser.add_option("--plan-events",
+                      dest="planEvents",
+                      type="int",
+                      help="number of events of each component processed by --plan",
+                      default=100)
+    parser.add_option("--target-time",
+                      dest="targetTime",
+                      type="float",
+                      help="target processing time for --plan, in seconds",
+                      default=3600.)
+    parser.add_option("--max-memory",
+                      dest="maxMemory",
+                      type="float",
+                      help="memory limit per worker process, in MB. A worker process exceeding it is replaced by a new one after its current component or range. Also used by --plan",
+                      default=None)
+    parser.add_option("-b", "--batch-size",
+                      dest="batchSize",
+                      type="int",
+                      help="number of events passed together to the analyzers implementing process_batch",
+                      default=1)
     parser.add_option("--memcheck", 
                       dest="memCheck",
                       action='store_true',
-                      help="Activate memory checks per event",
+                      help="Activate per-analyzer memory accounting with tracemalloc, or with the resident memory if tracemalloc is not available (python 2), from the third event on. The report is written to memory.txt",
                       default=False)
+    parser.add_option("--release-products",
+                      dest="releaseProducts",
+                      action='store_true',
+                      help="Delete each event product as soon as the last analyzer using it is done. Only the products declared by the analyzers are considered.",
+                      default=False)
+    parser.add_option("--product-report",
+                      dest="productReport",
+                      action='store_true',
+                      help="Report the size of the event products, also written to products.txt",
+                      default=False)
+    parser.add_option("--checkpoint",
+                      dest="checkpointInterval",
+                      type="int",
+                      help="save the state of each looper every CHECKPOINTINTERVAL events, so that the processing can be resumed with --resume",
+                      default=None)
+    parser.add_option("--resume",
+                      dest="resume",
+                      type="string",
+                      help="resume the processing saved in directory RESUME from the last checkpoints. No other argument is needed.",
+                      default=None)
     parser.add_option("-I", "--input",
                       dest="input",
                       type="str",
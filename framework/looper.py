@@ -1,18 +1,22 @@
 # Copyright (C) 2014 Colin Bernet
 # https://github.com/cbernet/heppy/blob/master/LICENSE
 
-import ROOT 
-ROOT.PyConfig.IgnoreCommandLineOptions = True
 import os
 import sys
 import imp
 import logging
 import pprint
-from math import ceil
 from event import Event
 import timeit
 from heppy.framework.exceptions import UserStop
-import resource
+from heppy.framework.parallel import fine_split_range, create_events, \
+     component_base_name, clamp_range
+from heppy.framework.profiling import TimeReport
+from heppy.framework.memcheck import MemoryReport
+from heppy.framework.products import ProductStore
+from heppy.framework.checkpoint import Checkpoint
+from heppy.framework.pipeline import run_pipeline
+from heppy.statistics import rrandom as random
 import json
 
 class Setup(object):
@@ -60,7 +64,15 @@ class Looper(object):
                   timeReport=False,
                   quiet=False,
                   memCheckFromEvent=-1,
-                  stopFlag = None):
+                  stopFlag = None,
+                  batchSize=1,
+                  releaseProducts=False,
+                  productReport=False,
+                  checkpointInterval=None,
+                  resume=False,
+                  nWorkers=0,
+                  nReaders=1,
+                  readerStage=1):
         """Handles the processing of an event sample.
         An Analyzer is built for each Config.Analyzer present
         in sequence. The Looper can then be used to process an event,
@@ -72,16 +84,50 @@ class Looper(object):
         nEvents : number of events to process. Defaults to all.
         firstEvent : first event to process. Defaults to the first one.
         nPrint  : number of events to print at the beginning
-    
+        timeReport : if True, report the latency of each analyzer, see TimeReport
+        memCheckFromEvent : if >= 0, report the memory allocated by each 
+                  analyzer from this event on, see MemoryReport
+
         stopFlag: it should be a multiprocessing.Value instance, that is set to 1 
                   when this thread, or any other, receives a SIGUSR2 to ask for
                   a graceful job termination. In this case, the looper will also
                   set up a signal handler for SIGUSR2.
                   (if set to None, nothing of all this happens)
+
+        batchSize: number of events processed together. If larger than 1, 
+                  the analyzers implementing process_batch receive blocks of 
+                  batchSize events, see Analyzer.process_batch. 
+                  Only used if the events backend supports indexing.
+
+        releaseProducts: if True, the event products are deleted as soon as 
+                  the last analyzer using them is done, see ProductStore. 
+                  The products listed in config.keep_products are never deleted.
+        productReport: if True, report the size of the event products,
+                  see ProductStore
+
+        checkpointInterval: if set, the state of the looper is saved every
+                  checkpointInterval events, see Checkpoint.
+                  Only used if the events backend supports indexing.
+        resume  : if True and if the output directory contains a checkpoint,
+                  the loop is resumed from this checkpoint, in this directory.
+
+        nWorkers: if larger than 0, the events are processed by a pipeline
+                  of processes, see heppy.framework.pipeline: 
+                  the first readerStage analyzers of the sequence 
+                  are run by nReaders reader processes, and the other 
+                  analyzers by nWorkers worker processes.
+                  Only used if the events backend supports indexing.
         """
 
         self.config = config
-        self.name = self._prepareOutput(name)
+        self.checkpoint = Checkpoint.read(name) if resume else None
+        if self.checkpoint and self.checkpoint.done:
+            raise ValueError('nothing to resume, the loop in {name} is done'.format(
+                name=name))
+        elif self.checkpoint:
+            self.name = name
+        else:
+            self.name = self._prepareOutput(name)
         self.outDir = self.name
         self.logger = logging.getLogger( self.name )
         self.logger.addHandler(logging.FileHandler('/'.join([self.name,
@@ -92,13 +138,37 @@ class Looper(object):
 
         self.cfg_comp = config.components[0]
         self.classes = {}
-        self.analyzers = map( self._build, config.sequence )
+        self.sequence = self._activeSequence(config.sequence)
+        self.analyzers = map( self._build, self.sequence )
         self.nEvents = nEvents
         self.firstEvent = firstEvent
         self.nPrint = int(nPrint)
-        self.timeReport = [ {'time':0.0,'events':0} for a in self.analyzers ] if timeReport else False
-        self.memReportFirstEvent = memCheckFromEvent
-        self.memLast=0
+        self.timeReport = TimeReport([ana.name for ana in self.analyzers]) if timeReport else False
+        self.memReport = MemoryReport(self.analyzers, memCheckFromEvent) \
+                         if memCheckFromEvent >= 0 else None
+        self.products = None
+        if releaseProducts or productReport:
+            self.products = ProductStore(self.sequence,
+                                         getattr(config, 'keep_products', None),
+                                         release=releaseProducts,
+                                         debug=productReport)
+        self.batchSize = int(batchSize)
+        self.stages = self._build_stages()
+        # options of the loopers of the pipeline processes
+        self.loopOptions = dict(nPrint=self.nPrint,
+                                timeReport=bool(timeReport),
+                                memCheckFromEvent=memCheckFromEvent,
+                                stopFlag=stopFlag,
+                                batchSize=self.batchSize,
+                                releaseProducts=releaseProducts,
+                                productReport=productReport)
+        self.checkpointInterval = checkpointInterval
+        self.nWorkers = nWorkers
+        self.nReaders = nReaders
+        self.readerStage = readerStage
+        if nWorkers and (checkpointInterval or self.checkpoint):
+            raise ValueError('checkpoints are not supported in pipeline mode')
+        self.stopped = False
         self.stopFlag = stopFlag
         if stopFlag:
             import signal
@@ -106,9 +176,6 @@ class Looper(object):
                 print 'SIGUSR2 received, signaling graceful stop'
                 self.stopFlag.value = 1
             signal.signal(signal.SIGUSR2, doSigUsr2)
-        tree_name = None
-        if( hasattr(self.cfg_comp, 'tree_name') ):
-            tree_name = self.cfg_comp.tree_name
         if len(self.cfg_comp.files)==0:
             errmsg = 'please provide at least an input file in the files attribute of this component\n' + str(self.cfg_comp)
             raise ValueError( errmsg )
@@ -119,24 +186,28 @@ class Looper(object):
                                                       nEvents)
         if hasattr(self.cfg_comp,"options"):
               print self.cfg_comp.files,self.cfg_comp.options
-              self.events = config.events_class(self.cfg_comp.files,
-                                                tree_name,
-                                                options=self.cfg_comp.options)
-        else :
-              self.events = config.events_class(self.cfg_comp.files, tree_name)
-        if hasattr(self.cfg_comp, 'fineSplit'):
+        # the events are restricted to the component entry_list, if any,
+        # and only the branches read by the sequence are activated
+        # if the branches option of the component is 'auto'
+        self.events = create_events(self.cfg_comp, config.events_class,
+                                    self.sequence)
+        if hasattr(self.cfg_comp, 'entryRange'):
+            # range of entries assigned to this looper, see framework.parallel,
+            # and its first nEvents events if nEvents is set
+            self.firstEvent, self.nEvents = clamp_range(self.cfg_comp.entryRange,
+                                                        nEvents)
+        elif hasattr(self.cfg_comp, 'fineSplit'):
             fineSplitIndex, fineSplitFactor = self.cfg_comp.fineSplit
             if fineSplitFactor > 1:
                 if len(self.cfg_comp.files) != 1:
                     raise RuntimeError("Any component with fineSplit > 1 is supposed to have just a single file, while %s has %s" % (self.cfg_comp.name, self.cfg_comp.files))
                 totevents = min(len(self.events),int(nEvents)) if (nEvents and int(nEvents) not in [-1,0]) else len(self.events)
-                self.nEvents = int(ceil(totevents/float(fineSplitFactor)))
-                self.firstEvent = firstEvent + fineSplitIndex * self.nEvents
-                if self.firstEvent + self.nEvents >= totevents:
-                    self.nEvents = totevents - self.firstEvent 
+                self.firstEvent, self.nEvents = fine_split_range(self.cfg_comp.fineSplit,
+                                                                 totevents, firstEvent)
                 #print "For component %s will process %d events starting from the %d one, ending at %d excluded" % (self.cfg_comp.name, self.nEvents, self.firstEvent, self.nEvents + self.firstEvent)
         # self.event is set in self.process
         self.event = None
+        self.pipelined = False
         services = dict()
         for cfg_serv in config.services:
             service = self._build(cfg_serv)
@@ -146,6 +217,17 @@ class Looper(object):
         # but cannot copy the autofill config.
         self.setup = Setup(config, services)
 
+    def _activeSequence(self, sequence):
+        '''Returns the analyzers to run. The analyzers before an analyzer
+        restoring their products, e.g. a ProductCache in replay mode, 
+        are not run.'''
+        first = 0
+        for index, cfg_ana in enumerate(sequence):
+            replaces = getattr(cfg_ana.class_object, 'replaces_upstream', None)
+            if replaces and replaces(cfg_ana):
+                first = index
+        return sequence[first:]
+
     def _build(self, cfg):
         try: 
             theClass = cfg.class_object
@@ -193,7 +275,8 @@ Make sure that the configuration object is of class cfg.Analyzer.
 
         At the beginning of the loop, 
         Analyzer.beginLoop is called for each Analyzer.
-        At each event, self.process is called.
+        At each event, self.process is called, 
+        or, if batchSize > 1, self.process_batch is called for each block of events.
         At the end of the loop, Analyzer.endLoop is called.
         """
         nEvents = self.nEvents
@@ -204,18 +287,55 @@ Make sure that the configuration object is of class cfg.Analyzer.
             nEvents = len(self.events) - firstEvent
         else:
             nEvents = int(nEvents)
+        lastEvent = firstEvent + nEvents
+        if self.checkpoint:
+            firstEvent = self.checkpoint.iEv
+            self.nEvProcessed = self.checkpoint.nEvProcessed
+            if self.checkpoint.random_state:
+                random.setstate(self.checkpoint.random_state)
+            self.logger.warning('resuming from {checkpoint}'.format(
+                checkpoint=self.checkpoint))
         self.logger.info(
             'starting loop at event {firstEvent} '\
                 'to process {nEvents} events.'.format(firstEvent=firstEvent,
-                                                        nEvents=nEvents))
+                                                        nEvents=lastEvent-firstEvent))
         self.logger.info( str( self.cfg_comp ) )
+        if self.nWorkers and hasattr(self.events, '__getitem__'):
+            self.nEvProcessed = run_pipeline(self, firstEvent, lastEvent,
+                                             self.nReaders, self.nWorkers,
+                                             self.readerStage)
+            self.pipelined = True
+            self._write_nevents()
+            return
         for analyzer in self.analyzers:
-            analyzer.beginLoop(self.setup)
+            if self.checkpoint:
+                if not analyzer.checkpoints_outputs():
+                    self.logger.warning(
+                        'the outputs of {name} are not saved in checkpoints, '
+                        'they only contain the events processed after '
+                        'resuming'.format(name=analyzer.name))
+                analyzer.restore(self.setup,
+                                 self.checkpoint.states[analyzer.name])
+            else:
+                analyzer.beginLoop(self.setup)
+        if self.checkpoint and self.setup.services:
+            self.logger.warning(
+                'the services are started again: the objects they own, '
+                'e.g. the histograms of a TFileService, only contain the events '
+                'processed after resuming, unless the analyzers filling them '
+                'save them in checkpoint')
+        if self.timeReport:
+            self.timeReport.start()
+        if self.memReport:
+            self.memReport.start()
 
         if hasattr(self.events, '__getitem__'):
             # events backend supports indexing, e.g. CMS, FCC, bare root
-            for iEv in range(firstEvent, firstEvent+nEvents):
-                if iEv%100 == 0:
+            if self.checkpointInterval:
+                self.write_checkpoint(firstEvent)
+            for iEv in range(firstEvent, lastEvent, self.batchSize):
+                lastEv = min(iEv+self.batchSize, lastEvent)
+                if iEv%100 == 0 or iEv/100 != (lastEv-1)/100:
                     if not hasattr(self,'start_time'):
                         self.logger.info( 'event {iEv}'.format(iEv=iEv))
                         self.start_time = timeit.default_timer()
@@ -223,12 +343,33 @@ Make sure that the configuration object is of class cfg.Analyzer.
                     else:
                         self.logger.warning( 'event %d (%.1f ev/s)' % (iEv, (iEv-self.start_time_event)/float(timeit.default_timer() - self.start_time)) )
                 try:
-                    self.process( iEv )
-                    self.nEvProcessed += 1
-                    if iEv<self.nPrint:
-                        self.logger.info(self.event.__str__())
+                    if self.batchSize > 1:
+                        self.process_batch( range(iEv, lastEv) )
+                        self.nEvProcessed += lastEv - iEv
+                        for event in self.batch:
+                            if event.iEv<self.nPrint:
+                                self.logger.info(event.__str__())
+                    else:
+                        self.process( iEv )
+                        self.nEvProcessed += 1
+                        if iEv<self.nPrint:
+                            self.logger.info(self.event.__str__())
+                    if self.timeReport:
+                        self.timeReport.tick(self.nEvProcessed)
+                    if self.memReport and self.memReport.checks(iEv):
+                        self.memReport.end_event(lastEv - iEv)
+                    if self.products:
+                        events = self.batch if self.batchSize > 1 else [self.event]
+                        for event in events:
+                            self.products.end_event(event)
+                    if self.checkpointInterval and \
+                       self.nEvProcessed - self.lastCheckpoint >= self.checkpointInterval:
+                        self.write_checkpoint(lastEv)
                     if self.stopFlag and self.stopFlag.value:
-                        print 'stopping gracefully at event %d' % (iEv)
+                        print 'stopping gracefully at event %d' % (lastEv-1)
+                        self.stopped = True
+                        if self.checkpointInterval:
+                            self.write_checkpoint(lastEv)
                         break
                 except UserStop as err:
                     print 'Stopped loop following a UserStop exception:'
@@ -255,6 +396,12 @@ Make sure that the configuration object is of class cfg.Analyzer.
                     self.nEvProcessed += 1
                     if iEv<self.nPrint:
                         self.logger.info(self.event.__str__())
+                    if self.timeReport:
+                        self.timeReport.tick(self.nEvProcessed)
+                    if self.memReport and self.memReport.checks(iEv):
+                        self.memReport.end_event()
+                    if self.products:
+                        self.products.end_event(self.event)
                     if self.stopFlag and self.stopFlag.value:
                         print 'stopping gracefully at event %d' % (iEv)
                         break
@@ -270,28 +417,38 @@ Make sure that the configuration object is of class cfg.Analyzer.
         for analyzer in self.analyzers:
             analyzer.endLoop(self.setup)
         if self.timeReport:
-            allev = max([x['events'] for x in self.timeReport])
-            warning("\n      ---- TimeReport (all times in ms; first evt is skipped) ---- ")
-            warning("%9s   %9s    %9s   %9s %6s   %s" % ("processed","all evts","time/proc", " time/all", "  [%] ", "analyer"))
-            warning("%9s   %9s    %9s   %9s %6s   %s" % ("---------","--------","---------", "---------", " -----", "-------------"))
-            sumtime = sum(rep['time'] for rep in self.timeReport)
-            passev  = self.timeReport[-1]['events']
-            for ana,rep in zip(self.analyzers,self.timeReport):
-                timePerProcEv = rep['time']/(rep['events']-1) if rep['events'] > 1 else 0
-                timePerAllEv  = rep['time']/(allev-1)         if allev > 1         else 0
-                fracAllEv     = rep['time']/sumtime
-                warning( "%9d   %9d   %10.2f  %10.2f %5.1f%%   %s" % ( rep['events'], allev, 1000*timePerProcEv, 1000*timePerAllEv, 100.0*fracAllEv, ana.name))
-            totPerProcEv = sumtime/(passev-1) if passev > 1 else 0
-            totPerAllEv  = sumtime/(allev-1)  if allev > 1  else 0
-            warning("%9s   %9s    %9s   %9s   %s" % ("---------","--------","---------", "---------", "-------------"))
-            warning("%9d   %9d   %10.2f  %10.2f %5.1f%%   %s" % ( passev, allev, 1000*totPerProcEv, 1000*totPerAllEv, 100.0, "TOTAL"))
-            warning("")
+            self.timeReport.tick(self.nEvProcessed, force=True)
+            for line in self.timeReport.summary():
+                warning(line)
+            self.timeReport.write('/'.join([self.name, 'timing.json']))
+        if self.memReport:
+            self.memReport.stop()
+            for line in self.memReport.summary():
+                warning(line)
+            self.memReport.write('/'.join([self.name, 'memory.txt']))
+        if self.products and self.products.debug:
+            for line in self.products.summary():
+                self.logger.warning(line)
+            self.products.write('/'.join([self.name, 'products.txt']))
+        self._write_nevents()
+
+    def _write_nevents(self):
         logfile = open('/'.join([self.name,'log.txt']),'a')
         logfile.write('number of events processed: {nEv}\n'.format(
             nEv=self.nEvProcessed)
         )
         logfile.close()
 
+    def write_checkpoint(self, iEv, done=False):
+        """Saves the state of the analyzers to a Checkpoint,
+        iEv being the index of the next event to process."""
+        states = dict( (analyzer.name, analyzer.checkpoint(self.setup))
+                       for analyzer in self.analyzers )
+        checkpoint = Checkpoint(iEv, self.nEvProcessed, states,
+                                random.getstate(), done)
+        checkpoint.write(self.name)
+        self.lastCheckpoint = self.nEvProcessed
+
     def process(self, iEv ):
         """Run event processing for all analyzers in the sequence.
 
@@ -312,31 +469,129 @@ possibly skipping a number of events at the beginning.
         self.iEvent = iEv
         return self._run_analyzers_on_event()
 
-    def _run_analyzers_on_event(self):
+    def process_batch(self, iEvs):
+        """Run event processing for all analyzers on a batch of events.
+
+        The events are stored in self.batch. 
+        Returns the list of events that passed all analyzers.
+        """
+        self.batch = [Event(iEv, None, self.setup) for iEv in iEvs]
+        return self._run_analyzers_on_batch(self.batch)
+
+    def _build_stages(self):
+        '''Group the analyzers in stages for batch processing.
+
+        Returns a list of (batch, indices) tuples, where indices are the 
+        indices of the analyzers in the stage. A stage is either a single 
+        analyzer implementing process_batch (batch is True), or a 
+        series of consecutive analyzers processing events one by one 
+        (batch is False).
+        '''
+        stages = []
+        for i, analyzer in enumerate(self.analyzers):
+            batch = getattr(analyzer, 'batch_processing', lambda: False)()
+            if batch or not stages or stages[-1][0]:
+                stages.append( (batch, [i]) )
+            else:
+                stages[-1][1].append(i)
+        return stages
+
+    def _run_analyzers_on_batch(self, events):
+        '''Run all analyzers on a list of events, stage by stage.
+        Returns the list of events that passed all analyzers.
+        '''
+        for batch, indices in self.stages:
+            if not events:
+                break
+            if batch:
+                i = indices[0]
+                analyzer = self.analyzers[i]
+                if not analyzer.beginLoopCalled:
+                    analyzer.beginLoop(self.setup)
+                nin, first = len(events), events[0].iEv
+                if random.per_event():
+                    # the analyzer seeds the random numbers of each event
+                    # with this key, see Analyzer.seed_event
+                    for event in events:
+                        event.random_key = self._random_key(event)
+                memcheck = self.memReport and self.memReport.checks(first)
+                if memcheck:
+                    self.memReport.before()
+                start = timeit.default_timer()
+                mask = analyzer.process_batch(events)
+                elapsed = timeit.default_timer() - start
+                if memcheck:
+                    self.memReport.after(i, first, nin)
+                if mask is not None:
+                    events = [event for event, keep in zip(events, mask) if keep]
+                if self.products:
+                    self.products.release_batch(events, i)
+                if self.timeReport:
+                    self.timeReport.record(i, elapsed, first, nin, len(events))
+            else:
+                passed = []
+                for event in events:
+                    # all events of the batch share the same input cursor,
+                    # it needs to point to the current event
+                    if self.event is not event:
+                        event.input = self.events[event.iEv]
+                        self.event = event
+                        self.iEvent = event.iEv
+                    if self._run_analyzers_on_event(indices)[0]:
+                        passed.append(event)
+                events = passed
+        return events
+
+    def _random_key(self, event):
+        '''Returns the key identifying event for the random numbers,
+        which does not depend on the way the component is split:
+        (component, file, entry in file) if the events backend
+        can locate the entries, (component, event index) otherwise.
+        The file is given by its path, as different directories
+        often hold files with the same name.
+        The key can also be set in the random_key attribute of the event,
+        e.g. by the pipeline.
+        '''
+        key = getattr(event, 'random_key', None)
+        if key is not None:
+            return key
+        name = component_base_name(self.cfg_comp.name)
+        locate = getattr(self.events, 'locate', None)
+        if locate is not None:
+            fname, entry = locate(event.iEv)
+            return (name, os.path.normpath(fname), entry)
+        return (name, event.iEv)
+
+    def _run_analyzers_on_event(self, indices=None):
         '''Run all analysers on the current event, self.event. 
+        If indices is provided, only run the analyzers with these indices 
+        in the sequence. 
         Returns a tuple (success?, last_analyzer_name).
         '''
-        for i,analyzer in enumerate(self.analyzers):
+        if indices is None:
+            indices = range(len(self.analyzers))
+        seeding = random.per_event()
+        for i in indices:
+            analyzer = self.analyzers[i]
             if not analyzer.beginLoopCalled:
                 analyzer.beginLoop(self.setup)
+            if seeding:
+                random.seed_event(*(self._random_key(self.event) +
+                                    (analyzer.name,)))
+            memcheck = self.memReport and self.memReport.checks(self.iEvent)
+            if memcheck:
+                self.memReport.before()
             start = timeit.default_timer()
-            if self.memReportFirstEvent >=0 and iEv >= self.memReportFirstEvent:           
-                memNow=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-                if memNow > self.memLast :
-                   print  "Mem Jump detected before analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, iEv, self.memLast, memNow, memNow-self.memLast)
-                self.memLast=memNow
             ret = analyzer.process( self.event )
-            if self.memReportFirstEvent >=0 and iEv >= self.memReportFirstEvent:           
-                memNow=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-                if memNow > self.memLast :
-                   print "Mem Jump detected in analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, iEv, self.memLast, memNow, memNow-self.memLast)
-                self.memLast=memNow
+            if memcheck:
+                self.memReport.after(i, self.iEvent)
             if self.timeReport:
-                self.timeReport[i]['events'] += 1
-                if self.timeReport[i]['events'] > 0:
-                    self.timeReport[i]['time'] += timeit.default_timer() - start
+                self.timeReport.record(i, timeit.default_timer() - start,
+                                       self.iEvent, nout=int(ret != False))
             if ret == False:
                 return (False, analyzer.name)
+            if self.products:
+                self.products.release(self.event, i)
         return (True, analyzer.name)
 
     def write(self):
@@ -344,9 +599,15 @@ possibly skipping a number of events at the beginning.
 
         See Analyzer.Write for more information.
         """
-        for analyzer in self.analyzers:
-            analyzer.write(self.setup)
+        if not self.pipelined:
+            # in pipeline mode, the analyzers are written by the processes
+            # of the pipeline
+            for analyzer in self.analyzers:
+                analyzer.write(self.setup)
         self.setup.close() 
+        if self.checkpointInterval and not self.stopped:
+            # the outputs are complete, there is nothing left to resume
+            Checkpoint(None, self.nEvProcessed, dict(), done=True).write(self.name)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,213 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Per-analyzer memory accounting, used by the Looper when memCheckFromEvent >= 0.
+
+The MemoryReport relies on the tracemalloc module to:
+
+* measure the net amount of memory allocated by each analyzer for each event,
+  i.e. the memory that is still allocated when the analyzer returns.
+  A steady leak shows up as a cumulated net allocation that grows with
+  the number of events;
+* periodically compare a snapshot of all allocations to a baseline snapshot
+  taken at the first checked event, to find the source lines responsible
+  for the growth of the memory (leak suspects).
+  Each suspect is attributed to the analyzer found in its traceback.
+
+tracemalloc is part of python >= 3.4. Without it, e.g. on python 2.7,
+the MemoryReport falls back on the current resident memory of the process
+(from /proc/self/statm), measured before and after each analyzer.
+The net growth of the resident memory is attributed to the analyzer,
+which also shows steady leaks, but is less precise than tracemalloc:
+the memory freed by python is not always returned to the system,
+and small allocations may not grow the resident memory.
+No leak suspects are then given.
+
+The report is printed and written to memory.txt in the looper directory
+at the end of the loop.
+'''
+
+import os
+import sys
+import inspect
+import resource
+
+def max_rss():
+    '''Returns the maximum resident memory of the process, in bytes.'''
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in kB on linux, in bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+def rss():
+    '''Returns the current resident memory of the process, in bytes,
+    or the maximum one if procfs is not available.'''
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        return max_rss()
+
+
+class MemoryReport(object):
+    '''tracemalloc-based memory accounting for the analyzers of a sequence,
+    or based on the resident memory if tracemalloc is not available.'''
+
+    # number of events between two leak suspect updates
+    snapshot_interval = 100
+
+    def __init__(self, analyzers, firstEvent=0, ntop=10, nframes=25):
+        '''
+        analyzers: list of analyzers in the sequence
+        firstEvent: first event for which the memory is checked
+        ntop: number of leak suspects to keep
+        nframes: number of frames stored in the traceback of each allocation.
+          it should be large enough for the analyzer process method to appear
+          in the traceback.
+        '''
+        try:
+            import tracemalloc
+        except ImportError:
+            tracemalloc = None
+        self.tracemalloc = tracemalloc
+        self.names = [ana.name for ana in analyzers]
+        self.sources = [self._source(ana) for ana in analyzers]
+        self.firstEvent = firstEvent
+        self.ntop = ntop
+        self.nframes = nframes
+        self.net = [0] * len(analyzers)
+        self.max_net = [(0, None)] * len(analyzers)
+        self.nevents = 0
+        self.current = 0
+        self.baseline = None
+        self.suspects = []
+
+    @staticmethod
+    def _source(analyzer):
+        '''Returns the source file of the class of the analyzer, and the 
+        range of lines of the class definition.'''
+        cls = analyzer.__class__
+        module = sys.modules.get(cls.__module__)
+        fname = getattr(module, '__file__', None)
+        if fname is None:
+            return None, 0, 0
+        fname = os.path.splitext(os.path.abspath(fname))[0] + '.py'
+        try:
+            lines, first = inspect.getsourcelines(cls)
+            return fname, first, first + len(lines)
+        except (IOError, TypeError):
+            return fname, 0, sys.maxsize
+
+    def start(self):
+        if self.tracemalloc and not self.tracemalloc.is_tracing():
+            self.tracemalloc.start(self.nframes)
+
+    def stop(self):
+        if self.baseline is not None:
+            self.update_suspects()
+        if self.tracemalloc:
+            self.tracemalloc.stop()
+
+    def memory(self):
+        '''Returns the memory traced by tracemalloc, 
+        or the resident memory, in bytes.'''
+        if self.tracemalloc:
+            return self.tracemalloc.get_traced_memory()[0]
+        return rss()
+
+    def checks(self, iEv):
+        '''Returns True if the memory is checked for event iEv.'''
+        return iEv >= self.firstEvent
+
+    def before(self):
+        '''To be called before running an analyzer.'''
+        self.current = self.memory()
+
+    def after(self, index, iEv, nevents=1):
+        '''To be called after running analyzer index on nevents events,
+        the first of them being iEv.'''
+        now = self.memory()
+        net = now - self.current
+        self.net[index] += net
+        per_event = float(net) / nevents
+        if per_event > self.max_net[index][0]:
+            self.max_net[index] = (per_event, iEv)
+        self.current = now
+
+    def end_event(self, nevents=1):
+        '''To be called when the processing of nevents events is done.'''
+        previous = self.nevents
+        self.nevents += nevents
+        if not self.tracemalloc:
+            return
+        if self.baseline is None:
+            self.baseline = self._snapshot()
+        elif self.nevents // self.snapshot_interval != previous // self.snapshot_interval:
+            self.update_suspects()
+
+    def _snapshot(self):
+        tracemalloc = self.tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def _analyzer(self, traceback):
+        '''Returns the name of the analyzer in the traceback of an allocation.'''
+        for frame in traceback:
+            for name, (fname, first, last) in zip(self.names, self.sources):
+                if frame.filename == fname and first <= frame.lineno < last:
+                    return name
+        return None
+
+    def update_suspects(self):
+        '''Find the source lines with the largest growth of allocated memory
+        since the baseline snapshot.'''
+        stats = self._snapshot().compare_to(self.baseline, 'traceback')
+        suspects = [stat for stat in stats if stat.size_diff > 0]
+        self.suspects = [(stat, self._analyzer(stat.traceback))
+                         for stat in suspects[:self.ntop]]
+
+    def summary(self):
+        '''Returns a printable summary, as a list of lines.'''
+        lines = []
+        if self.tracemalloc:
+            lines.append("\n      ---- MemoryReport (net allocations, in kB) ---- ")
+        else:
+            lines.append("\n      ---- MemoryReport (growth of the resident memory, in kB) ---- ")
+        lines.append("checked events: {nev}".format(nev=self.nevents))
+        header = "%12s %12s %12s %9s   %s"
+        lines.append(header % ("total", "per event", "max event", "at event", "analyzer"))
+        lines.append(header % ("-"*12, "-"*12, "-"*12, "-"*9, "-------------"))
+        for name, net, (max_net, max_iEv) in zip(self.names, self.net, self.max_net):
+            per_event = float(net) / self.nevents if self.nevents else 0.
+            lines.append("%12.1f %12.3f %12.1f %9s   %s" % (
+                net / 1024., per_event / 1024., max_net / 1024.,
+                max_iEv, name))
+        lines.append("")
+        if not self.tracemalloc:
+            lines.append("no leak suspects, tracemalloc is not available")
+            lines.append("")
+            return lines
+        lines.append("top {ntop} leak suspects, growth since event {first}:".format(
+            ntop=self.ntop, first=self.firstEvent))
+        for stat, analyzer in self.suspects:
+            # most recent frame, where the allocation was done
+            location = stat.traceback.format(limit=1)[0].strip()
+            lines.append("%12.1f kB %8d blocks   %s   [%s]" % (
+                stat.size_diff / 1024., stat.count_diff,
+                location, analyzer))
+        lines.append("")
+        return lines
+
+    def write(self, fname):
+        '''Write the summary and the tracebacks of the leak suspects
+        to file fname.'''
+        with open(fname, 'w') as out:
+            out.write('\n'.join(self.summary()))
+            for stat, analyzer in self.suspects:
+                out.write('\n{size:.1f} kB, analyzer {ana}\n'.format(
+                    size=stat.size_diff / 1024., ana=analyzer))
+                out.write('\n'.join(stat.traceback.format()))
+                out.write('\n')
@@ -0,0 +1,296 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Processing of a single component by several workers.
+
+The entry range of a component is divided in smaller ranges,
+each range being processed by a separate Looper, in a separate process.
+The outputs of the workers are then merged back into a single
+output directory for the component.
+
+Example, to process a component with 8 workers::
+
+  ranges = split_in_ranges([comp], 8, config.events_class)
+  # run a Looper for each component in ranges,
+  # writing to outdir/<range.name>
+  merge_ranges(outdir, ranges)
+'''
+
+import os
+import re
+import copy
+import glob
+import shutil
+from math import ceil
+
+from heppy.scripts.heppy_hadd import haddRec
+from heppy.framework.dependencies import input_branches
+from heppy.framework.fileindex import FileIndex, entry_offsets, locate
+
+RANGE_TAG = '_Range'
+CHUNK_TAG = '_Chunk'
+WORKER_TAG = '_Worker'
+
+def entry_ranges(nentries, nranges, first=0):
+    '''Divides nentries entries starting at entry first in nranges
+    contiguous ranges of (almost) equal size.
+
+    Returns a list of (firstEvent, nEvents) tuples.
+    Empty ranges are not returned, so that the list can be
+    shorter than nranges if nentries < nranges.
+    '''
+    if nranges < 1:
+        raise ValueError('the number of ranges must be at least 1')
+    size, remainder = divmod(nentries, nranges)
+    ranges = []
+    start = first
+    for irange in range(nranges):
+        nevents = size + 1 if irange < remainder else size
+        if nevents == 0:
+            break
+        ranges.append( (start, nevents) )
+        start += nevents
+    return ranges
+
+
+def fine_split_range(fineSplit, totevents, firstEvent=0):
+    '''Returns the (firstEvent, nEvents) range corresponding to a
+    component with a fineSplit = (index, factor) attribute.'''
+    fineSplitIndex, fineSplitFactor = fineSplit
+    nEvents = int(ceil(totevents/float(fineSplitFactor)))
+    firstEvent = firstEvent + fineSplitIndex * nEvents
+    if firstEvent + nEvents >= totevents:
+        nEvents = totevents - firstEvent
+    return firstEvent, nEvents
+
+
+def create_events(comp, events_class, sequence=None):
+    '''Returns an instance of events_class reading the files of component comp.
+    The options, entry_list and file_index attributes of the component, 
+    if present, are passed to events_class.
+
+    If the branches option is set to 'auto', it is replaced by the input
+    branches read by the analyzers of the sequence, see
+    heppy.framework.dependencies.input_branches, or by None (all branches)
+    if they cannot be inferred.'''
+    tree_name = getattr(comp, 'tree_name', None)
+    kwargs = dict()
+    if hasattr(comp, 'options'):
+        options = comp.options
+        if isinstance(options, dict) and options.get('branches') == 'auto':
+            branches = input_branches(sequence) if sequence is not None else None
+            options = dict(options, branches=branches)
+        kwargs['options'] = options
+    if getattr(comp, 'entry_list', None):
+        kwargs['entry_list'] = comp.entry_list
+    if getattr(comp, 'file_index', None):
+        kwargs['index'] = comp.file_index
+    return events_class(comp.files, tree_name, **kwargs)
+
+
+def count_entries(comp, events_class):
+    '''Returns the number of entries in the files of component comp,
+    as seen by an instance of events_class.'''
+    return len(create_events(comp, events_class))
+
+
+def clamp_range(erange, nevents=None):
+    '''Returns the entry range erange = (firstEvent, nEvents),
+    reduced to its first nevents events if nevents is set.'''
+    first, n = erange
+    if nevents and int(nevents) not in [-1, 0]:
+        n = min(n, int(nevents))
+    return first, n
+
+
+def component_range(comp, nentries, nevents=None):
+    '''Returns the (firstEvent, nEvents) range to be processed for comp.
+
+    nentries is the total number of entries in the files of the component,
+    and nevents the maximum number of events to process (None for all).
+    '''
+    totevents = nentries
+    if nevents and int(nevents) not in [-1, 0]:
+        totevents = min(nentries, int(nevents))
+    if hasattr(comp, 'entryRange'):
+        return clamp_range(comp.entryRange, nevents)
+    elif hasattr(comp, 'fineSplit') and comp.fineSplit[1] > 1:
+        return fine_split_range(comp.fineSplit, totevents)
+    else:
+        return 0, totevents
+
+
+def split_in_ranges(comps, nranges, events_class, nevents=None,
+                    range_size=None):
+    '''Splits each component in comps in nranges components,
+    each of them covering a range of entries.
+    If range_size is set, each component is instead split in ranges 
+    of at most range_size entries.
+
+    The entry range is stored in the entryRange attribute of the new
+    components, and understood by the Looper.
+    The new components are named <name>_Range<index>.
+    '''
+    rangeComps = []
+    for comp in comps:
+        nentries = count_entries(comp, events_class)
+        first, ntot = component_range(comp, nentries, nevents)
+        if range_size:
+            nranges = max(1, int(ceil(ntot / float(range_size))))
+        for irange, erange in enumerate(entry_ranges(ntot, nranges, first)):
+            newComp = copy.deepcopy(comp)
+            if hasattr(newComp, 'fineSplit'):
+                del newComp.fineSplit
+            newComp.entryRange = erange
+            newComp.name = '{name}{tag}{index}'.format(name=comp.name,
+                                                       tag=RANGE_TAG,
+                                                       index=irange)
+            rangeComps.append(newComp)
+    return rangeComps
+
+
+def balanced_chunks(nentries, nchunks):
+    '''Divides files holding nentries entries in nchunks chunks
+    with (almost) the same number of entries.
+
+    A chunk can start and end in the middle of a file.
+    Returns, for each chunk, the indices of the first and last files
+    of the chunk, the first entry in the first file, and the number of entries.
+    '''
+    offsets = entry_offsets(nentries)
+    chunks = []
+    for first, nevents in entry_ranges(offsets[-1], nchunks):
+        if nevents == 0:
+            continue
+        ifirst, local = locate(offsets, first)
+        ilast, _ = locate(offsets, first + nevents - 1)
+        chunks.append((ifirst, ilast, local, nevents))
+    return chunks
+
+
+def split_by_entries(comp, nchunks):
+    '''Splits component comp in nchunks components
+    with (almost) the same number of entries.
+
+    The number of entries of each file is taken from the FileIndex
+    given by the file_index attribute of the component, if any,
+    otherwise each file is opened once.
+    The files of each new component are the ones covered by its chunk,
+    and its entryRange attribute holds the range of entries of the chunk
+    in these files, which is understood by the Looper.
+    The new components are named <name>_Chunk<index>.
+
+    The chunks are cut on the entries of the trees, so a component
+    with an entry_list cannot be split by entries.
+    '''
+    if getattr(comp, 'entry_list', None):
+        raise ValueError('cannot split by entries the component {} '
+                         'with an entry_list'.format(comp.name))
+    index = FileIndex(getattr(comp, 'file_index', None))
+    tree_name = getattr(comp, 'tree_name', None)
+    nentries = []
+    for fname in comp.files:
+        trees = index.trees(fname)
+        if trees is None:
+            raise ValueError('cannot split by entries the remote file ' + fname)
+        if tree_name is None:
+            if len(trees) != 1:
+                raise ValueError(
+                    'several trees in {}, set the tree_name of the component'.format(fname))
+            tree_name = trees.keys()[0]
+        nentries.append(trees[tree_name])
+    index.save()
+    chunkComps = []
+    for ichunk, (ifirst, ilast, first, nevents) in \
+            enumerate(balanced_chunks(nentries, nchunks)):
+        newComp = copy.deepcopy(comp)
+        newComp.files = comp.files[ifirst:ilast+1]
+        newComp.entryRange = (first, nevents)
+        newComp.name = '{name}_Chunk{index}'.format(name=comp.name,
+                                                    index=ichunk)
+        chunkComps.append(newComp)
+    return chunkComps
+
+
+def range_base_name(name):
+    '''Returns the name of the component from which
+    the range component called name was created.'''
+    return name.rsplit(RANGE_TAG, 1)[0]
+
+
+def component_base_name(name):
+    '''Returns the name of the component from which the chunk
+    or range component called name was created.'''
+    return re.sub('({chunk}\d+)?({range}\d+)?$'.format(chunk=CHUNK_TAG,
+                                                        range=RANGE_TAG),
+                  '', name)
+
+
+def merge_logs(odir, idirs):
+    '''Concatenates the log files of the directories idirs into odir/log.txt,
+    and records the total number of events processed.'''
+    nEvProcessed = 0
+    with open('/'.join([odir, 'log.txt']), 'w') as log:
+        for idir in idirs:
+            logname = '/'.join([idir, 'log.txt'])
+            if not os.path.isfile(logname):
+                continue
+            for line in open(logname):
+                if line.startswith('number of events processed:'):
+                    nEvProcessed += int(line.split(':')[1])
+                else:
+                    log.write(line)
+        log.write('number of events processed: {nEv}\n'.format(
+            nEv=nEvProcessed)
+        )
+    return nEvProcessed
+
+
+def worker_dir(outDir, base, iworker):
+    '''Returns the directory where worker iworker of a Scheduler
+    merges its ranges of component base, see heppy.framework.scheduler.'''
+    return '/'.join([outDir, '{base}{tag}{index}'.format(base=base,
+                                                          tag=WORKER_TAG,
+                                                          index=iworker)])
+
+
+def merge_dirs(odir, idirs, cleanUp=True):
+    '''Merges the looper output directories idirs into odir.
+
+    The pickled counters and averages are added,
+    and the root files are merged with hadd.
+    A single directory is simply renamed.
+    If cleanUp is True, the input directories are removed after merging.
+    '''
+    if len(idirs) == 1 and cleanUp:
+        os.rename(idirs[0], odir)
+        return
+    haddRec(odir, idirs)
+    merge_logs(odir, idirs)
+    if cleanUp:
+        for idir in idirs:
+            shutil.rmtree(idir)
+
+
+def merge_ranges(outDir, rangeComps, cleanUp=True):
+    '''Merges the output directories of the range components,
+    created by split_in_ranges, into one output directory per component.
+
+    The directories where the workers of a Scheduler merged their ranges
+    are merged as well, together with the remaining range directories.
+    If cleanUp is True, the range directories are removed after merging.
+    '''
+    merged = dict()
+    for comp in rangeComps:
+        base = range_base_name(comp.name)
+        idirs = merged.setdefault(base, [])
+        rangeDir = '/'.join([outDir, comp.name])
+        if os.path.isdir(rangeDir):
+            idirs.append(rangeDir)
+    for base, idirs in merged.iteritems():
+        pattern = worker_dir(outDir, base, '*')
+        idirs.extend(sorted(glob.glob(pattern)))
+        if not idirs:
+            continue
+        merge_dirs('/'.join([outDir, base]), idirs, cleanUp)
+    return sorted(merged)
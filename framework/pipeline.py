@@ -0,0 +1,356 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Pipeline-parallel processing of the events of a Looper.
+
+The sequence is cut in two stages:
+
+* the reader stage, e.g. the fcc Reader building the particles from the
+  input collections, runs in nreaders processes, each of them reading
+  a contiguous range of entries;
+* the worker stage, i.e. the rest of the sequence, runs in nworkers processes.
+
+The reader processes put the products of each event accepted by the
+reader stage on a RingBuffer in shared memory, as a compressed pickle.
+The worker processes take the events from the buffer as soon as they
+are free, and run the rest of the sequence on them.
+
+Each process runs its own Looper, in a temporary directory.
+At the end, the outputs of the processes are merged in the directory
+of the main Looper, as for the entry ranges of heppy.framework.parallel,
+so that the outputs are the same as without the pipeline, except
+for the order of the events in the output trees.
+The output files written at the top of the looper directory,
+e.g. timing.json, are the ones of the worker stage; the ones of the
+reader stage get a readers_ prefix.
+
+The loopers of the processes get the options of the main Looper.
+At a graceful stop, the readers stop, and the workers process the
+events already read. If a process fails, the other ones are
+terminated, and run_pipeline raises PipelineError.
+
+The random numbers drawn in the worker stage depend on the
+order in which the events are processed by the workers, unless the
+random numbers are seeded per event, see heppy.statistics.rrandom.
+'''
+
+import os
+import sys
+import copy
+import time
+import zlib
+import shutil
+import pickle
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+from heppy.framework.analyzer import Analyzer
+from heppy.statistics import rrandom as random
+from heppy.framework.parallel import entry_ranges, merge_dirs
+
+# temporary directory of the processes, in the looper directory
+PIPELINE_DIR = 'pipeline'
+# prefix of the top-level outputs of the reader stage
+READERS_PREFIX = 'readers_'
+
+class PipelineError(RuntimeError):
+    '''A process of the pipeline failed.'''
+    pass
+
+
+class RingBuffer(object):
+    '''Fixed-size FIFO queue of byte strings in shared memory,
+    for several producer and consumer processes.
+
+    The buffer has nslots slots of slot_size bytes.
+    put blocks while all slots are full, and get while all slots are empty.
+    Every poll seconds, a blocked put or get checks the abort flag,
+    and raises PipelineError if the buffer was aborted, e.g. because
+    the processes on the other side died.
+    '''
+
+    def __init__(self, nslots=64, slot_size=1<<20, poll=0.1):
+        self.nslots = nslots
+        self.slot_size = slot_size
+        self.poll = poll
+        self.data = RawArray('c', nslots * slot_size)
+        # size of the data in each slot, -1 for the end of the stream
+        self.sizes = RawArray('i', nslots)
+        self.head = RawValue('i', 0)
+        self.tail = RawValue('i', 0)
+        self.head_lock = multiprocessing.Lock()
+        self.tail_lock = multiprocessing.Lock()
+        self.free = multiprocessing.Semaphore(nslots)
+        self.filled = multiprocessing.Semaphore(0)
+        self.aborted = RawValue('i', 0)
+
+    def abort(self):
+        '''Makes the blocked and future calls to put and get fail.'''
+        self.aborted.value = 1
+
+    def _acquire(self, semaphore, check=None):
+        '''Acquires semaphore, calling check while waiting.'''
+        while True:
+            if self.aborted.value:
+                raise PipelineError('ring buffer aborted')
+            if semaphore.acquire(True, self.poll):
+                return
+            if check is not None:
+                check()
+
+    def put(self, data, check=None):
+        '''Puts the byte string data in the next free slot.
+        None marks the end of the stream for one consumer.
+        check is called while waiting for a free slot,
+        and may raise an exception to stop waiting.'''
+        size = -1 if data is None else len(data)
+        if size > self.slot_size:
+            raise ValueError(
+                'event payload of {size} bytes larger than the slots of the '
+                'ring buffer, {slot_size} bytes'.format(size=size,
+                                                        slot_size=self.slot_size))
+        self._acquire(self.free, check)
+        with self.head_lock:
+            slot = self.head.value
+            if size > 0:
+                start = slot * self.slot_size
+                self.data[start:start+size] = data
+            self.sizes[slot] = size
+            self.head.value = (slot + 1) % self.nslots
+        self.filled.release()
+
+    def get(self):
+        '''Returns the byte string of the oldest slot,
+        or None at the end of the stream.'''
+        self._acquire(self.filled)
+        with self.tail_lock:
+            slot = self.tail.value
+            size = self.sizes[slot]
+            data = None
+            if size >= 0:
+                start = slot * self.slot_size
+                data = self.data[start:start+size]
+            self.tail.value = (slot + 1) % self.nslots
+        self.free.release()
+        return data
+
+
+def pack(event):
+    '''Returns the compressed pickle of the products of event.'''
+    products = dict( (name, value) for name, value in event.__dict__.iteritems()
+                     if name not in ['input', 'setup'] )
+    return zlib.compress(pickle.dumps(products, pickle.HIGHEST_PROTOCOL), 1)
+
+def unpack(data):
+    return pickle.loads(zlib.decompress(data))
+
+
+class PayloadWriter(Analyzer):
+    '''Last analyzer of the reader stage:
+    puts the products of the event on the ring buffer.'''
+
+    buffer = None
+
+    def beginLoop(self, setup):
+        super(PayloadWriter, self).beginLoop(setup)
+
+    def process(self, event):
+        if random.per_event():
+            # key of the event in the reader stage, without the analyzer name
+            event.random_key = random.event_key()[:-1]
+        self.buffer.put(pack(event))
+
+    def write(self, setup):
+        pass
+
+
+class PayloadReader(Analyzer):
+    '''First analyzer of the worker stage:
+    restores the products of the event taken from the ring buffer.'''
+
+    def process(self, event):
+        products = unpack(event.input)
+        event.input = None
+        event.__dict__.update(products)
+
+    def write(self, setup):
+        pass
+
+
+class BufferEvents(object):
+    '''Events class of the worker stage,
+    iterating on the payloads of the ring buffer until the end of the stream.'''
+
+    buffer = None
+    # number of events read by the reader stage, at most
+    nevents = 0
+
+    def __init__(self, files, tree_name=None, **kwargs):
+        pass
+
+    def __len__(self):
+        return self.nevents
+
+    def __iter__(self):
+        while True:
+            data = self.buffer.get()
+            if data is None:
+                return
+            yield data
+
+
+def _payload_analyzer(class_object):
+    import heppy.framework.config as cfg
+    return cfg.Analyzer(class_object, instance_label='pipeline',
+                        nosubdir=True)
+
+def _run(looper_class, dirname, config, options, sequence, comp, events_class):
+    '''Runs a Looper on comp with sequence, in a child process.'''
+    config = copy.copy(config)
+    config.sequence = sequence
+    config.components = [comp]
+    if events_class is not None:
+        config.events_class = events_class
+    try:
+        looper = looper_class(dirname, config, quiet=True, **options)
+        looper.loop()
+        looper.write()
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    sys.exit(0)
+
+
+def _check(processes):
+    '''Raises PipelineError if one of the processes failed.'''
+    failed = [process.name for process in processes
+              if process.exitcode not in (None, 0)]
+    if failed:
+        raise PipelineError('pipeline processes failed: {}'.format(
+            ', '.join(failed)))
+
+def _join(waited, processes, poll):
+    '''Waits for the processes waited to finish, checking all processes
+    every poll seconds.'''
+    for process in waited:
+        while process.is_alive():
+            _check(processes)
+            process.join(poll)
+    _check(processes)
+
+def run_processes(readers, workers, buf, poll=0.1):
+    '''Runs the reader and the worker processes exchanging events
+    through the RingBuffer buf, and sends the end of the stream to the
+    workers when the readers are done.
+
+    As soon as a process fails, the buffer is aborted, all processes are
+    terminated, and PipelineError is raised.
+    '''
+    processes = readers + workers
+    for process in processes:
+        process.start()
+    try:
+        _join(readers, processes, poll)
+        check = lambda: _check(processes)
+        for process in workers:
+            buf.put(None, check)
+        _join(workers, processes, poll)
+    except PipelineError:
+        buf.abort()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        raise
+
+
+def run_pipeline(looper, firstEvent, lastEvent, nreaders, nworkers,
+                 stage=1, nslots=64, slot_size=1<<20):
+    '''Processes the events of looper from firstEvent to lastEvent,
+    the first stage analyzers in the sequence being run by nreaders
+    reader processes, and the others by nworkers worker processes.
+
+    The outputs are merged in the directory of the looper.
+    Returns the number of events processed by the reader stage.
+    '''
+    tmpdir = '/'.join([looper.name, PIPELINE_DIR])
+    os.mkdir(tmpdir)
+    buf = RingBuffer(nslots, slot_size)
+    PayloadWriter.buffer = buf
+    BufferEvents.buffer = buf
+    BufferEvents.nevents = lastEvent - firstEvent
+    # the workers run until the end of the stream, while the readers
+    # stop at the graceful stop signal
+    options = looper.loopOptions
+    worker_options = dict(options, stopFlag=None)
+    reader_sequence = list(looper.sequence[:stage]) + \
+                      [_payload_analyzer(PayloadWriter)]
+    worker_sequence = [_payload_analyzer(PayloadReader)] + \
+                      list(looper.sequence[stage:])
+    readers = []
+    for ireader, erange in enumerate(
+            entry_ranges(lastEvent-firstEvent, nreaders, firstEvent)):
+        comp = copy.copy(looper.cfg_comp)
+        comp.entryRange = erange
+        dirname = '/'.join([tmpdir, 'reader{}'.format(ireader)])
+        readers.append(multiprocessing.Process(
+            target=_run,
+            args=(looper.__class__, dirname, looper.config, options,
+                  reader_sequence, comp, None)
+        ))
+    workers = []
+    for iworker in range(nworkers):
+        comp = copy.copy(looper.cfg_comp)
+        for attr in ['entryRange', 'fineSplit']:
+            if hasattr(comp, attr):
+                delattr(comp, attr)
+        dirname = '/'.join([tmpdir, 'worker{}'.format(iworker)])
+        workers.append(multiprocessing.Process(
+            target=_run,
+            args=(looper.__class__, dirname, looper.config, worker_options,
+                  worker_sequence, comp, BufferEvents)
+        ))
+    try:
+        run_processes(readers, workers, buf)
+    except PipelineError as err:
+        raise PipelineError('{err}, see the outputs in {tmpdir}'.format(
+            err=err, tmpdir=tmpdir))
+    reader_dirs = ['/'.join([tmpdir, 'reader{}'.format(i)])
+                   for i in range(len(readers))]
+    worker_dirs = ['/'.join([tmpdir, 'worker{}'.format(i)])
+                   for i in range(len(workers))]
+    nEvProcessed = _collect(looper.name, tmpdir, 'readers', reader_dirs,
+                            READERS_PREFIX)
+    _collect(looper.name, tmpdir, 'workers', worker_dirs, '')
+    shutil.rmtree(tmpdir)
+    return nEvProcessed
+
+
+def _collect(odir, tmpdir, name, idirs, prefix):
+    '''Merges the output directories idirs of a stage,
+    and moves the results to odir.
+    Returns the number of events processed in the stage.'''
+    merged = '/'.join([tmpdir, name])
+    merge_dirs(merged, idirs)
+    nEvProcessed = 0
+    for fname in os.listdir(merged):
+        path = '/'.join([merged, fname])
+        target = '/'.join([odir, fname])
+        if fname == 'log.txt':
+            with open(target, 'a') as log:
+                for line in open(path):
+                    if line.startswith('number of events processed:'):
+                        nEvProcessed = int(line.split(':')[1])
+                    else:
+                        log.write(line)
+        elif os.path.isdir(path):
+            # the analyzer directory created by the main looper
+            # only holds an empty log
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            os.rename(path, target)
+        else:
+            os.rename(path, '/'.join([odir, prefix + fname]))
+    return nEvProcessed
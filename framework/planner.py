@@ -0,0 +1,180 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Planning of the splitting of the components and of the number of workers.
+
+A small sample of events of each component is processed with the
+configured sequence, in a separate process, to measure:
+
+* the start-up time of a looper (creation of the analyzers, writing);
+* the processing time per event;
+* the peak memory (resident set size) of the process.
+
+From these measurements, the processing time of the components is
+extrapolated, and the Plan gives, for a target wall-clock time:
+
+* the number of chunks of each component, used as entrySplitFactor;
+* the number of worker processes (-j);
+* the predicted makespan, i.e. the time at which the last chunk is done,
+  assuming the chunks are handed out to the workers longest first.
+
+See heppy_loop --plan.
+'''
+
+import copy
+import heapq
+import shutil
+import tempfile
+import resource
+import multiprocessing
+from math import ceil
+
+class ComponentCost(object):
+    '''Measured cost of the processing of a component.'''
+
+    def __init__(self, name, nentries, startup, per_event, memory):
+        self.name = name
+        self.nentries = nentries
+        self.startup = startup
+        self.per_event = per_event
+        # peak resident set size, in MB
+        self.memory = memory
+
+    def duration(self, nevents):
+        '''Predicted processing time of a chunk of nevents events.'''
+        return self.startup + nevents * self.per_event
+
+    def __str__(self):
+        return '{name:30} {nentries:>10} entries {startup:8.2f} s startup ' \
+               '{per_event:10.4f} s/event {memory:8.0f} MB'.format(**vars(self))
+
+
+def _sample(comp, config, nevents, outdir, results):
+    '''Processes nevents events of comp, and puts the measured
+    start-up time, time per event, and peak memory in results.'''
+    import timeit
+    from heppy.framework.looper import Looper
+    config = copy.copy(config)
+    config.components = [comp]
+    start = timeit.default_timer()
+    looper = Looper('/'.join([outdir, comp.name]), config, nevents, quiet=True)
+    created = timeit.default_timer()
+    looper.loop()
+    looped = timeit.default_timer()
+    looper.write()
+    written = timeit.default_timer()
+    startup = (created - start) + (written - looped)
+    per_event = (looped - created) / max(looper.nEvProcessed, 1)
+    # ru_maxrss is in kB on linux
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+    results.put((startup, per_event, memory))
+
+
+def measure(comp, config, nevents, nentries):
+    '''Returns the ComponentCost of component comp, measured on its
+    first nevents events in a separate process.
+    nentries is the total number of entries of the component.'''
+    comp = copy.deepcopy(comp)
+    for attr in ['entryRange', 'fineSplit']:
+        if hasattr(comp, attr):
+            delattr(comp, attr)
+    outdir = tempfile.mkdtemp()
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_sample,
+                                      args=(comp, config, nevents, outdir,
+                                            results))
+    try:
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError('failed to process a sample of '
+                               'component {}'.format(comp.name))
+        startup, per_event, memory = results.get()
+    finally:
+        shutil.rmtree(outdir)
+    return ComponentCost(comp.name, nentries, startup, per_event, memory)
+
+
+def makespan(durations, nworkers):
+    '''Returns the time needed by nworkers workers to process jobs
+    with durations, each free worker taking the longest remaining job.'''
+    loads = [0.] * nworkers
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + duration)
+    return max(loads)
+
+
+class Plan(object):
+    '''Splitting of the components and number of workers
+    fitting the processing in target_time seconds,
+    with a memory per worker below max_memory MB.
+
+    The components are split in chunks of at most target_time/granularity
+    seconds, so that the chunks can be balanced between the workers.
+    The chunks of a component with a long start-up time are longer,
+    so that the start-up takes at most half of the duration of a chunk.
+    The number of workers is the smallest one for which the predicted
+    makespan is below target_time, and is at most max_workers.
+    '''
+
+    def __init__(self, costs, target_time, max_memory=None,
+                 max_workers=None, granularity=4):
+        self.costs = costs
+        self.target_time = target_time
+        self.max_memory = max_memory
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        self.max_workers = max_workers
+        chunk_time = float(target_time) / granularity
+        self.nchunks = dict()
+        durations = []
+        for cost in costs:
+            work = cost.nentries * cost.per_event
+            # processing time of a chunk. If the start-up time is close to
+            # or above the chunk time, the chunks are made longer, so that
+            # the start-up takes at most half of their duration
+            processing = max(chunk_time - cost.startup, cost.startup, 1e-9)
+            nchunks = int(ceil(work / processing))
+            nchunks = max(1, min(nchunks, cost.nentries))
+            self.nchunks[cost.name] = nchunks
+            size = int(ceil(cost.nentries / float(nchunks)))
+            durations.extend([cost.duration(size)] * nchunks)
+        self.nworkers = max_workers
+        for nworkers in range(1, max_workers+1):
+            if makespan(durations, nworkers) <= target_time:
+                self.nworkers = nworkers
+                break
+        self.makespan = makespan(durations, self.nworkers)
+        self.too_large = [cost.name for cost in costs
+                          if max_memory and cost.memory > max_memory]
+
+    def feasible(self):
+        return self.makespan <= self.target_time and not self.too_large
+
+    def apply(self, comps):
+        '''Sets the entrySplitFactor of the components comps.
+        The other splitting attributes are removed.'''
+        for comp in comps:
+            for attr in ['splitFactor', 'fineSplitFactor']:
+                if hasattr(comp, attr):
+                    delattr(comp, attr)
+            comp.entrySplitFactor = self.nchunks[comp.name]
+
+    def summary(self):
+        lines = ['Processing plan', '']
+        for cost in self.costs:
+            lines.append(str(cost))
+        lines.append('')
+        for cost in self.costs:
+            lines.append('{name:30} entrySplitFactor = {nchunks}'.format(
+                name=cost.name, nchunks=self.nchunks[cost.name]))
+        lines.append('number of workers (-j) : {}'.format(self.nworkers))
+        lines.append('predicted makespan     : {:.0f} s (target {:.0f} s)'.format(
+            self.makespan, self.target_time))
+        if self.makespan > self.target_time:
+            lines.append('WARNING: the target time cannot be reached '
+                         'with {} workers'.format(self.max_workers))
+        for name in self.too_large:
+            lines.append('WARNING: {name} needs more than {mem} MB per worker'.format(
+                name=name, mem=self.max_memory))
+        return lines
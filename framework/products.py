@@ -0,0 +1,192 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Release of the event products that are not needed anymore,
+used by the Looper when releaseProducts is True.
+
+From the products declared by the analyzers (see Analyzer.consumes and
+Analyzer.produces), the ProductStore finds the last analyzer of
+the sequence reading each product, and deletes the product from the event
+as soon as this analyzer is done. The memory used by large intermediate
+collections, like the PAPAS clusters, blocks and history, is then
+freed before the end of the sequence.
+
+A product is released only if all analyzers after its last consumer
+declare their products, and if it is not in the keep list.
+
+In debug mode, the size of each product is estimated when the product
+is released, or at the end of the event for the products that are kept.
+'''
+
+import sys
+import collections
+
+from heppy.framework.dependencies import DependencyGraph
+
+# attributes set by the Looper, never released
+RESERVED = set(['iEv', 'input', 'setup', 'eventWeight'])
+
+def product_size(obj, seen=None):
+    '''Estimates the memory size of obj in bytes, including the objects
+    it contains: items of sequences, sets and mappings, and attributes.
+    Objects referenced several times are counted once.'''
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        try:
+            size += sys.getsizeof(obj)
+        except TypeError:
+            continue
+        if isinstance(obj, basestring):
+            continue
+        elif isinstance(obj, collections.Mapping):
+            stack.extend(obj.iterkeys())
+            stack.extend(obj.itervalues())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        if hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+    return size
+
+
+class ProductSize(object):
+    '''Size statistics for a product.'''
+
+    def __init__(self, name, released_after):
+        self.name = name
+        self.released_after = released_after
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, size):
+        self.count += 1
+        self.sum += size
+        self.max = max(self.max, size)
+
+    def mean(self):
+        if not self.count:
+            return 0.
+        return float(self.sum) / self.count
+
+
+class ProductStore(object):
+    '''Releases the event products after their last consumer.
+
+    Example::
+
+      store = ProductStore(config.sequence)
+      # for each event
+      for index, analyzer in enumerate(analyzers):
+          analyzer.process(event)
+          store.release(event, index)
+      store.end_event(event)
+    '''
+
+    def __init__(self, sequence, keep=None, release=True, debug=False):
+        '''
+        sequence: list of analyzer configurations
+        keep: names of the products that must never be released
+        release: if False, the products are never released
+        debug: if True, record the size of the products
+        '''
+        self.names = [cfg_ana.name for cfg_ana in sequence]
+        self.graph = DependencyGraph(sequence)
+        self.keep = set(keep) if keep else set()
+        self.debug = debug
+        if release:
+            self.releases = self._find_releases()
+        else:
+            self.releases = [[] for cfg_ana in sequence]
+        self.sizes = dict()
+
+    def _find_releases(self):
+        '''Returns, for each analyzer, the list of products
+        to be released after this analyzer.'''
+        graph = self.graph
+        nanas = len(graph.sequence)
+        undeclared = [i for i in range(nanas) if not graph.declared(i)]
+        first = undeclared[-1] + 1 if undeclared else 0
+        last_use = dict()
+        for i in range(nanas):
+            if not graph.declared(i):
+                continue
+            for product in graph.consumed[i]:
+                last_use[product] = i
+        for i in range(nanas):
+            if not graph.declared(i):
+                continue
+            for product in graph.produced[i]:
+                if product in last_use:
+                    last_use[product] = max(last_use[product], i)
+        releases = [[] for i in range(nanas)]
+        for product, index in last_use.iteritems():
+            if index < first or product in self.keep or product in RESERVED:
+                continue
+            releases[index].append(product)
+        for products in releases:
+            products.sort()
+        return releases
+
+    def release(self, event, index):
+        '''Deletes from event the products that are not needed after
+        analyzer index.'''
+        for name in self.releases[index]:
+            if name not in event.__dict__:
+                continue
+            if self.debug:
+                self._record(name, getattr(event, name), self.names[index])
+            delattr(event, name)
+
+    def release_batch(self, events, index):
+        for event in events:
+            self.release(event, index)
+
+    def end_event(self, event):
+        '''In debug mode, records the size of the remaining products.'''
+        if not self.debug:
+            return
+        for name, value in event.__dict__.iteritems():
+            if name not in RESERVED:
+                self._record(name, value, None)
+
+    def _record(self, name, value, released_after):
+        stats = self.sizes.get(name)
+        if stats is None:
+            stats = ProductSize(name, released_after)
+            self.sizes[name] = stats
+        stats.add(product_size(value))
+
+    def summary(self):
+        '''Returns a printable summary of the product sizes,
+        as a list of lines.'''
+        lines = []
+        lines.append("\n      ---- ProductStore (sizes in kB) ---- ")
+        header = "%9s %12s %12s   %-30s %s"
+        lines.append(header % ("events", "mean", "max", "product", "released after"))
+        lines.append(header % ("-"*9, "-"*12, "-"*12, "-"*30, "-"*14))
+        stats = sorted(self.sizes.values(), key=lambda stat: stat.max, reverse=True)
+        for stat in stats:
+            lines.append("%9d %12.1f %12.1f   %-30s %s" % (
+                stat.count, stat.mean() / 1024., stat.max / 1024., stat.name,
+                stat.released_after if stat.released_after else '-'))
+        lines.append("")
+        return lines
+
+    def write(self, fname):
+        with open(fname, 'w') as out:
+            out.write('\n'.join(self.summary()))
+
+    def __str__(self):
+        lines = []
+        for name, products in zip(self.names, self.releases):
+            if products:
+                lines.append('after {name} : {products}'.format(
+                    name=name, products=', '.join(products)))
+        return '\n'.join(lines)
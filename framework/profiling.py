@@ -0,0 +1,293 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Per-analyzer latency profiling, used by the Looper when timeReport is True.
+
+The TimeReport records, for each analyzer in the sequence:
+
+* a histogram of the time spent per event,
+  from which the p50, p90 and p99 latencies are estimated;
+* the maximum time per event and the slowest events;
+* the number of events in and out of the analyzer (filter efficiency).
+
+It also records the throughput of the loop over time.
+The report is written to timing.json in the output directory of the looper,
+and the reports of several chunks can be added with heppy_hadd.py.
+'''
+
+import json
+import math
+import heapq
+import timeit
+
+class LatencyHistogram(object):
+    '''Histogram of latencies with logarithmic bins.
+
+    The bins cover the range [tmin, tmin * 10**ndecades] with
+    nperdecade bins per decade. Latencies outside this range
+    are put in the first or last bin.
+    The quantiles are estimated from the bin contents,
+    with a relative precision of about 10**(1./nperdecade) - 1 (12% by default).
+    '''
+
+    tmin = 1e-6
+    ndecades = 10
+    nperdecade = 20
+
+    def __init__(self):
+        self.counts = dict()
+        self.count = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def bin(self, value):
+        '''Returns the bin index for value.'''
+        if value <= self.tmin:
+            return 0
+        ibin = int(math.log10(value/self.tmin) * self.nperdecade)
+        return min(ibin, self.ndecades * self.nperdecade - 1)
+
+    def edge(self, ibin):
+        '''Returns the lower edge of bin ibin.'''
+        return self.tmin * 10 ** (float(ibin) / self.nperdecade)
+
+    def add(self, value, weight=1):
+        '''Add a latency value, weight times.'''
+        ibin = self.bin(value)
+        self.counts[ibin] = self.counts.get(ibin, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        if not self.count:
+            return 0.
+        return self.sum / self.count
+
+    def quantile(self, q):
+        '''Returns an estimate of quantile q, between 0 and 1.
+        The center of the bin containing the quantile is returned,
+        or the maximum if it is smaller.'''
+        if not self.count:
+            return 0.
+        threshold = q * self.count
+        cumul = 0
+        for ibin in sorted(self.counts):
+            cumul += self.counts[ibin]
+            if cumul >= threshold:
+                center = math.sqrt(self.edge(ibin) * self.edge(ibin+1))
+                return min(center, self.max)
+        return self.max
+
+    def __iadd__(self, other):
+        for ibin, count in other.counts.iteritems():
+            self.counts[ibin] = self.counts.get(ibin, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self):
+        return dict(count=self.count, sum=self.sum, max=self.max,
+                    counts=dict( (str(ibin), count) for ibin, count
+                                 in self.counts.iteritems()))
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls()
+        hist.count = data['count']
+        hist.sum = data['sum']
+        hist.max = data['max']
+        hist.counts = dict( (int(ibin), count) for ibin, count
+                            in data['counts'].iteritems() )
+        return hist
+
+
+class AnalyzerProfile(object):
+    '''Latency histogram and event counts for a given analyzer.'''
+
+    nslowest = 5
+
+    def __init__(self, name):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self.events_in = 0
+        self.events_out = 0
+        # heap of (time, iEv) for the slowest events
+        self.slowest = []
+
+    def record(self, time, iEv, nin=1, nout=1):
+        '''Record the processing of nin events taking time seconds in total,
+        nout of them being accepted. iEv is the index of the first event.'''
+        self.events_in += nin
+        self.events_out += nout
+        if nin == 0:
+            return
+        per_event = time / nin
+        self.latency.add(per_event, nin)
+        entry = (per_event, iEv)
+        if len(self.slowest) < self.nslowest:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def efficiency(self):
+        if not self.events_in:
+            return 0.
+        return float(self.events_out) / self.events_in
+
+    def __iadd__(self, other):
+        if self.name != other.name:
+            raise ValueError('cannot add profiles of analyzers {} and {}'.format(
+                self.name, other.name))
+        self.latency += other.latency
+        self.events_in += other.events_in
+        self.events_out += other.events_out
+        self.slowest = heapq.nlargest(self.nslowest,
+                                      self.slowest + other.slowest)
+        heapq.heapify(self.slowest)
+        return self
+
+    def to_dict(self):
+        return dict(name=self.name,
+                    events_in=self.events_in,
+                    events_out=self.events_out,
+                    efficiency=self.efficiency(),
+                    mean=self.latency.mean(),
+                    p50=self.latency.quantile(0.5),
+                    p90=self.latency.quantile(0.9),
+                    p99=self.latency.quantile(0.99),
+                    max=self.latency.max,
+                    slowest=[dict(time=time, iEv=iEv) for time, iEv
+                             in sorted(self.slowest, reverse=True)],
+                    latency=self.latency.to_dict())
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls(data['name'])
+        profile.events_in = data['events_in']
+        profile.events_out = data['events_out']
+        profile.latency = LatencyHistogram.from_dict(data['latency'])
+        profile.slowest = [(slow['time'], slow['iEv']) for slow in data['slowest']]
+        heapq.heapify(profile.slowest)
+        return profile
+
+
+class TimeReport(object):
+    '''Latency profiles for all analyzers in a sequence,
+    and throughput of the loop over time.
+
+    Example::
+
+      report = TimeReport(['ana1', 'ana2'])
+      report.start()
+      # for each event
+      report.record(0, time_ana1, iEv)
+      report.record(1, time_ana2, iEv, nout=0) # event rejected
+      report.tick(nEvProcessed)
+      # at the end
+      report.write('timing.json')
+    '''
+
+    # time between two throughput measurements, in seconds
+    tick_interval = 10.
+
+    def __init__(self, names):
+        self.profiles = [AnalyzerProfile(name) for name in names]
+        # list of throughput series, one per job.
+        # each series is a list of (elapsed time, events processed)
+        self.throughput = []
+        self.start_time = None
+
+    def start(self):
+        '''Start measuring the throughput.'''
+        self.start_time = timeit.default_timer()
+        self.last_tick = self.start_time
+        self.throughput.append([(0., 0)])
+
+    def tick(self, nevents, force=False):
+        '''Record the number of events processed so far,
+        if tick_interval seconds have passed since the last record.'''
+        now = timeit.default_timer()
+        if force or now - self.last_tick >= self.tick_interval:
+            self.last_tick = now
+            self.throughput[-1].append( (now - self.start_time, nevents) )
+
+    def record(self, index, time, iEv, nin=1, nout=1):
+        '''Record the processing of nin events by analyzer index in time
+        seconds, nout of them being accepted.'''
+        self.profiles[index].record(time, iEv, nin, nout)
+
+    def total_time(self):
+        return sum(profile.latency.sum for profile in self.profiles)
+
+    def summary(self):
+        '''Returns a printable summary table, as a list of lines.'''
+        lines = []
+        header = "%9s %9s %6s %10s %10s %10s %10s %10s %6s   %s"
+        lines.append("\n      ---- TimeReport (all times in ms per processed event) ---- ")
+        lines.append(header % ("in", "out", "eff", "mean", "p50", "p90",
+                               "p99", "max", "  [%] ", "analyzer"))
+        lines.append(header % ("-"*9, "-"*9, "-"*6, "-"*10, "-"*10, "-"*10,
+                               "-"*10, "-"*10, " -----", "-------------"))
+        sumtime = self.total_time()
+        row = "%9d %9d %6.3f %10.2f %10.2f %10.2f %10.2f %10.2f %5.1f%%   %s"
+        for profile in self.profiles:
+            latency = profile.latency
+            frac = latency.sum / sumtime if sumtime else 0.
+            lines.append(row % (profile.events_in, profile.events_out,
+                                profile.efficiency(),
+                                1000*latency.mean(),
+                                1000*latency.quantile(0.5),
+                                1000*latency.quantile(0.9),
+                                1000*latency.quantile(0.99),
+                                1000*latency.max,
+                                100.*frac, profile.name))
+        if self.profiles:
+            nall = self.profiles[0].events_in
+            nout = self.profiles[-1].events_out
+            lines.append(header % ("-"*9, "-"*9, "-"*6, "-"*10, "", "", "",
+                                   "", " -----", "-------------"))
+            lines.append("%9d %9d %6.3f %10.2f %10s %10s %10s %10s %5.1f%%   %s" % (
+                nall, nout, float(nout) / nall if nall else 0.,
+                1000*sumtime / nall if nall else 0.,
+                "", "", "", "", 100., "TOTAL"))
+        lines.append("")
+        return lines
+
+    def __iadd__(self, other):
+        if len(self.profiles) != len(other.profiles):
+            raise ValueError('cannot add time reports with different sequences')
+        for profile, oprofile in zip(self.profiles, other.profiles):
+            profile += oprofile
+        self.throughput.extend(other.throughput)
+        return self
+
+    def to_dict(self):
+        return dict(analyzers=[profile.to_dict() for profile in self.profiles],
+                    total_time=self.total_time(),
+                    throughput=self.throughput)
+
+    @classmethod
+    def from_dict(cls, data):
+        report = cls([])
+        report.profiles = [AnalyzerProfile.from_dict(pdata)
+                           for pdata in data['analyzers']]
+        report.throughput = [[tuple(point) for point in series]
+                             for series in data['throughput']]
+        return report
+
+    def write(self, fname):
+        '''Write the report in json format to file fname.'''
+        with open(fname, 'w') as out:
+            json.dump(self.to_dict(), out, indent=2, sort_keys=True)
+
+    @classmethod
+    def read(cls, fname):
+        '''Read a report written by write.'''
+        with open(fname) as infile:
+            return cls.from_dict(json.load(infile))
+
+    def __str__(self):
+        return '\n'.join(self.summary())
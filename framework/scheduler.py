@@ -0,0 +1,219 @@
+# Copyright (C) 2014 Colin Bernet
+# https://github.com/cbernet/heppy/blob/master/LICENSE
+
+'''Dynamic scheduling of the components over a pool of worker processes.
+
+The components (usually small entry ranges created by split_in_ranges)
+are put in a shared queue, and each worker takes the next one as soon as
+it is done with the previous one. Workers finishing early therefore take
+more work, and slow components do not delay the others.
+
+Each worker merges the outputs of the ranges it processed,
+for each component, into a <component>_Worker<N> directory.
+The final reduction of these directories into a single directory
+per component is done by merge_ranges.
+
+A component failing with an exception is reported with its traceback,
+and retried by the next free worker, up to maxRetries times.
+A worker process dying while processing a component is replaced,
+and the component is retried in the same way.
+
+If maxMemory is set, a worker whose resident memory exceeds maxMemory MB
+after a component stops taking components, and is replaced by a new
+process, e.g. to get rid of the memory fragmentation and leaks
+accumulated by PyROOT and PAPAS objects before the node runs out of memory.
+The ranges processed by the old worker are merged by its replacement.
+
+Example::
+
+  ranges = split_in_ranges(comps, 1, events_class, range_size=10000)
+  scheduler = Scheduler(outDir, runLoop, nworkers=8)
+  failed = scheduler.run(ranges)
+  if not failed:
+      merge_ranges(outDir, ranges)
+'''
+
+import os
+import shutil
+import traceback
+import multiprocessing
+from Queue import Empty
+
+import heppy.framework.memcheck as memcheck
+from heppy.framework.parallel import RANGE_TAG, range_base_name, \
+     worker_dir, merge_dirs
+
+# messages sent by the workers to the scheduler
+DONE, FAILED, RECYCLED = 'done', 'failed', 'recycled'
+# task index of an idle worker
+IDLE = -1
+
+def rss():
+    '''Returns the resident memory of the process, in MB.'''
+    return memcheck.rss() / 1024. ** 2
+
+
+def work(iworker, tasks, results, running, run, outDir, done,
+         localMerge, stopFlag, maxMemory=None):
+    '''Loop of worker iworker: processes the components of the tasks queue
+    until it gets None, and reports to the results queue.
+    If the memory of the process exceeds maxMemory MB after a component,
+    the worker stops and asks to be replaced, without merging its ranges.
+
+    The index of the task being processed is stored in running[iworker],
+    in shared memory, so that the task can be retried if the worker dies.
+    done is a dictionary {component : [range directories]}
+    of the ranges already processed in this worker slot.
+    '''
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, comp = task
+        running[iworker] = index
+        try:
+            run(comp, outDir)
+        except Exception:
+            results.put((FAILED, index, iworker, traceback.format_exc()))
+        else:
+            if RANGE_TAG in comp.name:
+                compDir = '/'.join([outDir, comp.name])
+                done.setdefault(range_base_name(comp.name), []).append(compDir)
+            results.put((DONE, index, iworker, None))
+        running[iworker] = IDLE
+        if maxMemory and rss() > maxMemory:
+            results.put((RECYCLED, os.getpid(), iworker, rss()))
+            return
+    if localMerge and not (stopFlag and stopFlag.value):
+        for base, idirs in done.iteritems():
+            merge_dirs(worker_dir(outDir, base, iworker), idirs)
+
+
+class Scheduler(object):
+    '''Processes components with a pool of worker processes,
+    handing out the components on demand.
+
+    run(comp, outDir) is called in the worker processes to process
+    component comp, writing to outDir/<comp.name>.
+    If localMerge is False, the range directories are not merged
+    by the workers, e.g. to be able to resume them from their checkpoints.
+    maxMemory is the resident memory, in MB, above which a worker
+    is replaced after its current component.
+    '''
+
+    def __init__(self, outDir, run, nworkers, maxRetries=1,
+                 localMerge=True, stopFlag=None, timeout=10., maxMemory=None):
+        self.outDir = outDir
+        self.run_comp = run
+        self.nworkers = nworkers
+        self.maxRetries = maxRetries
+        self.localMerge = localMerge
+        self.stopFlag = stopFlag
+        self.timeout = timeout
+        self.maxMemory = maxMemory
+        self.tasks = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.workers = dict()
+        # components done by each worker slot, needed to restart a worker
+        self.done = dict()
+        # component currently processed by each worker
+        self.running = multiprocessing.Array('i', [IDLE] * nworkers)
+        # errors of the failed attempts, by component name
+        self.errors = dict()
+
+    def _start_worker(self, iworker):
+        done = self.done.setdefault(iworker, dict())
+        worker = multiprocessing.Process(
+            target=work,
+            args=(iworker, self.tasks, self.results, self.running,
+                  self.run_comp, self.outDir, done, self.localMerge, self.stopFlag,
+                  self.maxMemory)
+        )
+        worker.start()
+        self.workers[iworker] = worker
+
+    def _check_workers(self):
+        '''Restarts the workers that died, and returns the indices
+        of the tasks they were processing.'''
+        lost = []
+        for iworker, worker in self.workers.items():
+            if worker.is_alive():
+                continue
+            index = self.running[iworker]
+            if index != IDLE:
+                lost.append(index)
+                self.running[iworker] = IDLE
+            self._start_worker(iworker)
+        return lost
+
+    def run(self, comps):
+        '''Processes the components comps, and returns the names of
+        the components that failed more than maxRetries times.'''
+        comps = list(comps)
+        attempts = [0] * len(comps)
+        finished = set()
+        for index, comp in enumerate(comps):
+            self.tasks.put((index, comp))
+        for iworker in range(min(self.nworkers, len(comps))):
+            self._start_worker(iworker)
+        failed = []
+        while len(finished) < len(comps):
+            try:
+                status, index, iworker, error = self.results.get(
+                    timeout=self.timeout)
+            except Empty:
+                status = None
+            if status == RECYCLED:
+                self._recycle(iworker, pid=index, memory=error)
+                status = None
+            errors = [(index, 'worker process died')
+                      for index in self._check_workers()]
+            if status is not None and index not in finished:
+                if status == FAILED:
+                    errors.append((index, error))
+                else:
+                    self._done(comps[index], iworker, attempts[index])
+                    finished.add(index)
+            for index, error in errors:
+                name = comps[index].name
+                compDir = '/'.join([self.outDir, name])
+                if os.path.isdir(compDir):
+                    shutil.rmtree(compDir)
+                self.errors.setdefault(name, []).append(error)
+                print 'ERROR processing component {name}:'.format(name=name)
+                print error
+                attempts[index] += 1
+                stopped = self.stopFlag and self.stopFlag.value
+                if attempts[index] <= self.maxRetries and not stopped:
+                    print 'retrying component {name}'.format(name=name)
+                    self.tasks.put((index, comps[index]))
+                else:
+                    failed.append(name)
+                    finished.add(index)
+        for iworker in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers.values():
+            worker.join()
+        return sorted(failed)
+
+    def _recycle(self, iworker, pid, memory):
+        '''Replaces worker iworker, with process id pid,
+        which stopped because it used memory MB.'''
+        worker = self.workers[iworker]
+        if worker.pid != pid:
+            # already replaced by _check_workers
+            return
+        print 'worker {iworker} uses {memory:.0f} MB, replacing it'.format(
+            iworker=iworker, memory=memory)
+        worker.join()
+        self._start_worker(iworker)
+
+    def _done(self, comp, iworker, nfailures):
+        if RANGE_TAG in comp.name:
+            # in case the worker has to be restarted
+            compDir = '/'.join([self.outDir, comp.name])
+            self.done[iworker].setdefault(
+                range_base_name(comp.name), []).append(compDir)
+        if nfailures:
+            print 'component {name} done, after {n} failures'.format(
+                name=comp.name, n=nfailures)
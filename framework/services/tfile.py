@@ -1,5 +1,5 @@
 from heppy.framework.services.service import Service
-from ROOT import TFile
+from heppy.utils.lazyimport import ROOT
 
 class TFileService(Service):
     """TFile service.
@@ -33,7 +33,7 @@ class TFileService(Service):
         make use of the component information, eg. the component name. 
         """
         fname = '/'.join([outdir, cfg.fname])
-        self.file = TFile(fname, cfg.option)
+        self.file = ROOT.TFile(fname, cfg.option)
         
     def stop(self):
         self.file.Write() 
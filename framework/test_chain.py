@@ -2,7 +2,7 @@ import unittest
 import os
 import shutil
 
-from ROOT import TFile
+from ROOT import TFile, TEntryList
 
 from heppy.framework.chain import Chain
 from heppy.utils.testtree import create_tree
@@ -57,6 +57,43 @@ class ChainTestCase(unittest.TestCase):
         event = self.chain[2]
         self.assertEqual(event.var1, 2.)
 
+    def test_entry_list(self):
+        '''Test restriction to an entry list'''
+        elistfname = 'test_entry_list_tmp.root'
+        elistfile = TFile(elistfname, 'recreate')
+        elist = TEntryList('entry_list', 'selected entries')
+        for entry in [3, 5, 10]:
+            self.chain[entry]
+            elist.Enter(entry, self.chain.chain)
+        elistfile.Write()
+        elistfile.Close()
+        skim = Chain(testfname, 'test_tree', entry_list=elistfname)
+        self.assertEqual(len(skim), 3)
+        self.assertEqual(skim[1].var1, 5.)
+        self.assertEqual([ev.var1 for ev in skim], [3., 5., 10.])
+        os.remove(elistfname)
+
+    def test_index(self):
+        '''Test building the chain from a file index'''
+        indexfname = 'test_file_index_tmp.json'
+        chain = Chain(testfname, index=indexfname)
+        self.assertTrue(os.path.isfile(indexfname))
+        chain = Chain([testfname, testfname], index=indexfname)
+        self.assertEqual(len(chain), self.nevents*2)
+        self.assertEqual(chain.locate(self.nevents+2), (testfname, 2))
+        self.assertEqual(chain[self.nevents+2].var1, 2.)
+        os.remove(indexfname)
+
+    def test_options(self):
+        '''Test branch selection and cache configuration'''
+        chain = Chain(testfname, 'test_tree',
+                      options=dict(branches=['var1'], cache_size=1000000))
+        self.assertEqual(chain[2].var1, 2.)
+        self.assertTrue(chain.GetBranchStatus('var1'))
+        self.assertEqual(chain.GetCacheSize(), 1000000)
+        self.assertRaises(ValueError, Chain, testfname, 'test_tree',
+                          options=dict(cache=0))
+
 
 if __name__ == '__main__':
     unittest.main()
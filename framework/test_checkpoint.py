@@ -0,0 +1,70 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pickle
+
+from heppy.framework.checkpoint import Checkpoint, CHECKPOINT_FILE
+from heppy.framework.analyzer import Analyzer
+
+class FakeCfg(object):
+    def __init__(self, name):
+        self.class_object = Analyzer
+        self.name = name
+        self.instance_label = name
+        self.verbose = False
+
+
+class Writer(Analyzer):
+    def write(self, setup):
+        pass
+
+
+class CheckpointedWriter(Writer):
+    def checkpoint(self, setup):
+        return super(CheckpointedWriter, self).checkpoint(setup)
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_write_read(self):
+        self.assertIsNone(Checkpoint.read(self.outdir))
+        Checkpoint(10, 8, dict(ana=1)).write(self.outdir)
+        Checkpoint(20, 16, dict(ana=2)).write(self.outdir)
+        self.assertEqual(os.listdir(self.outdir), [CHECKPOINT_FILE])
+        checkpoint = Checkpoint.read(self.outdir)
+        self.assertEqual(checkpoint.iEv, 20)
+        self.assertEqual(checkpoint.nEvProcessed, 16)
+        self.assertEqual(checkpoint.states, dict(ana=2))
+        self.assertFalse(checkpoint.done)
+
+    def test_analyzer(self):
+        cfg_ana = FakeCfg('ana')
+        analyzer = Analyzer(cfg_ana, None, self.outdir)
+        analyzer.beginLoop(None)
+        analyzer.counters.addCounter('events')
+        analyzer.counters['events'].register('all')
+        analyzer.counters['events'].inc('all', 3)
+        state = pickle.loads(pickle.dumps(analyzer.checkpoint(None)))
+        # the analyzer directory already exists when resuming
+        resumed = Analyzer(cfg_ana, None, self.outdir)
+        resumed.restore(None, state)
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(resumed.counters['events']['all'][1], 3)
+
+    def test_checkpoints_outputs(self):
+        cfg_ana = FakeCfg('ana')
+        self.assertTrue(Analyzer(cfg_ana, None, self.outdir).checkpoints_outputs())
+        self.assertFalse(Writer(cfg_ana, None, self.outdir).checkpoints_outputs())
+        self.assertTrue(
+            CheckpointedWriter(cfg_ana, None, self.outdir).checkpoints_outputs())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import shutil
+import tempfile
+import io
+import tarfile
+import threading
+import multiprocessing
+
+from heppy.framework.coordinator import Coordinator, work, parse_address, \
+     archive, extract
+from heppy.framework.parallel import split_in_ranges, merge_ranges
+from heppy.framework.test_parallel import FakeComponent, FakeEvents
+from heppy.framework.test_scheduler import fake_loop, crash
+
+AUTHKEY = 'test'
+
+def start_worker(address, run, workdir):
+    os.mkdir(workdir)
+    worker = multiprocessing.Process(target=work,
+                                     args=(address, AUTHKEY, run, workdir, 0.1))
+    worker.start()
+    return worker
+
+
+class CoordinatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.outdir = '/'.join([self.tmpdir, 'out'])
+        os.mkdir(self.outdir)
+        comp = FakeComponent('comp', files=['a.root', 'b.root'])
+        self.ranges = split_in_ranges([comp], 1, FakeEvents, range_size=3)
+        self.address = '/'.join([self.tmpdir, 'socket'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_outputs(self):
+        merge_ranges(self.outdir, self.ranges)
+        with open('/'.join([self.outdir, 'comp', 'log.txt'])) as log:
+            self.assertEqual(log.readlines()[-1],
+                             'number of events processed: 20\n')
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('localhost:6000'), ('localhost', 6000))
+        self.assertEqual(parse_address('/tmp/socket'), '/tmp/socket')
+
+    def test_run(self):
+        # comp_Range1 fails once in each worker
+        coordinator = Coordinator(self.address, self.outdir, AUTHKEY,
+                                  maxRetries=2, timeout=0.1)
+        workers = [start_worker(self.address, fake_loop,
+                                '/'.join([self.tmpdir, 'work{}'.format(i)]))
+                   for i in range(2)]
+        failed = coordinator.run(self.ranges)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(failed, [])
+        self.assertEqual(coordinator.errors.keys(), ['comp_Range1'])
+        self.check_outputs()
+
+    def test_disconnect(self):
+        coordinator = Coordinator(self.address, self.outdir, AUTHKEY,
+                                  timeout=0.1)
+        failed = []
+        thread = threading.Thread(
+            target=lambda: failed.extend(coordinator.run(self.ranges))
+        )
+        thread.start()
+        # dies while processing its first range
+        crashing = start_worker(self.address, crash,
+                                '/'.join([self.tmpdir, 'crash']))
+        crashing.join()
+        worker = start_worker(self.address, fake_loop,
+                              '/'.join([self.tmpdir, 'work']))
+        thread.join()
+        worker.join()
+        self.assertEqual(failed, [])
+        self.check_outputs()
+
+    def test_extract(self):
+        compdir = '/'.join([self.tmpdir, 'comp'])
+        os.mkdir(compdir)
+        with open('/'.join([compdir, 'log.txt']), 'w') as log:
+            log.write('done\n')
+        extract(archive([compdir]), self.outdir)
+        self.assertTrue(os.path.isfile('/'.join([self.outdir, 'comp', 'log.txt'])))
+
+    def test_extract_unsafe(self):
+        def make_archive(name, kind=tarfile.REGTYPE):
+            data = io.BytesIO()
+            with tarfile.open(fileobj=data, mode='w:gz') as tar:
+                info = tarfile.TarInfo(name)
+                info.type = kind
+                if kind == tarfile.SYMTYPE:
+                    info.linkname = '/etc'
+                tar.addfile(info, io.BytesIO(''))
+            return data.getvalue()
+        for data in [make_archive('../evil.txt'),
+                     make_archive('comp/../../evil.txt'),
+                     make_archive('/tmp/evil.txt'),
+                     make_archive('comp', tarfile.SYMTYPE),
+                     make_archive('comp', tarfile.LNKTYPE)]:
+            self.assertRaises(ValueError, extract, data, self.outdir)
+        self.assertEqual(os.listdir(self.outdir), [])
+        self.assertEqual(os.listdir(self.tmpdir), ['out'])
+
+
+if __name__ == '__main__':
+    unittest.main()
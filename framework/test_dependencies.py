@@ -0,0 +1,114 @@
+import unittest
+
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.dependencies import DependencyGraph, optimize, \
+     input_branches
+
+class FakeCfg(object):
+    '''Analyzer configuration, without the dependency on ROOT of cfg.Analyzer.'''
+    def __init__(self, class_object, name, **params):
+        self.class_object = class_object
+        self.name = name
+        self.instance_label = name
+        for key, value in params.iteritems():
+            setattr(self, key, value)
+
+
+class Producer(Analyzer):
+    consumes = ['input']
+    produces = ['output']
+
+
+class Modifier(Analyzer):
+    consumes = ['input']
+    produces = ['input']
+
+
+class Filter(Analyzer):
+    consumes = ['input']
+    produces = []
+    is_filter = True
+
+
+class TreeProducer(Analyzer):
+    consumes = ['inputs']
+    produces = []
+
+
+class Undeclared(Analyzer):
+    pass
+
+
+class Reader(Analyzer):
+    input_branches = ['particles', 'jets']
+
+
+class DependenciesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.gen = FakeCfg(Undeclared, 'gen')
+        self.leptons = FakeCfg(Producer, 'leptons', input='particles', output='leptons')
+        self.jets = FakeCfg(Producer, 'jets', input='particles', output='jets')
+        self.unused = FakeCfg(Producer, 'unused', input='jets', output='unused')
+        self.zeds = FakeCfg(Producer, 'zeds', input='leptons', output='zeds')
+        self.filter = FakeCfg(Filter, 'filter', input='zeds')
+        self.tree = FakeCfg(TreeProducer, 'tree', inputs=['zeds', 'jets'])
+        self.sequence = [self.gen, self.leptons, self.jets, self.unused,
+                         self.zeds, self.filter, self.tree]
+
+    def test_products(self):
+        self.assertEqual(Producer.consumed(self.leptons), ['particles'])
+        self.assertEqual(TreeProducer.consumed(self.tree), ['zeds', 'jets'])
+        self.assertEqual(Filter.produced(self.filter), [])
+        self.assertIsNone(Undeclared.produced(self.gen))
+
+    def test_parents(self):
+        graph = DependencyGraph(self.sequence)
+        self.assertEqual(graph.parents[0], set())
+        # particles come from the undeclared analyzer
+        self.assertEqual(graph.parents[1], set([0]))
+        self.assertEqual(graph.parents[4], set([1]))
+        self.assertEqual(graph.parents[6], set([2, 4]))
+
+    def test_pruned(self):
+        graph = DependencyGraph(self.sequence)
+        self.assertEqual(graph.pruned(),
+                         [self.gen, self.leptons, self.jets,
+                          self.zeds, self.filter, self.tree])
+        # the unused product can be explicitly kept
+        self.assertEqual(len(graph.pruned(keep=['unused'])), len(self.sequence))
+        # a trailing undeclared analyzer may need everything
+        sequence = self.sequence + [FakeCfg(Undeclared, 'user')]
+        self.assertEqual(DependencyGraph(sequence).pruned(), sequence)
+
+    def test_optimize(self):
+        optimized = optimize(self.sequence)
+        self.assertEqual(optimized,
+                         [self.gen, self.leptons, self.zeds, self.filter,
+                          self.jets, self.tree])
+
+    def test_filter_not_moved(self):
+        # a filter is not moved before an analyzer that is not a pure producer
+        sequence = [self.gen, self.leptons, self.zeds, self.tree, self.filter]
+        self.assertEqual(DependencyGraph(sequence).filters_moved_up(), sequence)
+
+    def test_filter_not_moved_over_modifier(self):
+        # sel reads the jets before they are modified by btag,
+        # it cannot be moved after btag
+        sel = FakeCfg(Producer, 'sel', input='jets', output='seljets')
+        btag = FakeCfg(Modifier, 'btag', input='jets')
+        jet_filter = FakeCfg(Filter, 'filter', input='jets')
+        tree = FakeCfg(TreeProducer, 'tree', inputs=['seljets'])
+        sequence = [self.gen, sel, btag, jet_filter, tree]
+        self.assertEqual(optimize(sequence), sequence)
+
+    def test_input_branches(self):
+        reader = FakeCfg(Reader, 'reader', particles='GenParticle')
+        sequence = [reader] + self.sequence[1:]
+        self.assertEqual(input_branches(sequence), ['GenParticle'])
+        # the undeclared analyzer could read any branch
+        self.assertIsNone(input_branches(self.sequence))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from heppy.framework.fileindex import FileIndex, entry_offsets, locate
+
+class FakeReader(object):
+    '''Returns the trees of a file without ROOT, counting the calls.'''
+    def __init__(self):
+        self.nreads = 0
+
+    def __call__(self, fname):
+        self.nreads += 1
+        with open(fname) as infile:
+            return dict(events=int(infile.read()))
+
+
+class FileIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.fnames = []
+        for i, nentries in enumerate([10, 0, 5]):
+            fname = '/'.join([self.outdir, 'file{}.root'.format(i)])
+            with open(fname, 'w') as out:
+                out.write(str(nentries))
+            self.fnames.append(fname)
+        self.index_fname = '/'.join([self.outdir, 'index.json'])
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_index(self):
+        reader = FakeReader()
+        index = FileIndex(self.index_fname, reader)
+        nentries = [index.entries(fname, 'events') for fname in self.fnames]
+        self.assertEqual(nentries, [10, 0, 5])
+        self.assertEqual(reader.nreads, 3)
+        index.save()
+        # the files are not read again
+        index = FileIndex(self.index_fname, reader)
+        self.assertEqual(index.trees(self.fnames[0]), dict(events=10))
+        self.assertEqual(reader.nreads, 3)
+        self.assertRaises(ValueError, index.entries, self.fnames[0], 'tree')
+        self.assertIsNone(index.trees('root://eos/file.root'))
+
+    def test_modified(self):
+        reader = FakeReader()
+        index = FileIndex(self.index_fname, reader)
+        index.entries(self.fnames[0], 'events')
+        info = index.files[os.path.abspath(self.fnames[0])]
+        mtime = info['mtime']
+        with open(self.fnames[0], 'w') as out:
+            out.write('20')
+        os.utime(self.fnames[0], (mtime + 10, mtime + 10))
+        self.assertEqual(index.entries(self.fnames[0], 'events'), 20)
+        self.assertEqual(reader.nreads, 2)
+
+    def test_missing(self):
+        index = FileIndex(self.index_fname, FakeReader())
+        self.assertRaises(ValueError, index.trees,
+                          '/'.join([self.outdir, 'missing.root']))
+
+    def test_locate(self):
+        offsets = entry_offsets([10, 0, 5])
+        self.assertEqual(offsets, [0, 10, 10, 15])
+        self.assertEqual(locate(offsets, 0), (0, 0))
+        self.assertEqual(locate(offsets, 9), (0, 9))
+        # the empty file is skipped
+        self.assertEqual(locate(offsets, 10), (2, 0))
+        self.assertEqual(locate(offsets, 14), (2, 4))
+        self.assertRaises(IndexError, locate, offsets, 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from heppy.framework.memcheck import MemoryReport, rss
+
+class LeakyAnalyzer(object):
+    '''Keeps a reference to the objects created at each event.'''
+    name = 'leaky'
+    size = 10000
+    def __init__(self):
+        self.store = []
+
+    def process(self, event):
+        self.store.append(bytearray(self.size))
+
+
+class CleanAnalyzer(object):
+    name = 'clean'
+    def process(self, event):
+        tmp = bytearray(10000)
+
+
+class MemCheckTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def run_report(self, report, analyzers, nevents=50):
+        report.start()
+        for iEv in range(nevents):
+            for index, analyzer in enumerate(analyzers):
+                report.before()
+                analyzer.process(None)
+                report.after(index, iEv)
+            report.end_event()
+        report.stop()
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc not available')
+    def test_leak(self):
+        analyzers = [CleanAnalyzer(), LeakyAnalyzer()]
+        report = MemoryReport(analyzers, firstEvent=0)
+        report.snapshot_interval = 10
+        self.run_report(report, analyzers)
+        self.assertEqual(report.nevents, 50)
+        self.assertTrue(report.net[0] < 10000)
+        self.assertTrue(report.net[1] >= 50 * 10000)
+        stat, analyzer = report.suspects[0]
+        self.assertEqual(analyzer, 'leaky')
+        fname = '/'.join([self.outdir, 'memory.txt'])
+        report.write(fname)
+        self.assertTrue(os.path.isfile(fname))
+
+    def test_rss(self):
+        analyzers = [CleanAnalyzer(), LeakyAnalyzer()]
+        analyzers[1].size = 1 << 20
+        report = MemoryReport(analyzers, firstEvent=0)
+        report.tracemalloc = None
+        self.run_report(report, analyzers, 100)
+        self.assertEqual(report.nevents, 100)
+        # the leaked memory is touched, and grows the resident memory
+        self.assertTrue(report.net[1] > 50 * (1 << 20))
+        self.assertTrue(report.net[1] > 10 * report.net[0])
+        self.assertEqual(report.suspects, [])
+        fname = '/'.join([self.outdir, 'memory.txt'])
+        report.write(fname)
+        self.assertTrue(os.path.isfile(fname))
+        # the current resident memory, not the peak
+        leaky = analyzers[1]
+        before = rss()
+        del leaky.store[:]
+        self.assertTrue(rss() < before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from heppy.framework.parallel import entry_ranges, split_in_ranges, \
+     merge_ranges, range_base_name, balanced_chunks, split_by_entries, \
+     component_base_name, clamp_range
+from heppy.framework.fileindex import FileIndex
+from heppy.statistics.counter import Counter
+
+class FakeComponent(object):
+    def __init__(self, name, files):
+        self.name = name
+        self.files = files
+
+
+class FakeEvents(object):
+    '''Events class with a fixed number of entries per file.'''
+    def __init__(self, files, tree_name=None):
+        self.files = files
+
+    def __len__(self):
+        return 10 * len(self.files)
+
+
+class ParallelTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_entry_ranges(self):
+        ranges = entry_ranges(10, 3)
+        self.assertEqual(ranges, [(0, 4), (4, 3), (7, 3)])
+        ranges = entry_ranges(10, 3, first=5)
+        self.assertEqual(ranges[0], (5, 4))
+        self.assertEqual(sum(n for first, n in ranges), 10)
+        # less entries than ranges
+        self.assertEqual(entry_ranges(2, 4), [(0, 1), (1, 1)])
+        self.assertRaises(ValueError, entry_ranges, 10, 0)
+
+    def test_split_in_ranges(self):
+        comp = FakeComponent('comp', files=['a.root', 'b.root'])
+        comps = split_in_ranges([comp], 3, FakeEvents)
+        self.assertEqual(len(comps), 3)
+        self.assertEqual(comps[1].name, 'comp_Range1')
+        self.assertEqual(range_base_name(comps[1].name), 'comp')
+        self.assertEqual(component_base_name(comps[1].name), 'comp')
+        self.assertEqual(component_base_name('comp_Chunk3_Range12'), 'comp')
+        self.assertEqual(component_base_name('comp_Chunk3'), 'comp')
+        self.assertEqual([c.entryRange for c in comps],
+                         [(0, 7), (7, 7), (14, 6)])
+        # maximum number of events
+        comps = split_in_ranges([comp], 3, FakeEvents, nevents=6)
+        self.assertEqual([c.entryRange for c in comps],
+                         [(0, 2), (2, 2), (4, 2)])
+
+    def test_split_fine_split(self):
+        comp = FakeComponent('comp_Chunk1', files=['a.root'])
+        comp.fineSplit = (1, 2)
+        comps = split_in_ranges([comp], 2, FakeEvents)
+        self.assertEqual([c.entryRange for c in comps],
+                         [(5, 3), (8, 2)])
+        self.assertFalse(hasattr(comps[0], 'fineSplit'))
+
+    def test_balanced_chunks(self):
+        chunks = balanced_chunks([100, 10, 0, 10], 3)
+        # first file, last file, first entry, number of entries
+        self.assertEqual(chunks, [(0, 0, 0, 40), (0, 0, 40, 40),
+                                  (0, 3, 80, 40)])
+        self.assertEqual(balanced_chunks([1], 3), [(0, 0, 0, 1)])
+
+    def test_split_by_entries(self):
+        files = []
+        for name in ['a.root', 'b.root']:
+            fname = '/'.join([self.outdir, name])
+            open(fname, 'w').close()
+            files.append(fname)
+        # index filled without opening the files with ROOT
+        index_fname = '/'.join([self.outdir, 'index.json'])
+        nentries = iter([30, 10])
+        index = FileIndex(index_fname,
+                          reader=lambda fname: dict(events=next(nentries)))
+        for fname in files:
+            index.trees(fname)
+        index.save()
+        comp = FakeComponent('comp', files=files)
+        comp.file_index = index_fname
+        comps = split_by_entries(comp, 2)
+        self.assertEqual([c.name for c in comps], ['comp_Chunk0', 'comp_Chunk1'])
+        self.assertEqual(comps[0].files, files[:1])
+        self.assertEqual(comps[0].entryRange, (0, 20))
+        self.assertEqual(comps[1].files, files)
+        self.assertEqual(comps[1].entryRange, (20, 20))
+        # the first 25 events of the chunks
+        for chunk in comps:
+            chunk.file_index = None
+        ranges = split_in_ranges(comps, 2, FakeEvents, nevents=25)
+        self.assertEqual([c.entryRange for c in ranges],
+                         [(0, 10), (10, 10), (20, 10), (30, 10)])
+        ranges = split_in_ranges(comps, 2, FakeEvents, nevents=5)
+        self.assertEqual([c.entryRange for c in ranges],
+                         [(0, 3), (3, 2), (20, 3), (23, 2)])
+        self.assertEqual(clamp_range((20, 20), None), (20, 20))
+        self.assertEqual(clamp_range((20, 20), -1), (20, 20))
+        # the chunks do not cover the entries of an entry_list
+        comp.entry_list = 'entry_list.root'
+        self.assertRaises(ValueError, split_by_entries, comp, 2)
+
+    def test_merge_ranges(self):
+        comp = FakeComponent('comp', files=['a.root', 'b.root'])
+        comps = split_in_ranges([comp], 2, FakeEvents)
+        for rcomp in comps:
+            rdir = '/'.join([self.outdir, rcomp.name])
+            os.mkdir(rdir)
+            counter = Counter('counter')
+            counter.register('all events')
+            counter.inc('all events', rcomp.entryRange[1])
+            counter.write(rdir)
+            with open('/'.join([rdir, 'log.txt']), 'w') as log:
+                log.write('number of events processed: {nev}\n'.format(
+                    nev=rcomp.entryRange[1]))
+        merge_ranges(self.outdir, comps)
+        self.assertEqual(os.listdir(self.outdir), ['comp'])
+        with open('/'.join([self.outdir, 'comp', 'counter.txt'])) as txt:
+            self.assertTrue('20' in txt.read())
+        with open('/'.join([self.outdir, 'comp', 'log.txt'])) as log:
+            self.assertEqual(log.read().strip(),
+                             'number of events processed: 20')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import os
+import shutil
+import sys
+import time
+import tempfile
+import multiprocessing
+
+from heppy.framework.pipeline import RingBuffer, pack, unpack, _collect, \
+     run_processes, PipelineError
+from heppy.statistics.counter import Counter
+
+class FakeEvent(object):
+    def __init__(self, iEv):
+        self.iEv = iEv
+        self.input = 'not sent'
+        self.setup = 'not sent'
+
+
+def produce(buf, first, n):
+    for i in range(first, first + n):
+        buf.put(str(i))
+
+def consume(buf, out):
+    while True:
+        data = buf.get()
+        if data is None:
+            break
+        out.put(int(data))
+    out.put(None)
+
+def crash(buf):
+    sys.exit(1)
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_ring_buffer(self):
+        buf = RingBuffer(nslots=4, slot_size=16)
+        out = multiprocessing.Queue()
+        producers = [multiprocessing.Process(target=produce,
+                                             args=(buf, first, 50))
+                     for first in [0, 50]]
+        consumers = [multiprocessing.Process(target=consume, args=(buf, out))
+                     for i in range(3)]
+        for process in producers + consumers:
+            process.start()
+        for process in producers:
+            process.join()
+        for process in consumers:
+            buf.put(None)
+        received = []
+        ndone = 0
+        while ndone < len(consumers):
+            value = out.get()
+            if value is None:
+                ndone += 1
+            else:
+                received.append(value)
+        for process in consumers:
+            process.join()
+        self.assertEqual(sorted(received), range(100))
+        self.assertRaises(ValueError, buf.put, 'x' * 17)
+
+    def test_failure(self):
+        # the readers fill the buffer, and the only consumer dies
+        buf = RingBuffer(nslots=4, slot_size=16, poll=0.01)
+        readers = [multiprocessing.Process(target=produce,
+                                           args=(buf, first, 50))
+                   for first in [0, 50]]
+        workers = [multiprocessing.Process(target=crash, args=(buf,))]
+        start = time.time()
+        self.assertRaises(PipelineError, run_processes, readers, workers,
+                          buf, 0.01)
+        self.assertTrue(time.time() - start < 10.)
+        for process in readers + workers:
+            self.assertFalse(process.is_alive())
+        self.assertRaises(PipelineError, buf.get)
+
+    def test_pack(self):
+        event = FakeEvent(3)
+        event.jets = [1., 2.]
+        products = unpack(pack(event))
+        self.assertEqual(products, dict(iEv=3, jets=[1., 2.]))
+
+    def test_collect(self):
+        looperdir = '/'.join([self.outdir, 'looper'])
+        os.makedirs('/'.join([looperdir, 'ana']))
+        idirs = []
+        for i in range(2):
+            idir = '/'.join([self.outdir, 'worker{}'.format(i)])
+            os.makedirs('/'.join([idir, 'ana']))
+            counter = Counter('counter')
+            counter.register('all events')
+            counter.inc('all events', 10)
+            counter.write('/'.join([idir, 'ana']))
+            with open('/'.join([idir, 'log.txt']), 'w') as log:
+                log.write('number of events processed: 10\n')
+            idirs.append(idir)
+        nev = _collect(looperdir, self.outdir, 'workers', idirs, '')
+        self.assertEqual(nev, 20)
+        with open('/'.join([looperdir, 'ana', 'counter.txt'])) as txt:
+            self.assertTrue('20' in txt.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from heppy.framework.planner import ComponentCost, Plan, makespan
+
+class FakeComponent(object):
+    def __init__(self, name):
+        self.name = name
+        self.splitFactor = 5
+
+
+class PlannerTestCase(unittest.TestCase):
+
+    def test_makespan(self):
+        self.assertEqual(makespan([1., 1., 1., 1.], 2), 2.)
+        self.assertEqual(makespan([3., 2., 2., 1.], 2), 4.)
+        self.assertEqual(makespan([5., 1.], 4), 5.)
+
+    def test_plan(self):
+        costs = [ComponentCost('large', 100000, 1., 0.01, 500.),
+                 ComponentCost('small', 1000, 1., 0.01, 500.)]
+        plan = Plan(costs, target_time=100., max_workers=64)
+        # 1000 s of processing in chunks of at most 25 s
+        self.assertEqual(plan.nchunks['large'], 42)
+        self.assertEqual(plan.nchunks['small'], 1)
+        self.assertTrue(plan.feasible())
+        self.assertTrue(plan.makespan <= 100.)
+        # one worker less does not fit in the target time
+        self.assertEqual(plan.nworkers, 11)
+        comps = [FakeComponent('large'), FakeComponent('small')]
+        plan.apply(comps)
+        self.assertEqual(comps[0].entrySplitFactor, 42)
+        self.assertFalse(hasattr(comps[0], 'splitFactor'))
+
+    def test_long_startup(self):
+        # the start-up time is longer than the chunk time of 25 s
+        costs = [ComponentCost('comp', 100000, 30., 0.01, 100.)]
+        plan = Plan(costs, target_time=100., max_workers=64)
+        # 1000 s of processing in chunks of 30 s
+        self.assertEqual(plan.nchunks['comp'], 34)
+        self.assertTrue(plan.feasible())
+        self.assertTrue(plan.makespan < costs[0].duration(100000))
+
+    def test_not_feasible(self):
+        costs = [ComponentCost('comp', 100000, 1., 0.01, 500.)]
+        plan = Plan(costs, target_time=100., max_workers=2)
+        self.assertEqual(plan.nworkers, 2)
+        self.assertFalse(plan.feasible())
+        plan = Plan(costs, target_time=1e4, max_memory=100.)
+        self.assertEqual(plan.too_large, ['comp'])
+        self.assertFalse(plan.feasible())
+        self.assertTrue('WARNING' in plan.summary()[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from heppy.framework.products import ProductStore, product_size
+from heppy.framework.test_dependencies import FakeCfg, Producer, \
+     TreeProducer, Undeclared
+
+class FakeEvent(object):
+    def __init__(self, iEv):
+        self.iEv = iEv
+        self.input = None
+        self.setup = None
+
+
+class ProductsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sequence = [
+            FakeCfg(Undeclared, 'gen'),
+            FakeCfg(Producer, 'leptons', input='particles', output='leptons'),
+            FakeCfg(Producer, 'zeds', input='leptons', output='zeds'),
+            FakeCfg(TreeProducer, 'tree', inputs=['zeds']),
+        ]
+
+    def run_sequence(self, store):
+        event = FakeEvent(0)
+        event.particles = range(100)
+        remaining = []
+        for index, cfg_ana in enumerate(self.sequence):
+            if cfg_ana.name == 'leptons':
+                event.leptons = event.particles[:2]
+            elif cfg_ana.name == 'zeds':
+                event.zeds = [tuple(event.leptons)]
+            store.release(event, index)
+            remaining.append(sorted(name for name in event.__dict__
+                                    if name not in ['iEv', 'input', 'setup']))
+        store.end_event(event)
+        return remaining
+
+    def test_release(self):
+        store = ProductStore(self.sequence)
+        self.assertEqual(store.releases,
+                         [[], ['particles'], ['leptons'], ['zeds']])
+        remaining = self.run_sequence(store)
+        self.assertEqual(remaining[1], ['leptons'])
+        self.assertEqual(remaining[3], [])
+
+    def test_keep(self):
+        store = ProductStore(self.sequence, keep=['leptons'])
+        remaining = self.run_sequence(store)
+        self.assertEqual(remaining[3], ['leptons'])
+
+    def test_undeclared(self):
+        # an undeclared analyzer at the end may read any product
+        sequence = self.sequence + [FakeCfg(Undeclared, 'user')]
+        store = ProductStore(sequence)
+        self.assertEqual(store.releases, [[]] * len(sequence))
+
+    def test_debug(self):
+        store = ProductStore(self.sequence, release=False, debug=True)
+        self.run_sequence(store)
+        self.assertEqual(sorted(store.sizes), ['leptons', 'particles', 'zeds'])
+        self.assertTrue(store.sizes['particles'].max >
+                        store.sizes['leptons'].max)
+        self.assertEqual(len(store.summary()), 7)
+
+    def test_product_size(self):
+        shared = range(1000)
+        self.assertEqual(product_size([shared, shared]),
+                         product_size([shared]) + 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
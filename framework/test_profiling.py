@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from heppy.framework.profiling import LatencyHistogram, TimeReport
+
+class ProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_quantiles(self):
+        hist = LatencyHistogram()
+        for i in range(1, 101):
+            hist.add(i * 1e-3)
+        self.assertEqual(hist.count, 100)
+        self.assertAlmostEqual(hist.mean(), 50.5e-3)
+        self.assertEqual(hist.max, 0.1)
+        # precision given by the bin width
+        self.assertAlmostEqual(hist.quantile(0.5), 50e-3, delta=6e-3)
+        self.assertAlmostEqual(hist.quantile(0.9), 90e-3, delta=11e-3)
+        self.assertTrue(hist.quantile(0.99) <= hist.max)
+
+    def test_report(self):
+        report = TimeReport(['ana1', 'ana2'])
+        report.start()
+        for iEv in range(10):
+            report.record(0, 1e-3, iEv)
+            if iEv % 2:
+                report.record(1, 2e-3, iEv, nout=0)
+            report.tick(iEv+1)
+        report.record(0, 1., 42)
+        report.tick(11, force=True)
+        ana1, ana2 = report.profiles
+        self.assertEqual(ana1.events_in, 11)
+        self.assertEqual(ana2.events_in, 5)
+        self.assertEqual(ana2.efficiency(), 0.)
+        self.assertEqual(max(ana1.slowest), (1., 42))
+        self.assertEqual(report.throughput[0][-1][1], 11)
+        self.assertTrue('TOTAL' in str(report))
+
+    def test_write_and_add(self):
+        report = TimeReport(['ana1'])
+        report.start()
+        report.record(0, 1e-3, 0)
+        fname = '/'.join([self.outdir, 'timing.json'])
+        report.write(fname)
+        other = TimeReport.read(fname)
+        self.assertEqual(other.profiles[0].events_in, 1)
+        other += report
+        self.assertEqual(other.profiles[0].events_in, 2)
+        self.assertEqual(len(other.throughput), 2)
+        self.assertRaises(ValueError, other.__iadd__, TimeReport(['a', 'b']))
+
+
+if __name__ == '__main__':
+    unittest.main()
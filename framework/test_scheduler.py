@@ -0,0 +1,79 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from heppy.framework.scheduler import Scheduler
+from heppy.framework.parallel import split_in_ranges, merge_ranges
+from heppy.framework.test_parallel import FakeComponent, FakeEvents
+from heppy.statistics.counter import Counter
+
+def fake_loop(comp, outDir):
+    '''Writes the outputs of a looper processing comp,
+    failing the first time for the components called *_Range1.'''
+    if comp.name.endswith('_Range1'):
+        marker = '/'.join([outDir, 'failed_once'])
+        if not os.path.isfile(marker):
+            open(marker, 'w').close()
+            raise ValueError('first attempt fails')
+    odir = '/'.join([outDir, comp.name])
+    os.mkdir(odir)
+    counter = Counter('counter')
+    counter.register('all events')
+    counter.inc('all events', comp.entryRange[1])
+    counter.write(odir)
+    with open('/'.join([odir, 'log.txt']), 'w') as log:
+        log.write('number of events processed: {nev}\n'.format(
+            nev=comp.entryRange[1]))
+
+def crash(comp, outDir):
+    os._exit(1)
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        comp = FakeComponent('comp', files=['a.root', 'b.root'])
+        self.ranges = split_in_ranges([comp], 1, FakeEvents, range_size=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_run(self):
+        self.assertEqual(len(self.ranges), 7)
+        scheduler = Scheduler(self.outdir, fake_loop, nworkers=3, timeout=0.1)
+        failed = scheduler.run(self.ranges)
+        self.assertEqual(failed, [])
+        self.assertEqual(scheduler.errors.keys(), ['comp_Range1'])
+        # the ranges are merged by the workers
+        self.assertFalse(any(name.startswith('comp_Range')
+                             for name in os.listdir(self.outdir)))
+        merge_ranges(self.outdir, self.ranges)
+        self.assertEqual(sorted(os.listdir(self.outdir)),
+                         ['comp', 'failed_once'])
+        with open('/'.join([self.outdir, 'comp', 'log.txt'])) as log:
+            self.assertEqual(log.readlines()[-1],
+                             'number of events processed: 20\n')
+
+    def test_recycle(self):
+        # every worker is replaced after each range
+        scheduler = Scheduler(self.outdir, fake_loop, nworkers=2,
+                              timeout=0.1, maxMemory=1e-3)
+        failed = scheduler.run(self.ranges)
+        self.assertEqual(failed, [])
+        merge_ranges(self.outdir, self.ranges)
+        with open('/'.join([self.outdir, 'comp', 'log.txt'])) as log:
+            self.assertEqual(log.readlines()[-1],
+                             'number of events processed: 20\n')
+
+    def test_failure(self):
+        scheduler = Scheduler(self.outdir, crash, nworkers=2,
+                              maxRetries=1, timeout=0.1)
+        failed = scheduler.run(self.ranges[:2])
+        self.assertEqual(failed, ['comp_Range0', 'comp_Range1'])
+        self.assertEqual(len(scheduler.errors['comp_Range0']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 #todo remove pfevent from this class once we have written a helper class to print the block and its elements
-from DAG import Node, DAGFloodFill
+from DAG import Node
+from unionfind import connected_components
 from heppy.utils.pdebug import pdebugger
 from heppy.papas.data.identifier import Identifier
 import collections
@@ -7,17 +8,17 @@ import collections
 
 
 class GraphBuilder(object):
-    ''' GraphBuilder takes a set of identifiers and a dict of associated edges which have distance and link info
+    ''' GraphBuilder takes a set of identifiers and the associated edges which have distance and link info
         It uses the distances between elements to construct a set of subgraphs
         Each element will end up in one (and only one) subgraph
         
         attributes:
 
         ids   : list of unique identifiers eg of tracks, clusters etc
-        edges : dict of edges which contains all edges between the ids (and maybe more)
+        edges : SparseEdges which contains all linked edges between the ids (and maybe more)
                 an edge records the distance between two ids
-        nodes : a set of nodes corresponding to the unique ids which is used to construct a graph
-                and thus find distinct blocks
+        nodes : a dict of nodes corresponding to the unique ids, linked according to the edges
+                only made if needed, e.g. to traverse the graph
         subgraphs : a list of subgraphs, each subgraph is a list of connected ids
 
         Usage example:
@@ -27,29 +28,33 @@ class GraphBuilder(object):
     def __init__(self, ids, edges):
         '''
         ids   : list of unique identifiers eg of tracks, clusters etc
-        edges : dict of edges which contains all edges between the ids (and maybe more)
+        edges : SparseEdges which contains all linked edges between the ids (and maybe more)
                 an edge records the distance/link between two ids
         '''
         self.ids = ids
         self.edges = edges
+        self._nodes = None
 
-        # build the block nodes (separate graph which will use distances between items to determine links)
-        self.nodes = dict((idt, Node(idt)) for idt in ids)
-        for edge in edges.itervalues():
-            #add linkage info into the nodes dictionary
-            if  edge.linked: #this is actually an undirected link - OK for undirected searches 
-                self.nodes[edge.id1].add_child(self.nodes[edge.id2])
-
-        # build the subgraphs of connected nodes
+        # build the subgraphs of connected ids with a union-find.
+        # the ids are taken in the order of a dict of the ids, as the nodes were
+        # in the former flood fill, so that the subgraphs come in the same order
+        ordered_ids = list(dict((idt, None) for idt in ids))
+        links = ((edge.id1, edge.id2) for edge in edges.itervalues() if edge.linked)
         self.subgraphs = []
-        for subgraphlist in DAGFloodFill(self.nodes).blocks: # change to subgraphs
-            element_ids = [] 
-            # NB the nodes that are found by FloodFill are the Nodes describing links between items
-            # we want the ids of these nodes
-            for node in subgraphlist:
-                element_ids.append(node.get_value())        
+        for element_ids in connected_components(ordered_ids, links):
             self.subgraphs.append(sorted(element_ids)) #newsort
 
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            # build the block nodes (separate graph which will use distances between items to determine links)
+            self._nodes = dict((idt, Node(idt)) for idt in self.ids)
+            for edge in self.edges.itervalues():
+                #add linkage info into the nodes dictionary
+                if  edge.linked: #this is actually an undirected link - OK for undirected searches
+                    self._nodes[edge.id1].add_child(self._nodes[edge.id2])
+        return self._nodes
+
     def __str__(self):
         descrip = "{ "
         
@@ -0,0 +1,122 @@
+from heppy.papas.graphtools.edge import Edge
+
+class SparseEdges(object):
+    '''Stores the edges between elements, keeping only the linked edges.
+
+    Storing an Edge for each pair of elements costs a memory growing as N^2.
+    Only the linked edges are stored, in an adjacency dictionary.
+    The edges of unlinked pairs are rarely needed, e.g. to print the distances
+    between the elements of a block. They are made on demand by make_edge,
+    and kept for later use.
+
+    attributes:
+
+    adjacency : dictionary of the linked edges {id1 : {id2 : edge}},
+                each edge is found from both of its ids
+    unlinked : dictionary of the unlinked edges made on demand {edgekey : edge}
+    make_edge : function returning the Edge between two ids (with id1 < id2),
+                or None if the unlinked edges are never needed
+
+    Usage:
+        edges = SparseEdges(make_edge)
+        edges.add(Edge(id1, id2, is_linked, distance))
+        block_edges = edges.view(block_ids)
+        print block_edges.get_edge(id1, id2).distance
+    '''
+
+    def __init__(self, make_edge=None):
+        self.adjacency = dict()
+        self.unlinked = dict()
+        self.make_edge = make_edge
+
+    def add(self, edge):
+        '''stores the edge if it is linked'''
+        if edge.linked:
+            self.adjacency.setdefault(edge.id1, dict())[edge.id2] = edge
+            self.adjacency.setdefault(edge.id2, dict())[edge.id1] = edge
+
+    def unlink(self, edge):
+        '''removes the link of a stored edge'''
+        edge.linked = False
+        del self.adjacency[edge.id1][edge.id2]
+        del self.adjacency[edge.id2][edge.id1]
+        self.unlinked[edge.key] = edge
+
+    def get_edge(self, id1, id2):
+        '''returns the edge between id1 and id2, making it if it is not linked'''
+        edge = self.adjacency.get(id1, {}).get(id2, None)
+        if edge is not None:
+            return edge
+        key = Edge.make_key(id1, id2)
+        edge = self.unlinked.get(key, None)
+        if edge is None:
+            if self.make_edge is None:
+                raise KeyError('no edge between {} and {}'.format(id1, id2))
+            edge = self.make_edge(min(id1, id2), max(id1, id2))
+            if edge.linked:
+                raise ValueError('{} was not stored'.format(edge))
+            self.unlinked[key] = edge
+        return edge
+
+    def linked_edges(self, uniqueid):
+        '''returns the linked edges of uniqueid, ordered by the other id'''
+        neighbours = self.adjacency.get(uniqueid, {})
+        return [neighbours[other] for other in sorted(neighbours)]
+
+    def itervalues(self):
+        '''iterates over the linked edges'''
+        for uniqueid, neighbours in self.adjacency.iteritems():
+            for other, edge in neighbours.iteritems():
+                if uniqueid < other:
+                    yield edge
+
+    def view(self, ids):
+        '''returns the edges between the elements ids'''
+        return SparseEdgesView(self, ids)
+
+    def __len__(self):
+        return sum(len(neighbours) for neighbours in self.adjacency.itervalues()) / 2
+
+
+class SparseEdgesView(object):
+    '''Edges between a subset of the elements of a SparseEdges, e.g. the
+    elements of a block. Nothing is copied.
+
+    attributes:
+
+    store : the SparseEdges
+    ids : set of the element ids
+    '''
+
+    def __init__(self, store, ids):
+        self.store = store
+        self.ids = frozenset(ids)
+
+    def add(self, edge):
+        self.store.add(edge)
+
+    def unlink(self, edge):
+        self.store.unlink(edge)
+
+    def get_edge(self, id1, id2):
+        if id1 not in self.ids or id2 not in self.ids:
+            raise KeyError('no edge between {} and {}'.format(id1, id2))
+        return self.store.get_edge(id1, id2)
+
+    def linked_edges(self, uniqueid):
+        if uniqueid not in self.ids:
+            return []
+        return [edge for edge in self.store.linked_edges(uniqueid)
+                if edge.id1 in self.ids and edge.id2 in self.ids]
+
+    def itervalues(self):
+        for uniqueid in self.ids:
+            for edge in self.store.linked_edges(uniqueid):
+                if edge.id1 == uniqueid and edge.id2 in self.ids:
+                    yield edge
+
+    def view(self, ids):
+        return SparseEdgesView(self.store, self.ids.intersection(ids))
+
+    def __len__(self):
+        return sum(1 for edge in self.itervalues())
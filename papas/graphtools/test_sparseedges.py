@@ -0,0 +1,58 @@
+import unittest
+from heppy.papas.data.identifier import Identifier
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
+
+class SparseEdgesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ids = sorted(Identifier.make_id(Identifier.PFOBJECTTYPE.TRACK)
+                          for i in range(4))
+        self.made = []
+        self.edges = SparseEdges(self.make_edge)
+        id0, id1, id2, id3 = self.ids
+        self.edges.add(Edge(id0, id1, True, 0.1))
+        self.edges.add(Edge(id1, id2, True, 0.2))
+        self.edges.add(Edge(id0, id2, False, 0.3))
+
+    def make_edge(self, id1, id2):
+        self.made.append((id1, id2))
+        return Edge(id1, id2, False, 1.)
+
+    def test_linked(self):
+        id0, id1, id2, id3 = self.ids
+        self.assertEqual(len(self.edges), 2)
+        self.assertEqual(self.edges.get_edge(id2, id1).distance, 0.2)
+        self.assertEqual([edge.distance for edge in self.edges.linked_edges(id1)],
+                         [0.1, 0.2])
+        self.assertEqual(self.edges.linked_edges(id3), [])
+        self.assertEqual(sorted(edge.distance for edge in self.edges.itervalues()),
+                         [0.1, 0.2])
+
+    def test_unlinked(self):
+        id0, id1, id2, id3 = self.ids
+        # unlinked edges are not stored, and made once on demand
+        edge = self.edges.get_edge(id2, id0)
+        self.assertFalse(edge.linked)
+        self.assertEqual(edge.distance, 1.)
+        self.assertTrue(self.edges.get_edge(id0, id2) is edge)
+        self.assertEqual(self.made, [(id0, id2)])
+        self.assertRaises(KeyError, SparseEdges().get_edge, id0, id2)
+
+    def test_view(self):
+        id0, id1, id2, id3 = self.ids
+        view = self.edges.view([id0, id1, id3])
+        self.assertEqual(len(view), 1)
+        self.assertEqual([edge.distance for edge in view.linked_edges(id1)], [0.1])
+        self.assertRaises(KeyError, view.get_edge, id1, id2)
+        self.assertFalse(view.get_edge(id0, id3).linked)
+        # unlinking an edge through the view unlinks it in the store
+        view.unlink(view.get_edge(id0, id1))
+        self.assertEqual(len(view), 0)
+        self.assertEqual(len(self.edges), 1)
+        self.assertEqual(view.get_edge(id0, id1).distance, 0.1)
+        self.assertEqual(len(view.view([id0, id1])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import random
+from DAG import Node, DAGFloodFill
+from unionfind import UnionFind, connected_components
+from graphbuilder import GraphBuilder
+from heppy.papas.data.identifier import Identifier
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
+
+class UnionFindTestCase(unittest.TestCase):
+
+    def test_union(self):
+        sets = UnionFind(6)
+        self.assertTrue(sets.union(0, 3))
+        self.assertTrue(sets.union(4, 3))
+        self.assertFalse(sets.union(0, 4))
+        sets.union(5, 2)
+        self.assertEqual(sets.find(4), sets.find(0))
+        self.assertNotEqual(sets.find(1), sets.find(0))
+        self.assertEqual(sets.groups(), [[0, 3, 4], [1], [2, 5]])
+
+    def test_connected_components(self):
+        ids = ['a', 'b', 'c', 'd']
+        links = [('d', 'b'), ('c', 'd')]
+        self.assertEqual(connected_components(ids, links),
+                         [['a'], ['b', 'c', 'd']])
+
+    def test_graphbuilder(self):
+        '''same subgraphs, in the same order, as with the flood fill of DAG nodes'''
+        random.seed(0xdeadbeef)
+        ids = [Identifier.make_id(Identifier.PFOBJECTTYPE.TRACK)
+               for i in range(500)]
+        edges = SparseEdges()
+        for i in range(400):
+            id1, id2 = sorted(random.sample(ids, 2))
+            edges.add(Edge(id1, id2, True, 0.))
+        nodes = dict((idt, Node(idt)) for idt in ids)
+        for edge in edges.itervalues():
+            nodes[edge.id1].add_child(nodes[edge.id2])
+        subgraphs = [sorted(node.get_value() for node in block)
+                     for block in DAGFloodFill(nodes).blocks]
+        graph = GraphBuilder(ids, edges)
+        self.assertEqual(graph.subgraphs, subgraphs)
+        self.assertEqual(len(graph.nodes), len(ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+'''Union-find (disjoint-set) structure, to find connected subgraphs.
+
+The elements are numbered from 0 to n-1, and each link merges the sets of
+its two ends. Finding the set of an element follows the parents up to the
+root of the set, and compresses the path on the way, so that the cost of
+each operation is almost constant. No node object is allocated, and there
+is no recursion, whatever the size of the subgraphs.
+
+example:
+        sets = UnionFind(5)
+        sets.union(0, 3)
+        sets.union(3, 4)
+        sets.groups()  # [[0, 3, 4], [1], [2]]
+'''
+
+class UnionFind(object):
+    '''Disjoint sets of the integers 0 to n-1.
+
+    attributes:
+       parent = list giving the parent of each integer, roots are their own parents
+       size = list giving the size of the set of each root
+    '''
+
+    def __init__(self, n):
+        self.parent = range(n)
+        self.size = [1] * n
+
+    def find(self, i):
+        '''returns the root of the set of i'''
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        # path compression
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, i, j):
+        '''merges the sets of i and j.
+        returns False if they were already in the same set'''
+        root_i = self.find(i)
+        root_j = self.find(j)
+        if root_i == root_j:
+            return False
+        if self.size[root_i] < self.size[root_j]:
+            root_i, root_j = root_j, root_i
+        self.parent[root_j] = root_i
+        self.size[root_i] += self.size[root_j]
+        return True
+
+    def groups(self):
+        '''returns the list of the sets, each set being an increasing list of integers.
+        The sets are ordered by their smallest integer.'''
+        groups = []
+        group_of_root = dict()
+        for i in xrange(len(self.parent)):
+            root = self.find(i)
+            group = group_of_root.get(root, None)
+            if group is None:
+                group = []
+                group_of_root[root] = group
+                groups.append(group)
+            group.append(i)
+        return groups
+
+
+def connected_components(ids, links):
+    '''returns the connected subgraphs of a graph.
+
+    ids : list of the nodes of the graph, of any hashable type
+    links : iterable of the pairs of linked nodes (id1, id2)
+
+    Each subgraph is a list of nodes in the order of ids, and the subgraphs
+    are ordered by the position of their first node in ids.
+    '''
+    index = dict((idt, i) for i, idt in enumerate(ids))
+    sets = UnionFind(len(ids))
+    for id1, id2 in links:
+        sets.union(index[id1], index[id2])
+    return [[ids[i] for i in group] for group in sets.groups()]
@@ -1,8 +1,10 @@
 import itertools
 from heppy.papas.graphtools.graphbuilder import GraphBuilder
 from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
 from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfobjects import MergedCluster
+from heppy.papas.pfalgo.neighbours import all_pairs
 from heppy.papas.data.identifier import Identifier
 from heppy.utils.pdebug import pdebugger
 
@@ -19,7 +21,7 @@ class MergedClusterBuilder(GraphBuilder):
             event.ecal_clusters =  MergingBlockBuilder(event.ecal_clusters, ruler).merged
             
     '''
-    def __init__(self, clusters, ruler, history_nodes = None):
+    def __init__(self, clusters, ruler, history_nodes = None, neighbours = all_pairs):
         '''
         clusters a dictionary : {id1:ecal1, id2:ecal2, ...}
         ruler is something that measures distance between two objects eg track and hcal
@@ -37,6 +39,8 @@ class MergedClusterBuilder(GraphBuilder):
             If hist_nodes is not provided one will be created, it will contain nodes
             corresponding to each of the tracks, ecal etc and also for the blocks that
             are created by the event block builder.
+        neighbours proposes the pairs of clusters that may be linked by the ruler
+            (see pfalgo/neighbours.py). Only these pairs are measured.
         '''
         self.clusters = clusters
         
@@ -47,14 +51,11 @@ class MergedClusterBuilder(GraphBuilder):
         uniqueids = list(clusters.keys())         
              
         #make the edges match cpp by using the same approach as cpp
-        edges = dict()
-        for obj1 in  clusters.values():
-            for obj2 in  clusters.values():
-                if obj1.uniqueid < obj2.uniqueid :
-                    link_type, is_linked, distance = ruler(obj1, obj2)
-                    edge = Edge(obj1.uniqueid, obj2.uniqueid, is_linked, distance)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        # only the linked edges are kept
+        edges = SparseEdges()
+        for id1, id2 in neighbours(clusters.values()):
+            link_type, is_linked, distance = ruler(clusters[id1], clusters[id2])
+            edges.add(Edge(id1, id2, is_linked, distance))
 
         #make the subgraphs of clusters
         super(MergedClusterBuilder, self).__init__(uniqueids, edges)
@@ -84,5 +85,7 @@ class MergedClusterBuilder(GraphBuilder):
                     supercluster += thing
                 if (self.history_nodes) :
                     self.history_nodes[elemid].add_child(snode)
-                pdebugger.info('Merged Cluster from {}\n'.format(self.clusters[elemid]))
-            pdebugger.info(str('Made {}\n'.format(supercluster)))
+                if pdebugger.enabled:
+                    pdebugger.info('Merged Cluster from %s\n', self.clusters[elemid])
+            if pdebugger.enabled:
+                pdebugger.info('Made %s\n', supercluster)
@@ -1,12 +1,13 @@
 import math
-from scipy import constants
-from ROOT import TVector3, TLorentzVector
+from heppy.utils.lazyimport import LazyModule, ROOT
 from heppy.utils.deltar import deltaPhi
 from collections import OrderedDict
-import scipy.optimize as opti # need to compute impact parameters
-from numpy import sign
 import heppy.statistics.rrandom as random
 
+constants = LazyModule('scipy.constants')
+opti = LazyModule('scipy.optimize') # need to compute impact parameters
+numpy = LazyModule('numpy')
+
 class Path(object):
     '''Path followed by a particle in 3D space. 
     Assumes constant speed magnitude both along the z axis and in the transverse plane.
@@ -53,10 +54,10 @@ class Helix(Path):
         self.v_over_omega = p4.Vect()
         self.v_over_omega *= 1./(charge*field)*1e9/constants.c
         self.omega = charge*field*constants.c**2 / (p4.M()*p4.Gamma()*1e9)
-        momperp_xy = TVector3(-p4.Y(), p4.X(), 0.).Unit()
-        origin_xy = TVector3(origin.X(), origin.Y(), 0.)
+        momperp_xy = ROOT.TVector3(-p4.Y(), p4.X(), 0.).Unit()
+        origin_xy = ROOT.TVector3(origin.X(), origin.Y(), 0.)
         self.center_xy = origin_xy - charge * momperp_xy * self.rho
-        self.extreme_point_xy = TVector3(self.rho, 0, 0) 
+        self.extreme_point_xy = ROOT.TVector3(self.rho, 0, 0) 
         if self.center_xy.X()!=0 or self.center_xy.Y()!=0:
             self.extreme_point_xy = self.center_xy + self.center_xy.Unit() * self.rho
         # calculate phi range with the origin at the center,
@@ -77,19 +78,19 @@ class Helix(Path):
         return time
 
     def phi(self, x, y):
-        xy = TVector3(x,y,0)
+        xy = ROOT.TVector3(x,y,0)
         xy -= self.center_xy
         return xy.Phi()
         
     def point_from_polar(self, polar):
         rho,z,phi = polar
-        xy = self.center_xy + self.rho * TVector3(math.cos(phi), math.sin(phi), 0)
-        return TVector3(xy.X(), xy.Y(), z)
+        xy = self.center_xy + self.rho * ROOT.TVector3(math.cos(phi), math.sin(phi), 0)
+        return ROOT.TVector3(xy.X(), xy.Y(), z)
         
     def point_at_time(self, time):
         '''return a TVector3 with cartesian coordinates at time t'''
         x,y,z = self.coord_at_time(time)
-        return TVector3(x, y, z)
+        return ROOT.TVector3(x, y, z)
     
     def path_length(self, deltat):
         '''ds2 = dx2+dy2+dz2 = [w2rho2 + vz2] dt2'''
@@ -130,10 +131,10 @@ class Helix(Path):
         vector_IP = self.point_at_time(minim_answer[1]) - vertex
         Pj = jet.p4().Vect().Unit()
         signIP  = vector_IP.Dot(Pj)
-        self.IP = minim_answer[4]**(1.0/2)*sign(signIP)
+        self.IP = minim_answer[4]**(1.0/2)*numpy.sign(signIP)
         
         x,y,z = self.coord_at_time(minim_answer[1])
-        self.IPcoord = TVector3(x, y, z)
+        self.IPcoord = ROOT.TVector3(x, y, z)
        
     def compute_theta_0(self, x, X_0):
         '''Computes the square root of the variance, sigma, of the multiple
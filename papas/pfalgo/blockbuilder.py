@@ -1,4 +1,4 @@
-from heppy.papas.graphtools.DAG import Node, DAGFloodFill
+from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfalgo.pfblock import PFBlock
 from heppy.papas.graphtools.graphbuilder import GraphBuilder
 from heppy.utils.pdebug import pdebugger
@@ -7,7 +7,7 @@ from heppy.utils.pdebug import pdebugger
 
         
 class BlockBuilder(GraphBuilder):
-    ''' BlockBuilder takes a set of identifiers and a dict of associated edges which have distance and link info
+    ''' BlockBuilder takes a set of identifiers and the associated edges which have distance and link info
         It uses the distances between elements to construct a set of blocks
         Each element will end up in one (and only one block)
         Blocks retain information of the elements and the distances between elements
@@ -17,15 +17,15 @@ class BlockBuilder(GraphBuilder):
         attributes:
         
         ids   : list of unique identifiers eg of tracks, clusters etc
-        edges : dict of edges which contains all edges between the ids (and maybe more)
+        edges : SparseEdges which contains all linked edges between the ids (and maybe more)
                 an edge records the distance between two ids
         history_nodes : dictionary of nodes that describe which elements are parents of which blocks 
                         if a history_nodes tree is passed in then 
                         the additional history will be added into the exisiting history 
         pfevent : the particle flow event object which is needed so that the underlying object can 
                 be retrieved
-        nodes : a set of nodes corresponding to the unique ids which is used to construct a graph
-                and thus find distinct blocks
+        nodes : a dict of nodes corresponding to the unique ids, linked according to the edges
+                only made if needed, e.g. to traverse the graph
         blocks: the resulting blocks
     
         
@@ -38,7 +38,7 @@ class BlockBuilder(GraphBuilder):
     def __init__(self, ids, edges, history_nodes = None, pfevent = None):
         '''
         ids   : list of unique identifiers eg of tracks, clusters etc
-        edges : dict of edges which contains all edges between the ids (and maybe more)
+        edges : SparseEdges which contains all linked edges between the ids (and maybe more)
                 an edge records the distance/link between two ids
         history_nodes : optional dictionary of nodes that describe which elements are parents of which blocks 
                         if a history_nodes tree is passed in then 
@@ -69,7 +69,8 @@ class BlockBuilder(GraphBuilder):
         for subgraph in self.subgraphs:
             #make the block
             block = PFBlock(subgraph,  self.edges, self.pfevent)        
-            pdebugger.info("Made {}".format(block))
+            if pdebugger.enabled:
+                pdebugger.info('Made %s', block)
             #put the block in the dict of blocks            
             self.blocks[block.uniqueid] = block        
             
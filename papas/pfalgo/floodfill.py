@@ -1,3 +1,4 @@
+from heppy.papas.graphtools.unionfind import UnionFind
 
 
 class Node(object):
@@ -11,13 +12,6 @@ class Node(object):
         self.linked = []
         self.block_label = None
 
-    def accept(self, visitor):
-        '''Called by visitors, such as FloodFill.'''
-        notseen = visitor.visit(self)
-        if notseen:
-            for elem in self.linked:
-                elem.accept(visitor)
-
 
 class FloodFill(object):
     '''The flood fill algorithm finds all disconnected subgraphs in 
@@ -29,32 +23,42 @@ class FloodFill(object):
     The results can be accessed through the nodes themselves, 
     or through the groups attribute, which has the following form: 
       {0: [list of elements in subgraph0], 1: [list of elements in subgraph 1], ...}
+
+    The subgraphs are found with a union-find, without recursion,
+    so that there is no limit on their size.
+    The elements of a subgraph are in the order of the list of nodes,
+    followed by the elements linked to them which are not in the list.
     '''
     
     def __init__(self, elements, first_label=0):
         '''Perform the search for disconnected subgraphs on a list of elements 
         matching the interface given in this module.'''
         self.label = first_label
-        self.visited = dict()
         self.groups = dict()
+        # the elements, and the elements linked to them
+        nodes = []
+        index = dict()
         for elem in elements:
-            if self.visited.get(elem, False):
-                continue
-            elem.accept(self)
-            # print 'incrementing', elem, self.label
+            if elem not in index:
+                index[elem] = len(nodes)
+                nodes.append(elem)
+        i = 0
+        while i < len(nodes):
+            for linked in nodes[i].linked:
+                if linked not in index:
+                    index[linked] = len(nodes)
+                    nodes.append(linked)
+            i += 1
+        sets = UnionFind(len(nodes))
+        for i, elem in enumerate(nodes):
+            for linked in elem.linked:
+                sets.union(i, index[linked])
+        for group in sets.groups():
+            for i in group:
+                nodes[i].block_label = self.label
+            self.groups[self.label] = [nodes[i] for i in group]
             self.label += 1
 
-    def visit(self, element):
-        '''visit one element.'''
-        if self.visited.get(element, False):
-            return False
-        else:
-            # print 'visiting', element, self.label
-            element.block_label = self.label
-            self.groups.setdefault(element.block_label, []).append(element)
-            self.visited[element] = True
-            return True
-
     def __str__(self):
         lines = []
         for gid, group in self.groups.iteritems():
@@ -12,13 +12,6 @@ class Element(object):
         self.locked = False
         self.block_label = None
 
-    def accept(self, visitor):
-        '''Called by visitors, such as FloodFill.'''
-        notseen = visitor.visit(self)
-        if notseen:
-            for elem in self.linked:
-                elem.accept(visitor)
-
                 
 class Distance(object):
     '''Basic distance functor interface.
@@ -0,0 +1,164 @@
+'''Neighbour search for the link finding.
+
+The block builders measure the distance between pairs of elements with
+a ruler. Measuring all pairs costs N^2 ruler calls, which is too slow
+for events with many tracks and clusters, e.g. pp events with pileup.
+
+A neighbour search proposes the pairs of elements that may be linked,
+and only these pairs are given to the ruler:
+
+* AllPairs proposes all pairs, and can be used with any ruler;
+* GridNeighbours only proposes the pairs that the Distance ruler may link,
+  finding them with a grid:
+
+  - clusters of the same layer are linked if two of their subclusters
+    are closer in (theta, phi) than the sum of their angular sizes.
+    The subclusters are put in a (theta, phi) grid with cells of twice
+    the maximum angular size;
+  - a track is linked to a cluster if its point at the cluster layer
+    is inside one of the subclusters. The subclusters are put in an
+    (x, y, z) grid with cells of the maximum subcluster size.
+
+  ecal-hcal and track-track pairs are never linked, and never proposed.
+
+The links, and thus the blocks, are the same as with AllPairs.
+'''
+
+import math
+import itertools
+import collections
+
+
+class Grid(object):
+    '''Items stored in the cells of a regular grid, according to their
+    coordinates.
+
+    Two points whose coordinates differ by less than cellsize
+    are in the same cell or in adjacent cells.
+    '''
+
+    def __init__(self, cellsize, periods):
+        '''cellsize : minimum size of the cells
+        periods : for each coordinate, its period, or None if
+                  the coordinate is not periodic (e.g. [None, 2*math.pi]
+                  for theta, phi)
+        '''
+        self.widths = []
+        self.ncells = []
+        for period in periods:
+            if period is None:
+                self.widths.append(float(cellsize))
+                self.ncells.append(None)
+            else:
+                ncells = max(1, int(period / cellsize))
+                self.widths.append(float(period) / ncells)
+                self.ncells.append(ncells)
+        self.cells = collections.defaultdict(list)
+
+    def _cell(self, coords):
+        cell = []
+        for x, width, ncells in zip(coords, self.widths, self.ncells):
+            index = int(math.floor(x / width))
+            if ncells is not None:
+                index %= ncells
+            cell.append(index)
+        return tuple(cell)
+
+    def add(self, item, coords):
+        '''Adds item at coords.'''
+        self.cells[self._cell(coords)].append(item)
+
+    def near(self, coords):
+        '''Returns the items in the cell of coords and in the adjacent cells.'''
+        center = self._cell(coords)
+        cells = set()
+        for offsets in itertools.product((-1, 0, 1), repeat=len(center)):
+            cell = []
+            for index, offset, ncells in zip(center, offsets, self.ncells):
+                index += offset
+                if ncells is not None:
+                    index %= ncells
+                cell.append(index)
+            cells.add(tuple(cell))
+        items = []
+        for cell in cells:
+            items.extend(self.cells.get(cell, []))
+        return items
+
+
+def _pair(id1, id2):
+    return (id1, id2) if id1 < id2 else (id2, id1)
+
+
+class AllPairs(object):
+    '''Proposes all pairs of elements.'''
+
+    def __call__(self, elements):
+        '''elements: list of tracks and clusters
+        returns the list of the pairs of uniqueids (id1, id2) with id1 < id2
+        '''
+        uniqueids = sorted(elem.uniqueid for elem in elements)
+        return list(itertools.combinations(uniqueids, 2))
+
+
+class GridNeighbours(object):
+    '''Proposes the pairs of elements that the Distance ruler may link.'''
+
+    layers = ['ecal_in', 'hcal_in']
+
+    def __call__(self, elements):
+        '''elements: list of tracks and clusters
+        returns the sorted list of the pairs of uniqueids (id1, id2)
+        with id1 < id2 that may be linked
+        '''
+        tracks = [elem for elem in elements if elem.layer == 'tracker']
+        pairs = set()
+        for layer in self.layers:
+            clusters = [elem for elem in elements if elem.layer == layer]
+            if not clusters:
+                continue
+            pairs.update(self.cluster_pairs(clusters))
+            pairs.update(self.track_pairs(tracks, clusters, layer))
+        return sorted(pairs)
+
+    def cluster_pairs(self, clusters):
+        '''pairs of clusters with subclusters that may overlap.'''
+        subclusters = [(cluster.uniqueid, sub)
+                       for cluster in clusters for sub in cluster.subclusters]
+        max_angular_size = max(sub.angular_size() for uid, sub in subclusters)
+        if max_angular_size <= 0:
+            return set()
+        grid = Grid(2 * max_angular_size, [None, 2 * math.pi])
+        for uid, sub in subclusters:
+            grid.add(uid, (sub.position.Theta(), sub.position.Phi()))
+        pairs = set()
+        for uid, sub in subclusters:
+            for other in grid.near((sub.position.Theta(), sub.position.Phi())):
+                if other != uid:
+                    pairs.add(_pair(uid, other))
+        return pairs
+
+    def track_pairs(self, tracks, clusters, layer):
+        '''pairs of a track and a cluster that may contain
+        the track point at layer.'''
+        subclusters = [(cluster.uniqueid, sub)
+                       for cluster in clusters for sub in cluster.subclusters]
+        max_size = max(sub.size() for uid, sub in subclusters)
+        if max_size <= 0:
+            return set()
+        grid = Grid(max_size, [None, None, None])
+        for uid, sub in subclusters:
+            position = sub.position
+            grid.add(uid, (position.X(), position.Y(), position.Z()))
+        pairs = set()
+        for track in tracks:
+            point = track.path.points.get(layer, None)
+            if point is None:
+                continue
+            for uid in grid.near((point.X(), point.Y(), point.Z())):
+                pairs.add(_pair(track.uniqueid, uid))
+        return pairs
+
+
+all_pairs = AllPairs()
+grid_neighbours = GridNeighbours()
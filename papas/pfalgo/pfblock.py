@@ -1,5 +1,3 @@
-import itertools
-from heppy.papas.graphtools.edge import Edge
 from heppy.papas.data.identifier import Identifier
 
 #todo remove pfevent from this class once we have written a helper class to print the block and its elements
@@ -15,8 +13,9 @@ class PFBlock(object):
      element_uniqueids : list of uniqueids of its elements
      pfevent : contains the tracks and clusters and a get_object method to allow access to the
                underlying objects given their uniqueid
-     edges : Dictionary of all the edge cominations in the block dict{edgekey : Edge}
+     edges : view of the edges between the elements of the block (see SparseEdgesView)
              use  get_edge(id1,id2) to find an edge
+             use  unlink(edge) to remove a link, so that the link index is kept up to date
      is_active : bool true/false, set to false if the block is subsequently subdivided
 
      Usage:
@@ -30,9 +29,10 @@ class PFBlock(object):
     def __init__(self, element_ids, edges, pfevent):
         '''
             element_ids:  list of the uniqueids of the elements to go in this block [id1,id2,...]
-            edges: is a dictionary of edges, it must contain at least all needed edges.
+            edges: SparseEdges (or a view), containing at least the linked edges of the block.
                    It is not a problem if it contains
-                   additional edges as only the ones needed will be extracted
+                   additional edges as the block only sees the ones between its elements.
+                   The unlinked edges are made on demand by the SparseEdges
             pfevent: allows access to the underlying elements given a uniqueid
                      must provide a get_object function
         '''
@@ -50,12 +50,11 @@ class PFBlock(object):
         self.block_count = PFBlock.temp_block_count
         PFBlock.temp_block_count += 1
 
-        #extract the relevant parts of the complete set of edges and store this within the block
-        self.edges = dict()
-        for id1, id2 in itertools.combinations(self.element_uniqueids, 2):
-            key = Edge.make_key(id1, id2)
-            self.edges[key] = edges[key]
+        #view of the relevant part of the complete set of edges, nothing is copied
+        self.edges = edges.view(self.element_uniqueids)
 
+        #index of the linked edges of each element, made at the first link query
+        self._links = None
 
     def count_ecal(self):
         ''' Counts how many ecal cluster ids are in the block '''
@@ -90,17 +89,37 @@ class PFBlock(object):
         uniqueid : is the id of item of interest
         edgetype : is an optional type of edge. If specified only links of the given edgetype will be returned
         '''
-        linked_edges = []
+        if self._links is None:
+            self._make_link_index()
+        return list(self._links.get(uniqueid, {}).get(edgetype, []))
+
+    def _make_link_index(self):
+        ''' Makes the index of the linked edges of each element:
+            {uniqueid : {edgetype : [edge1, edge2, ...], None : [all the linked edges]}}
+            each list being sorted in order of increasing distance
+        '''
+        self._links = dict()
         for edge in self.edges.itervalues():
-            if edge.linked and (edge.id1 == uniqueid or edge.id2 == uniqueid):
-                if edgetype is None or ((edgetype != None) and (edge.edge_type == edgetype)):
-                    linked_edges.append(edge)
-
-
+            for uniqueid in (edge.id1, edge.id2):
+                edges_by_type = self._links.setdefault(uniqueid, dict())
+                edges_by_type.setdefault(edge.edge_type, []).append(edge)
+                edges_by_type.setdefault(None, []).append(edge)
         #this is a bit yucky and temporary solution as need to make sure the order returned is consistent
         # maybe should live outside of this class
-        linked_edges.sort(key=lambda x: (x.distance is None, x.distance))
-        return linked_edges
+        for uniqueid, edges_by_type in self._links.iteritems():
+            for edges in edges_by_type.itervalues():
+                edges.sort(key=lambda x: (x.distance is None, x.distance,
+                                          x.id2 if x.id1 == uniqueid else x.id1))
+
+    def unlink(self, edge):
+        ''' Removes the link between the two elements of edge
+        '''
+        self.edges.unlink(edge)
+        if self._links is not None:
+            for uniqueid in (edge.id1, edge.id2):
+                edges_by_type = self._links[uniqueid]
+                edges_by_type[edge.edge_type].remove(edge)
+                edges_by_type[None].remove(edge)
 
     def linked_ids(self, uniqueid, edgetype=None) :
         ''' Returns list of all linked ids of a given edge type that are connected to a given id -
@@ -244,7 +263,7 @@ class PFBlock(object):
             Note that make_key deals with whether it is get_edge(e1, e2) or
                                                         get_edge(e2, e1) (either order gives same result)
             '''
-        return self.edges[Edge.make_key(id1, id2)]
+        return self.edges.get_edge(id1, id2)
 
     def __str__(self):
         ''' Block description which includes list of elements and a matrix of distances
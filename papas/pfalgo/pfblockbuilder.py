@@ -1,7 +1,8 @@
-import itertools
 from blockbuilder import BlockBuilder
 from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
 from heppy.papas.graphtools.DAG import Node
+from heppy.papas.pfalgo.neighbours import all_pairs
 
 class PFBlockBuilder(BlockBuilder):
     ''' PFBlockBuilder takes particle flow elements from an event (clusters,tracks etc)
@@ -27,8 +28,14 @@ class PFBlockBuilder(BlockBuilder):
             builder = PFBlockBuilder(pfevent, ruler)
             for b in builder.blocks.itervalues() :
                 print b
+
+        With the Distance ruler, a neighbour search avoids measuring all pairs:
+
+            builder = PFBlockBuilder(pfevent, distance, neighbours=grid_neighbours)
+            for b in builder.blocks.itervalues() :
+                print b
     '''
-    def __init__(self,  pfevent, ruler, history_nodes = None):
+    def __init__(self,  pfevent, ruler, history_nodes = None, neighbours = all_pairs):
         '''
         pfevent is event structure inside which we find
             tracks is a dictionary : {id1:track1, id2:track2, ...}
@@ -50,10 +57,15 @@ class PFBlockBuilder(BlockBuilder):
             If hist_nodes is not provided one will be created, it will contain nodes
             corresponding to each of the tracks, ecal etc and also for the blocks that
             are created by the event block builder.
+        neighbours proposes the pairs of elements that may be linked by the ruler
+            (see neighbours.py). The ruler is only called for these pairs, and on demand
+            for the unlinked pairs of elements of a block (see SparseEdges).
+            The default, all_pairs, works with any ruler.
         '''
         
         #given a unique id this can return the underying object
         self.pfevent = pfevent
+        self.ruler = ruler
 
         # collate all the ids of tracks and clusters and, if needed, make history nodes
         uniqueids = []
@@ -64,19 +76,23 @@ class PFBlockBuilder(BlockBuilder):
         if history_nodes is None:
             self.history_nodes =  dict( (idt, Node(idt)) for idt in uniqueids )       
         
-        # compute edges between each pair of nodes
-        edges = dict()
-
-        for id1 in uniqueids:
-            for  id2 in uniqueids:
-                if id1 < id2 :
-                    edge=self._make_edge(id1,id2, ruler)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        # compute edges between the pairs of nodes proposed by the neighbour search
+        # only the linked edges are kept
+        edges = SparseEdges(self._measure)
+        elements = [pfevent.get_object(uid) for uid in uniqueids]
+        for id1, id2 in neighbours(elements):
+            edge=self._make_edge(id1,id2, ruler)
+            edges.add(edge)
 
         #use the underlying BlockBuilder to construct the blocks        
         super(PFBlockBuilder, self).__init__(uniqueids, edges, self.history_nodes, pfevent)
 
+    def _measure(self, id1, id2):
+        ''' makes the edge between id1 and id2 with the ruler,
+            used by the SparseEdges to make the unlinked edges on demand
+        '''
+        return self._make_edge(id1, id2, self.ruler)
+
     def _make_edge(self,id1,id2, ruler):
         ''' id1, id2 are the unique ids of the two items
             ruler is something that measures distance between two objects eg track and hcal
@@ -27,7 +27,7 @@ class BlockSplitter(BlockBuilder):
     
         '''
         for edge in unlink_edges:
-            edge.linked = False
+            block.unlink(edge)
         
         super(BlockSplitter, self).__init__(block.element_uniqueids, block.edges, history_nodes, block.pfevent)
         assert( isinstance(self.blocks,dict))
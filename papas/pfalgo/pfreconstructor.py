@@ -104,7 +104,8 @@ class PFReconstructor(object):
                 #ALICE debugging
                 #if len(block.element_uniqueids)<6:
                 #    continue
-                pdebugger.info('Processing {}'.format(block))
+                if pdebugger.enabled:
+                    pdebugger.info('Processing %s', block)
                 self.reconstruct_block(block)                
                 self.unused.extend( [id for id in block.element_uniqueids if not self.locked[id]])
                 
@@ -417,7 +418,8 @@ class PFReconstructor(object):
                                      propagate_to)
         particle.clusters[layer] = cluster  # not sure about this either when hcal is used to make an ecal cluster?
         self.locked[cluster.uniqueid] = True #just OK but not nice if hcal used to make ecal.
-        pdebugger.info(str('Made {} from {}'.format(particle,  cluster)))
+        if pdebugger.enabled:
+            pdebugger.info('Made %s from %s', particle, cluster)
         return particle
         
     def reconstruct_track(self, track, clusters = None): # cluster argument does not ever seem to be used at present
@@ -432,7 +434,8 @@ class PFReconstructor(object):
         particle.set_path(track.path)
         particle.clusters = clusters
         self.locked[track.uniqueid] = True
-        pdebugger.info(str('Made {} from {}'.format(particle,  track)))
+        if pdebugger.enabled:
+            pdebugger.info('Made %s from %s', particle, track)
         return particle
 
 
@@ -7,12 +7,6 @@ class Node(int):
         self.block_label = None
         super(Node, self).__init__(*args)
 
-    def accept(self, visitor):
-        notseen = visitor.visit(self)
-        if notseen:
-            for elem in self.linked:
-                elem.accept(visitor)
-
     def __str__(self):
         return super(Node, self).__str__() + str(self.linked)
 
@@ -62,6 +56,14 @@ class TestFloodFill(unittest.TestCase):
         self.assertEqual(floodfill.groups.keys(), [2,3])
         self.assertEqual(floodfill.groups[2], [1])
         self.assertEqual(floodfill.groups[3], [2,3,4])
+
+    def test_long_chain(self):
+        # too long for a recursive traversal
+        nnodes = 10000
+        graph = Graph( [ (i, i+1) for i in range(1, nnodes) ] )
+        floodfill = FloodFill(graph.nodes.values())
+        self.assertEqual(floodfill.groups.keys(), [0])
+        self.assertEqual(sorted(floodfill.groups[0]), range(1, nnodes+1))
         
 
     
@@ -0,0 +1,68 @@
+import unittest
+import math
+import itertools
+import heppy.statistics.rrandom as random
+from heppy.utils.deltar import deltaPhi
+from heppy.papas.pfalgo.neighbours import Grid, all_pairs, grid_neighbours
+from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder
+from heppy.papas.pfalgo.distance import distance
+from heppy.papas.mergedclusterbuilder import MergedClusterBuilder
+from heppy.papas.toyevents import pf_event
+
+
+class TestNeighbours(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0xdeadbeef)
+
+    def test_grid(self):
+        cellsize = 0.3
+        grid = Grid(cellsize, [None, 2 * math.pi])
+        points = [(random.uniform(0, math.pi), random.uniform(-math.pi, math.pi))
+                  for i in range(500)]
+        for i, point in enumerate(points):
+            grid.add(i, point)
+        for i, j in itertools.combinations(range(len(points)), 2):
+            (theta1, phi1), (theta2, phi2) = points[i], points[j]
+            if abs(theta1 - theta2) < cellsize and \
+               abs(deltaPhi(phi1, phi2)) < cellsize:
+                self.assertTrue(j in grid.near(points[i]))
+
+    def test_grid_large_cells(self):
+        # a single cell in phi
+        grid = Grid(4., [None, 2 * math.pi])
+        grid.add(1, (0., -3.))
+        self.assertEqual(grid.near((0., 3.)), [1])
+
+    def test_blocks(self):
+        '''the blocks must be the same as with all pairs of elements'''
+        pfevent = pf_event(200)
+        blocks = []
+        for neighbours in [all_pairs, grid_neighbours]:
+            builder = PFBlockBuilder(pfevent, distance, neighbours=neighbours)
+            blocks.append(sorted(builder.blocks.values(),
+                                 key=lambda block: block.element_uniqueids))
+        ref_blocks, grid_blocks = blocks
+        self.assertTrue(len(ref_blocks) < len(pfevent.tracks))
+        self.assertEqual(len(grid_blocks), len(ref_blocks))
+        for ref_block, block in zip(ref_blocks, grid_blocks):
+            self.assertEqual(block.element_uniqueids, ref_block.element_uniqueids)
+            for id1, id2 in itertools.combinations(block.element_uniqueids, 2):
+                edge = block.get_edge(id1, id2)
+                ref_edge = ref_block.get_edge(id1, id2)
+                self.assertEqual(edge.linked, ref_edge.linked)
+                self.assertEqual(edge.distance, ref_edge.distance)
+
+    def test_merged_clusters(self):
+        pfevent = pf_event(200)
+        merged = []
+        for neighbours in [all_pairs, grid_neighbours]:
+            builder = MergedClusterBuilder(pfevent.ecal_clusters, distance,
+                                           neighbours=neighbours)
+            merged.append(builder.subgraphs)
+        self.assertTrue(len(merged[0]) < len(pfevent.ecal_clusters))
+        self.assertEqual(merged[1], merged[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from heppy.papas.data.identifier import Identifier
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.sparseedges import SparseEdges
+from heppy.papas.pfalgo.pfblock import PFBlock
+from heppy.papas.pfalgo.pfblocksplitter import BlockSplitter
+
+class TestPFBlock(unittest.TestCase):
+
+    def setUp(self):
+        make_id = Identifier.make_id
+        types = Identifier.PFOBJECTTYPE
+        self.track1 = make_id(types.TRACK)
+        self.track2 = make_id(types.TRACK)
+        self.hcal1 = make_id(types.HCALCLUSTER)
+        self.hcal2 = make_id(types.HCALCLUSTER)
+        self.ecal = make_id(types.ECALCLUSTER)
+        edges = SparseEdges(lambda id1, id2: Edge(id1, id2, False, None))
+        for id1, id2, distance in [(self.track1, self.hcal1, 0.3),
+                                   (self.track1, self.hcal2, 0.1),
+                                   (self.track1, self.ecal, 0.2),
+                                   (self.track2, self.hcal2, 0.2)]:
+            edges.add(Edge(min(id1, id2), max(id1, id2), True, distance))
+        self.ids = [self.track1, self.track2, self.hcal1, self.hcal2, self.ecal]
+        self.block = PFBlock(self.ids, edges, None)
+
+    def test_linked_edges(self):
+        block = self.block
+        distances = lambda edges: [edge.distance for edge in edges]
+        self.assertEqual(distances(block.linked_edges(self.track1)), [0.1, 0.2, 0.3])
+        self.assertEqual(distances(block.linked_edges(self.track1, "hcal_track")),
+                         [0.1, 0.3])
+        self.assertEqual(block.linked_edges(self.track2, "ecal_track"), [])
+        self.assertEqual(block.linked_ids(self.hcal2, "hcal_track"),
+                         sorted([self.track1, self.track2]))
+        self.assertEqual(block.linked_ids(self.hcal1), [self.track1])
+
+    def test_unlink(self):
+        block = self.block
+        # the index is made, and then updated
+        edge = block.linked_edges(self.track1, "hcal_track")[1]
+        block.unlink(edge)
+        self.assertFalse(edge.linked)
+        self.assertEqual(block.linked_ids(self.track1, "hcal_track"), [self.hcal2])
+        self.assertEqual(block.linked_ids(self.hcal1), [])
+        self.assertEqual(block.get_edge(self.track1, self.hcal1).distance, 0.3)
+
+    def test_split(self):
+        block = self.block
+        unlink = [block.get_edge(self.track1, self.hcal2)]
+        splitter = BlockSplitter(block, unlink)
+        self.assertFalse(block.is_active)
+        self.assertEqual(block.linked_ids(self.hcal2), [self.track2])
+        subblocks = sorted(sorted(sub.element_uniqueids)
+                           for sub in splitter.blocks.itervalues())
+        self.assertEqual(subblocks,
+                         sorted([sorted([self.track1, self.hcal1, self.ecal]),
+                                 sorted([self.track2, self.hcal2])]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,13 +26,6 @@ class PFObject(object):
         self.block_label = None
         self.uniqueid = Identifier.make_id(pfobjecttype)
 
-    def accept(self, visitor):
-        '''Called by visitors, such as FloodFill. See pfalgo.floodfill'''
-        notseen = visitor.visit(self)
-        if notseen:
-            for elem in self.linked:
-                elem.accept(visitor)
-
     def __repr__(self):
         return str(self)
 
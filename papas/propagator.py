@@ -4,7 +4,7 @@ import copy
 from ROOT import TVector3
 from geotools import circle_intersection
 from papas_exceptions import PropagationError
-from path import Helix, StraightLine
+from path import Helix, StraightLine, constants, numpy
 
 class Info(object):
     pass
@@ -103,6 +103,186 @@ class HelixPropagator(Propagator):
         info.is_looper = is_looper
         return info
         
+
+def _circle_intersections(x1, y1, r1, r2):
+    '''circle_intersection of geotools, for arrays of circles 1.
+    Returns the arrays xm, ym, xp, yp, and the mask of the circles 1
+    that intersect circle 2.'''
+    np = numpy
+    switchxy = x1 == 0.
+    x1, y1 = np.where(switchxy, y1, x1), np.where(switchxy, x1, y1)
+    with np.errstate(all='ignore'):
+        A = (r2**2 - r1**2 + x1**2 + y1**2) / (2*x1)
+        B = y1/x1
+        a = 1 + B**2
+        b = -2*A*B
+        c = A**2 - r2**2
+        delta = b**2 - 4*a*c
+        yp = ( -b + np.sqrt(delta) ) / (2*a)
+        ym = ( -b - np.sqrt(delta) ) / (2*a)
+        xp = np.sqrt(r2**2 - yp**2)
+        xm = np.sqrt(r2**2 - ym**2)
+        found = (x1 != 0.) & (delta >= 0.) & \
+                (r2**2 - yp**2 >= 0.) & (r2**2 - ym**2 >= 0.)
+        xp = np.where(np.abs((xp-x1)**2 + (yp-y1)**2 - r1**2) > 1e-9, -xp, xp)
+        xm = np.where(np.abs((xm-x1)**2 + (ym-y1)**2 - r1**2) > 1e-9, -xm, xm)
+    xm, ym = np.where(switchxy, ym, xm), np.where(switchxy, xm, ym)
+    xp, yp = np.where(switchxy, yp, xp), np.where(switchxy, xp, yp)
+    return xm, ym, xp, yp, found
+
+
+class BatchPropagator(object):
+    '''Propagates a batch of particles to several cylinders at once.
+
+    The points of all particles on all cylinders are computed with numpy
+    operations on the arrays of the charges, momenta and vertices of the
+    particles, instead of building a path and solving the intersections
+    for each particle and cylinder. The charged particles follow a helix,
+    and the neutral ones a straight line, as with propagator(charge).
+    The points are the ones of propagate_one, up to rounding.
+
+    A point is only made into a TVector3, and stored in the path of the
+    particle, when propagate_one is called for this particle and cylinder.
+
+    Usage:
+        batch = BatchPropagator(charges, momenta, vertices,
+                                detector.cylinders(), field)
+        batch.propagate_one(i, particle, cylinder)
+    where particle has the charge, momentum and vertex number i.
+    '''
+
+    def __init__(self, charges, momenta, vertices, cylinders, field):
+        '''charges : n charges
+        momenta : n (px, py, pz, E)
+        vertices : n (x, y, z)
+        cylinders : list of SurfaceCylinders
+        field : magnitude of the magnetic field
+        '''
+        np = numpy
+        self.field = field
+        self.charges = np.asarray(charges, dtype=float)
+        momenta = np.asarray(momenta, dtype=float).reshape(-1, 4)
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        self.cylinders = dict((cyl.name, icyl) for icyl, cyl in enumerate(cylinders))
+        shape = (len(cylinders), len(self.charges))
+        self.points = np.zeros(shape + (3,))
+        # a point was found for this cylinder and particle
+        self.found = np.zeros(shape, dtype=bool)
+        # helix not intersecting the barrel, extrapolated to the endcap
+        self.loopers = np.zeros(shape, dtype=bool)
+        # helix not intersecting the cylinder at all
+        self.missed = np.zeros(shape, dtype=bool)
+        self.positive = momenta[:, 2] > 0.
+        charged = np.abs(self.charges) > 0.5
+        with np.errstate(all='ignore'):
+            self._propagate_helices(np.flatnonzero(charged),
+                                    momenta, vertices, cylinders)
+            self._propagate_lines(np.flatnonzero(~charged),
+                                  momenta, vertices, cylinders)
+
+    def _propagate_helices(self, rows, momenta, vertices, cylinders):
+        np = numpy
+        c = constants.c
+        q = self.charges[rows]
+        px, py, pz, e = momenta[rows].T
+        x0, y0, z0 = vertices[rows].T
+        # helix parameters, see path.Helix
+        p = np.sqrt(px**2 + py**2 + pz**2)
+        pt = np.sqrt(px**2 + py**2)
+        beta = p / e
+        vz = beta * c * pz / p
+        rho = pt / (np.abs(q) * self.field) * 1e9 / c
+        scale = 1. / (q * self.field) * 1e9 / c
+        vox, voy = px * scale, py * scale
+        mass = np.sqrt(e**2 - p**2)
+        gamma = 1. / np.sqrt(1 - beta**2)
+        omega = q * self.field * c**2 / (mass * gamma * 1e9)
+        cx = x0 - q * (-py / pt) * rho
+        cy = y0 - q * (px / pt) * rho
+        # distance to the z axis of the farthest point of the helix
+        extreme = np.sqrt(cx**2 + cy**2) + rho
+        phi0 = np.arctan2(y0 - cy, x0 - cx)
+
+        def coords(time):
+            wt = omega * time
+            return np.array([x0 + voy * (1 - np.cos(wt)) + vox * np.sin(wt),
+                             y0 - vox * (1 - np.cos(wt)) + voy * np.sin(wt),
+                             vz * time + z0])
+
+        def time_at(x, y):
+            dphi = phi0 - np.arctan2(y - cy, x - cx)
+            dphi = np.where(dphi > math.pi, dphi - 2*math.pi, dphi)
+            dphi = np.where(dphi < -math.pi, dphi + 2*math.pi, dphi)
+            return dphi / omega
+
+        for icyl, cyl in enumerate(cylinders):
+            is_looper = extreme < cyl.rad
+            xm, ym, xp, yp, crossing = _circle_intersections(cx, cy, rho, cyl.rad)
+            barrel = ~is_looper & crossing
+            point_p = coords(time_at(xp, yp))
+            point_m = coords(time_at(xm, ym))
+            point = np.where(point_p[2] * pz < 0., point_m, point_p)
+            in_barrel = np.abs(point[2]) < cyl.z
+            is_looper |= barrel & ~in_barrel
+            barrel &= in_barrel
+            destz = np.where(pz > 0., cyl.z, -cyl.z)
+            endcap_point = coords((destz - z0) / vz)
+            point = np.where(barrel, point, endcap_point)
+            self.points[icyl, rows] = point.T
+            self.found[icyl, rows] = barrel | (is_looper & (vz != 0.))
+            self.loopers[icyl, rows] = is_looper
+            self.missed[icyl, rows] = ~is_looper & ~barrel
+
+    def _propagate_lines(self, rows, momenta, vertices, cylinders):
+        np = numpy
+        px, py, pz, e = momenta[rows].T
+        x0, y0, z0 = vertices[rows].T
+        p = np.sqrt(px**2 + py**2 + pz**2)
+        ux, uy, uz = px / p, py / p, pz / p
+        theta = np.arctan2(np.sqrt(ux**2 + uy**2), uz)
+        perp0 = np.sqrt(x0**2 + y0**2)
+        # second degree equation for the intersection with the barrel
+        a = ux**2 + uy**2
+        b = 2 * (ux * x0 + uy * y0)
+        for icyl, cyl in enumerate(cylinders):
+            inside = (np.abs(z0) <= cyl.z) & (perp0 <= cyl.rad)
+            destz = np.where(uz > 0., cyl.z, -cyl.z)
+            length = (destz - z0) / np.cos(theta)
+            x, y, z = x0 + ux * length, y0 + uy * length, z0 + uz * length
+            barrel = (uz == 0.) | (np.sqrt(x**2 + y**2) > cyl.rad)
+            delta = b**2 - 4 * a * (x0**2 + y0**2 - cyl.rad**2)
+            kp = (-b + np.sqrt(delta)) / (2 * a)
+            point = np.where(barrel,
+                             [x0 + ux * kp, y0 + uy * kp, z0 + uz * kp],
+                             [x, y, z])
+            self.points[icyl, rows] = point.T
+            self.found[icyl, rows] = inside & ~(barrel & (delta < 0.))
+
+    def propagate_one(self, i, particle, cylinder):
+        '''Same as propagator(charge).propagate_one(particle, cylinder, field),
+        for a particle with the charge, momentum and vertex number i.'''
+        charged = abs(self.charges[i]) > 0.5
+        icyl = self.cylinders.get(cylinder.name, None)
+        if icyl is None:
+            return propagator(particle.q()).propagate_one(particle, cylinder,
+                                                          self.field)
+        if particle.path is None:
+            if charged:
+                path = Helix(self.field, particle.q(), particle.p4(),
+                             particle.vertex)
+            else:
+                path = StraightLine(particle.p4(), particle.vertex)
+            particle.set_path(path)
+        if self.found[icyl, i]:
+            x, y, z = self.points[icyl, i]
+            particle.points[cylinder.name] = TVector3(float(x), float(y), float(z))
+        if charged and not self.missed[icyl, i]:
+            info = Info()
+            info.is_positive = bool(self.positive[i])
+            info.is_looper = bool(self.loopers[icyl, i])
+            return info
+
+
 straight_line = StraightLinePropagator()
 
 helix = HelixPropagator() 
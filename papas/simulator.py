@@ -1,7 +1,7 @@
 import sys
 import copy
 import shelve
-from heppy.papas.propagator import propagator
+from heppy.papas.propagator import propagator, BatchPropagator
 from heppy.papas.pfobjects import Cluster, SmearedCluster, SmearedTrack
 from heppy.papas.pfobjects import Particle as PFSimParticle
 from heppy.papas.pfalgo.pfinput import  PFInput
@@ -22,15 +22,22 @@ def pfsimparticle(ptc):
     charge = ptc.q()
     pid = ptc.pdgid()
     simptc = PFSimParticle(tp4, vertex, charge, pid)
-    pdebugger.info(" ".join(("Made", simptc.__str__())))
+    if pdebugger.enabled:
+        pdebugger.info('Made %s', simptc)
     simptc.gen_ptc = ptc
     return simptc
 
 class Simulator(object):
 
-    def __init__(self, detector, logger=None):
+    def __init__(self, detector, logger=None, batch_propagation=False):
+        '''batch_propagation: if True, the points of all particles on all
+        detector cylinders are computed at once for each event,
+        see propagator.BatchPropagator'''
         self.verbose = True
         self.detector = detector
+        self.batch_propagation = batch_propagation
+        self.batch = None
+        self.batch_rows = dict()
         if logger is None:
             import logging
             logging.basicConfig(level='ERROR')
@@ -47,19 +54,41 @@ class Simulator(object):
         self.ptcs = None
         Cluster.max_energy = 0.
         SmearedCluster.max_energy = 0.
+        self.batch = None
+        self.batch_rows = dict()
+
+    def make_batch(self, ptcs):
+        '''prepares the propagation of the particles ptcs to all detector
+        cylinders, see propagator.BatchPropagator'''
+        charges, momenta, vertices = [], [], []
+        for ptc in ptcs:
+            p4 = ptc.p4()
+            vertex = ptc.start_vertex().position()
+            charges.append(ptc.q())
+            momenta.append((p4.Px(), p4.Py(), p4.Pz(), p4.E()))
+            vertices.append((vertex.X(), vertex.Y(), vertex.Z()))
+        self.batch = BatchPropagator(charges, momenta, vertices,
+                                     self.detector.cylinders(),
+                                     self.detector.elements['field'].magnitude)
+
+    def propagate_one(self, ptc, cylinder):
+        '''propagate the particle to a detector cylinder'''
+        row = self.batch_rows.get(ptc.uniqueid, None)
+        if row is not None:
+            return self.batch.propagate_one(row, ptc, cylinder)
+        return propagator(ptc.q()).propagate_one(ptc, cylinder,
+                                                 self.detector.elements['field'].magnitude)
 
     def propagate(self, ptc):
         '''propagate the particle to all detector cylinders'''
-        propagator(ptc.q()).propagate([ptc], self.detector.cylinders(),
-                                      self.detector.elements['field'].magnitude)
+        for cylinder in self.detector.cylinders():
+            self.propagate_one(ptc, cylinder)
 
     def make_cluster(self, ptc, detname, fraction=1., size=None):
         '''adds a cluster in a given detector, with a given fraction of
         the particle energy.'''
         detector = self.detector.elements[detname]
-        propagator(ptc.q()).propagate_one(ptc,
-                                          detector.volume.inner,
-                                          self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, detector.volume.inner)
         if size is None:
             size = detector.cluster_size(ptc)
         cylname = detector.volume.inner.name
@@ -78,7 +107,8 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
             raise SimulationError('Particle not extrapolated to the detector, so cannot make a cluster there. No worries for now, problem will be solved :-)')
         cluster = Cluster(ptc.p4().E()*fraction, ptc.points[cylname], size, cylname, ptc)
         ptc.clusters[cylname] = cluster
-        pdebugger.info(" ".join(("Made", cluster.__str__())))
+        if pdebugger.enabled:
+            pdebugger.info('Made %s', cluster)
         return cluster
 
     def smear_cluster(self, cluster, detector, accept=False, acceptance=None):
@@ -95,12 +125,14 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
                                          cluster.size(),
                                          cluster.layer,
                                          cluster.particle)
-        pdebugger.info(str('Made {}'.format(smeared_cluster)))
+        if pdebugger.enabled:
+            pdebugger.info('Made %s', smeared_cluster)
         det = acceptance if acceptance else detector
         if det.acceptance(smeared_cluster) or accept:
             return smeared_cluster
         else:
-            pdebugger.info(str('Rejected {}'.format(smeared_cluster)))
+            if pdebugger.enabled:
+                pdebugger.info('Rejected %s', smeared_cluster)
             return None
 
     def smear_track(self, track, detector, accept=False):
@@ -111,19 +143,21 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
                                      track.p3 * scale_factor,
                                      track.charge,
                                      track.path)
-        pdebugger.info(" ".join(("Made", smeared_track.__str__())))
+        if pdebugger.enabled:
+            pdebugger.info('Made %s', smeared_track)
         if detector.acceptance(smeared_track) or accept:
             return smeared_track
         else:
-            pdebugger.info(str('Rejected {}'.format(smeared_track)))
+            if pdebugger.enabled:
+                pdebugger.info('Rejected %s', smeared_track)
             return None
 
     def simulate_photon(self, ptc):
-        pdebugger.info("Simulating Photon")
+        if pdebugger.enabled:
+            pdebugger.info("Simulating Photon")
         detname = 'ecal'
         ecal = self.detector.elements[detname]
-        propagator(ptc.q()).propagate_one(ptc,
-                                          ecal.volume.inner)
+        self.propagate_one(ptc, ecal.volume.inner)
 
         cluster = self.make_cluster(ptc, detname)
         smeared = self.smear_cluster(cluster, ecal)
@@ -132,11 +166,10 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
 
 
     def simulate_electron(self, ptc):
-        pdebugger.info("Simulating Electron")
+        if pdebugger.enabled:
+            pdebugger.info("Simulating Electron")
         ecal = self.detector.elements['ecal']
-        propagator(ptc.q()).propagate_one(ptc,
-                                          ecal.volume.inner,
-                                          self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, ecal.volume.inner)
         cluster = self.make_cluster(ptc, 'ecal')
         smeared_cluster = self.smear_cluster(cluster, ecal)
         if smeared_cluster:
@@ -154,7 +187,8 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         '''Simulate a hadron, neutral or charged.
         ptc should behave as pfobjects.Particle.
         '''
-        pdebugger.info("Simulating Hadron")
+        if pdebugger.enabled:
+            pdebugger.info("Simulating Hadron")
         #implement beam pipe scattering
 
         ecal = self.detector.elements['ecal']
@@ -162,33 +196,29 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         beampipe = self.detector.elements['beampipe']
         frac_ecal = 0.
 
-        propagator(ptc.q()).propagate_one(ptc,
-                                          beampipe.volume.inner,
-                                          self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, beampipe.volume.inner)
 
-        propagator(ptc.q()).propagate_one(ptc,
-                                          beampipe.volume.outer,
-                                          self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, beampipe.volume.outer)
 
+        path = ptc.path
         mscat.multiple_scattering(ptc, beampipe, self.detector.elements['field'].magnitude)
+        if ptc.path is not path:
+            # the batch points were computed from the momentum before
+            # scattering, the scattered path is propagated one by one
+            self.batch_rows.pop(ptc.uniqueid, None)
 
         #re-propagate after multiple scattering in the beam pipe
         #indeed, multiple scattering is applied within the beam pipe,
         #so the extrapolation points to the beam pipe entrance and exit
         #change after multiple scattering.
-        propagator(ptc.q()).propagate_one(ptc,
-                                           beampipe.volume.inner,
-                                           self.detector.elements['field'].magnitude)
-        propagator(ptc.q()).propagate_one(ptc,
-                                           beampipe.volume.outer,
-                                           self.detector.elements['field'].magnitude)
-        propagator(ptc.q()).propagate_one(ptc,
-                                           ecal.volume.inner,
-                                           self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, beampipe.volume.inner)
+        self.propagate_one(ptc, beampipe.volume.outer)
+        self.propagate_one(ptc, ecal.volume.inner)
 
         # these lines moved earlier in order to match cpp logic
         if ptc.q() != 0:
-            pdebugger.info(" ".join(("Made", ptc.track.__str__())))
+            if pdebugger.enabled:
+                pdebugger.info('Made %s', ptc.track)
             smeared_track = self.smear_track(ptc.track,
                                              self.detector.elements['tracker'])
             if smeared_track:
@@ -221,7 +251,8 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
             ptc.clusters_smeared[smeared.layer] = smeared
 
     def simulate_muon(self, ptc):
-        pdebugger.info("Simulating Muon")
+        if pdebugger.enabled:
+            pdebugger.info("Simulating Muon")
         self.propagate(ptc)
         smeared_track = self.smear_track(ptc.track,
                                          self.detector.elements['tracker'])
@@ -229,35 +260,37 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
             ptc.track_smeared = smeared_track
 
     def smear_muon(self, ptc):
-        pdebugger.info("Smearing Muon")
+        if pdebugger.enabled:
+            pdebugger.info("Smearing Muon")
         self.propagate(ptc)
         if ptc.q() != 0:
-            pdebugger.info(" ".join(("Made", ptc.track.__str__())))
+            if pdebugger.enabled:
+                pdebugger.info('Made %s', ptc.track)
         smeared = copy.deepcopy(ptc)
         return smeared
 
     def smear_electron(self, ptc):
-        pdebugger.info("Smearing Electron")
+        if pdebugger.enabled:
+            pdebugger.info("Smearing Electron")
         ecal = self.detector.elements['ecal']
-        propagator(ptc.q()).propagate_one(ptc,
-                                          ecal.volume.inner,
-                                          self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, ecal.volume.inner)
         if ptc.q() != 0:
-            pdebugger.info(" ".join(("Made", ptc.track.__str__())))
+            if pdebugger.enabled:
+                pdebugger.info('Made %s', ptc.track)
         smeared = copy.deepcopy(ptc)
         return smeared
 
     def propagate_muon(self, ptc):
-        pdebugger.info("Propogate Muon")
+        if pdebugger.enabled:
+            pdebugger.info("Propogate Muon")
         self.propagate(ptc)
         return
 
     def propagate_electron(self, ptc):
-        pdebugger.info("Propogate Electron")
+        if pdebugger.enabled:
+            pdebugger.info("Propogate Electron")
         ecal = self.detector.elements['ecal']
-        propagator(ptc.q()).propagate_one(ptc,
-                                          ecal.volume.inner,
-                                          self.detector.elements['field'].magnitude)
+        self.propagate_one(ptc, ecal.volume.inner)
         return
 
     def simulate(self, ptcs):
@@ -266,10 +299,16 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
 
         #newsort
         # import pdb; pdb.set_trace()
-        for gen_ptc in sorted(ptcs, key=lambda ptc: ptc.uniqueid):
-            pdebugger.info(str('{}'.format(gen_ptc)))
-        for gen_ptc in ptcs:
+        if pdebugger.enabled:
+            for gen_ptc in sorted(ptcs, key=lambda ptc: ptc.uniqueid):
+                pdebugger.info('%s', gen_ptc)
+        if self.batch_propagation:
+            ptcs = list(ptcs)
+            self.make_batch(ptcs)
+        for row, gen_ptc in enumerate(ptcs):
             ptc = pfsimparticle(gen_ptc)
+            if self.batch is not None:
+                self.batch_rows[ptc.uniqueid] = row
             if ptc.pdgid() == 22:
                 self.simulate_photon(ptc)
             elif abs(ptc.pdgid()) == 11: #check with colin
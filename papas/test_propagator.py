@@ -1,7 +1,9 @@
 import unittest
 from detectors.geometry import SurfaceCylinder
 from pfobjects import Particle
-from propagator import straight_line, helix
+import math
+from propagator import straight_line, helix, BatchPropagator
+import heppy.statistics.rrandom as random
 from vectors import LorentzVector, Point
 
 class TestPropagator(unittest.TestCase):
@@ -80,6 +82,59 @@ class TestPropagator(unittest.TestCase):
                              Point(0., 0., 0.), -1)        
         debug_info = helix.propagate_one(particle, cyl1, field)
 
+    def test_batch(self):
+        '''the batch propagation must give the points of propagate_one'''
+        random.seed(0xdeadbeef)
+        cylinders = [SurfaceCylinder('cyl1', 1., 2.),
+                     SurfaceCylinder('cyl2', 2., 1.),
+                     SurfaceCylinder('cyl3', 0.05, 0.1)]
+        field = 3.8
+        charges, momenta, vertices = [], [], []
+        for i in range(500):
+            charge = random.choice([-1, 0, 1])
+            momentum = LorentzVector()
+            momentum.SetPtEtaPhiM(random.uniform(0.1, 5.),
+                                  random.uniform(-3., 3.),
+                                  random.uniform(-math.pi, math.pi),
+                                  0.14)
+            vertex = Point(random.uniform(-0.1, 0.1),
+                           random.uniform(-0.1, 0.1),
+                           random.uniform(-0.5, 0.5))
+            charges.append(charge)
+            momenta.append((momentum.Px(), momentum.Py(),
+                            momentum.Pz(), momentum.E()))
+            vertices.append((vertex.X(), vertex.Y(), vertex.Z()))
+        # neutral particle along the z axis
+        charges.append(0)
+        momenta.append((0., 0., 1., 2.))
+        vertices.append((0., 0., 0.))
+        # neutral particle in the transverse plane, not handled by propagate_one
+        transverse = Particle(LorentzVector(1., 1., 0., 2.), Point(0., 0.1, 0.), 0)
+        batch = BatchPropagator(charges + [0], momenta + [(1., 1., 0., 2.)],
+                                vertices + [(0., 0.1, 0.)], cylinders, field)
+        batch.propagate_one(len(charges), transverse, cylinders[0])
+        self.assertAlmostEqual(transverse.points['cyl1'].Perp(), 1.)
+        self.assertAlmostEqual(transverse.points['cyl1'].Z(), 0.)
+        for i, (charge, momentum, vertex) in enumerate(zip(charges, momenta,
+                                                           vertices)):
+            particle = Particle(LorentzVector(*momentum), Point(*vertex), charge)
+            ref_particle = Particle(LorentzVector(*momentum), Point(*vertex), charge)
+            ref_propagator = helix if charge else straight_line
+            for cylinder in cylinders:
+                info = batch.propagate_one(i, particle, cylinder)
+                ref_info = ref_propagator.propagate_one(ref_particle, cylinder, field)
+                if ref_info is None:
+                    self.assertTrue(info is None)
+                else:
+                    self.assertEqual(info.is_looper, ref_info.is_looper)
+                    self.assertEqual(info.is_positive, ref_info.is_positive)
+            self.assertEqual(particle.points.keys(), ref_particle.points.keys())
+            for name, ref_point in ref_particle.points.iteritems():
+                point = particle.points[name]
+                for coord, ref_coord in zip([point.X(), point.Y(), point.Z()],
+                                            [ref_point.X(), ref_point.Y(), ref_point.Z()]):
+                    self.assertAlmostEqual(coord, ref_coord, places=6)
+
         
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import math
+from detectors.CMS import CMS
+from simulator import Simulator
+from heppy.particles.tlv.particle import Particle
+import heppy.statistics.rrandom as random
+from ROOT import TLorentzVector
+
+class TestSimulator(unittest.TestCase):
+
+    def make_hadrons(self, nhadrons):
+        '''returns nhadrons charged pions with random momenta'''
+        hadrons = []
+        for i in range(nhadrons):
+            tlv = TLorentzVector()
+            tlv.SetPtEtaPhiM(random.uniform(1., 20.),
+                             random.uniform(-2., 2.),
+                             random.uniform(-math.pi, math.pi),
+                             0.14)
+            charge = random.choice([-1, 1])
+            hadrons.append(Particle(211 * charge, charge, tlv))
+        return hadrons
+
+    def simulate(self, hadrons, batch_propagation):
+        random.seed(0xdeadbeef)
+        simulator = Simulator(CMS(), batch_propagation=batch_propagation)
+        simulator.simulate(hadrons)
+        return simulator
+
+    def test_batch_propagation(self):
+        '''the batch propagation must not drop the multiple scattering
+        in the beam pipe'''
+        random.seed(0xcafe)
+        hadrons = self.make_hadrons(50)
+        ref_ptcs = self.simulate(hadrons, False).ptcs
+        simulator = self.simulate(hadrons, True)
+        ptcs = simulator.ptcs
+        self.assertEqual(len(ptcs), len(ref_ptcs))
+        nchecked = 0
+        for ptc, ref_ptc in zip(ptcs, ref_ptcs):
+            if 'beampipe_out' in ptc.points:
+                # scattered, no longer propagated with the batch
+                self.assertFalse(ptc.uniqueid in simulator.batch_rows)
+            self.assertEqual('ecal_in' in ptc.points,
+                             'ecal_in' in ref_ptc.points)
+            if 'ecal_in' in ref_ptc.points:
+                dist = (ptc.points['ecal_in'] - ref_ptc.points['ecal_in']).Mag()
+                self.assertAlmostEqual(dist, 0., places=6)
+                nchecked += 1
+        self.assertGreater(nchecked, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,9 @@ from vectors import *
 from ROOT import TLorentzVector
 import math
 
-from pfobjects import Particle
+from pfobjects import Particle, Cluster, Track
+from heppy.papas.data.pfevent import PFEvent
+from heppy.framework.event import Event
 from pdt import particle_data
 
 
@@ -92,6 +94,53 @@ def monojet(pdgids, theta, phi, pstar, jetenergy, vertex=None):
                                            ptc.pdgid()) )
     # print jetp4.M(), jetp4.E()
     return boosted_particles
+
+
+class ToyPath(object):
+    '''Path only made of the points of a track, see pf_event.'''
+    def __init__(self):
+        self.points = dict()
+
+
+def _smeared_point(theta, phi, radius, width):
+    point = Point()
+    point.SetMagThetaPhi(radius,
+                         random.gauss(theta, width),
+                         random.gauss(phi, width))
+    return point
+
+
+def pf_event(nparticles, ecal_size=0.05, hcal_size=0.2, width=0.02):
+    '''Returns a PFEvent with the tracks and clusters of nparticles
+    charged particles in random directions. Each particle gives a track,
+    with points at ecal_in and hcal_in, and an ecal and an hcal clusters,
+    of random sizes around ecal_size and hcal_size, at random angular
+    distances of the order of width from the track points.
+    The elements are linked into blocks of various sizes, as in real events.'''
+    event = Event(0)
+    event.tracks = dict()
+    event.ecal_clusters = dict()
+    event.hcal_clusters = dict()
+    for i in range(nparticles):
+        theta = random.uniform(0.2, math.pi - 0.2)
+        phi = random.uniform(-math.pi, math.pi)
+        path = ToyPath()
+        path.points['ecal_in'] = _smeared_point(theta, phi, 1.3, 0)
+        if random.uniform(0, 1) > 0.1:
+            # otherwise a looper
+            path.points['hcal_in'] = _smeared_point(theta, phi, 1.9, 0)
+        track = Track(_smeared_point(theta, phi, 10., 0), 1, path)
+        event.tracks[track.uniqueid] = track
+        ecal = Cluster(random.uniform(1., 10.),
+                       _smeared_point(theta, phi, 1.3, width),
+                       random.uniform(0.5, 1.5) * ecal_size, 'ecal_in')
+        event.ecal_clusters[ecal.uniqueid] = ecal
+        hcal = Cluster(random.uniform(1., 10.),
+                       _smeared_point(theta, phi, 1.9, width),
+                       random.uniform(0.5, 1.5) * hcal_size, 'hcal_in')
+        event.hcal_clusters[hcal.uniqueid] = hcal
+    return PFEvent(event)
+
         
 if __name__ == '__main__':
 
@@ -38,6 +38,34 @@ def haddPck(file, odir, idirs):
     txtFile.close()
     
 
+def haddTiming(file, odir, idirs):
+    '''add the timing.json reports in directories idirs to a directory outdir.
+    see heppy.framework.profiling.
+    '''
+    from heppy.framework.profiling import TimeReport
+    sum = None
+    for dir in idirs:
+        report = TimeReport.read( file.replace( idirs[0], dir ) )
+        if sum is None:
+            sum = report
+        else:
+            sum += report
+    sum.write( file.replace( idirs[0], odir ) )
+    
+
+def haddCache(file, odir, idirs):
+    '''concatenate the product caches in directories idirs to a directory outdir.
+    see heppy.analyzers.ProductCache.
+    '''
+    from heppy.analyzers.ProductCache import merge_caches
+    try:
+        merge_caches( file.replace( idirs[0], odir ),
+                      [file.replace( idirs[0], dir ) for dir in idirs] )
+    except ValueError as err:
+        # e.g. caches of different chunks, which cannot be merged
+        print 'WARNING: product caches not merged:', err
+    
+
 def hadd(file, odir, idirs, appx=''):
     if file.endswith('.pck'):
         try:
@@ -45,6 +73,12 @@ def hadd(file, odir, idirs, appx=''):
         except ImportError:
             pass
         return
+    elif os.path.basename(file) == 'timing.json':
+        haddTiming( file, odir, idirs)
+        return
+    elif file.endswith('.cache'):
+        haddCache( file, odir, idirs)
+        return
     elif not file.endswith('.root'):
         return
     haddCmd = ['hadd']
@@ -1,16 +1,25 @@
 #will remove this once ROOT random is set up and working in cpp
-from ROOT import gSystem
-gSystem.Load("libpapascpp") #check with Colin if this is OK or if should be made to execute just once
-from ROOT import  randomgen
+from heppy.utils.lazyimport import ROOT
+
+_randomgen = None
+
+def _generators():
+    '''Returns the randomgen namespace,
+    loading libpapascpp once, at the first call.'''
+    global _randomgen
+    if _randomgen is None:
+        ROOT.gSystem.Load("libpapascpp")
+        _randomgen = ROOT.randomgen
+    return _randomgen
 
 def expovariate (a):
-    return randomgen.RandExponential(a).next()
+    return _generators().RandExponential(a).next()
 
 def uniform (a, b):
-    return randomgen.RandUniform(a, b).next()
+    return _generators().RandUniform(a, b).next()
 
 def gauss (a, b):
-    return randomgen.RandNormal(a, b).next()
+    return _generators().RandNormal(a, b).next()
 
 def seed (s):
-    randomgen.RandUniform(0, 1).setSeed(s)
\ No newline at end of file
+    _generators().RandUniform(0, 1).setSeed(s)
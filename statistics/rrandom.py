@@ -1,5 +1,137 @@
-#todo make depend on Heppy Configuration
+'''Random numbers for heppy.
+
+This module provides the functions of the python random module
+(uniform, gauss, expovariate, ...), sharing a single generator,
+and seeded with seed.
+
+With seed(a, per_event=True), the random numbers become reproducible
+per event: before each analyzer processes an event, the Looper calls
+seed_event with a key identifying the event and the analyzer, e.g.
+(component, file, entry in file, analyzer name). The generator is then
+reseeded from the seed and this key, so that the random numbers drawn for
+an event do not depend on the other events processed before in the same
+process. The results are then the same however the events are split
+in chunks, ranges, or workers, skipped, or resumed from a checkpoint.
+
+The code drawing random numbers does not need to be changed,
+except in the Analyzer.process_batch methods, which must call
+Analyzer.seed_event before drawing the numbers of each event.
+Independent streams of random numbers for the current event can
+be obtained with stream(name), for instance to keep the draws
+of one algorithm unchanged when another one is modified.
+
+uniforms and gausses generate batches of numbers.
+
+Example, in the configuration file::
+
+  import heppy.statistics.rrandom as random
+  random.seed(0xdeadbeef, per_event=True)
+'''
+
+import random as _random
+import hashlib
 
+#todo make depend on Heppy Configuration
 # from random_root import *
 from random import *
 #from random_cpplib import *
+
+_generator = _random._inst
+# base seed of the event keys, and per-event mode
+_seed = None
+_per_event = False
+# current event key, and number of calls to seed_event
+_event_key = ()
+_generation = 0
+
+def seed(a=None, per_event=False):
+    '''Seeds the generator with a.
+    If per_event is True, the generator is reseeded at each event,
+    see seed_event.'''
+    global _seed, _per_event, _generation
+    _generator.seed(a)
+    _seed = a
+    _per_event = per_event
+    _generation += 1
+
+def per_event():
+    '''True if the generator is reseeded for each event.'''
+    return _per_event
+
+def _key_seed(key):
+    '''Returns a 128 bits integer derived from the seed and key.'''
+    digest = hashlib.sha1(repr((_seed,) + tuple(key))).hexdigest()
+    return int(digest[:32], 16)
+
+def event_key():
+    '''Returns the key given to the last call to seed_event.'''
+    return _event_key
+
+def seed_event(*key):
+    '''Reseeds the generator from the seed and key,
+    if seed was called with per_event=True.
+    key identifies the event, e.g. (component, file, entry, analyzer).'''
+    global _event_key, _generation
+    if not _per_event:
+        return
+    _event_key = key
+    _generation += 1
+    _generator.seed(_key_seed(key))
+
+
+class Stream(object):
+    '''Generator of random numbers, reseeded from (seed, event key, name)
+    at each event in per-event mode.
+    Otherwise, the numbers are drawn from the module generator.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self._generator = _random.Random()
+        self._generation = None
+
+    def generator(self):
+        if not _per_event:
+            return _generator
+        if self._generation != _generation:
+            self._generator.seed(_key_seed(_event_key + (self.name,)))
+            self._generation = _generation
+        return self._generator
+
+    def random(self):
+        return self.generator().random()
+
+    def uniform(self, a, b):
+        return self.generator().uniform(a, b)
+
+    def gauss(self, mu, sigma):
+        return self.generator().gauss(mu, sigma)
+
+    def expovariate(self, lambd):
+        return self.generator().expovariate(lambd)
+
+    def uniforms(self, a, b, n):
+        return uniforms(a, b, n, self.generator())
+
+    def gausses(self, mu, sigma, n):
+        return gausses(mu, sigma, n, self.generator())
+
+
+_streams = dict()
+
+def stream(name):
+    '''Returns the Stream called name.'''
+    if name not in _streams:
+        _streams[name] = Stream(name)
+    return _streams[name]
+
+def uniforms(a, b, n, generator=_generator):
+    '''Returns a list of n numbers drawn uniformly in [a, b).'''
+    draw = generator.random
+    width = b - a
+    return [a + width * draw() for i in xrange(n)]
+
+def gausses(mu, sigma, n, generator=_generator):
+    '''Returns a list of n numbers drawn from a gaussian distribution.'''
+    draw = generator.gauss
+    return [draw(mu, sigma) for i in xrange(n)]
@@ -35,6 +35,41 @@ class TestRandom(unittest.TestCase):
         self.assertEqual(a1,b1)
         self.assertEqual(a2,b2)
 
+    def draws(self, key):
+        random.seed_event(*key)
+        return [random.uniform(0, 1), random.gauss(1, 3),
+                random.stream('smearing').uniform(0, 1)]
+
+    def test_per_event(self):
+        random.seed(0xdeadbeef, per_event=True)
+        ev1 = self.draws(('comp', 'a.root', 1, 'ana'))
+        ev2 = self.draws(('comp', 'a.root', 2, 'ana'))
+        self.assertNotEqual(ev1, ev2)
+        # same draws whatever the events processed before
+        random.uniform(0, 1)
+        self.assertEqual(self.draws(('comp', 'a.root', 2, 'ana')), ev2)
+        self.assertEqual(self.draws(('comp', 'a.root', 1, 'ana')), ev1)
+        # streams are independent of the main generator
+        self.assertNotEqual(ev1[0], ev1[2])
+        # other seed
+        random.seed(1, per_event=True)
+        self.assertNotEqual(self.draws(('comp', 'a.root', 1, 'ana')), ev1)
+        # without per_event, seed_event does nothing
+        random.seed(0xdeadbeef)
+        a0 = random.uniform(0, 1)
+        random.seed(0xdeadbeef)
+        random.seed_event('comp', 'a.root', 1, 'ana')
+        self.assertEqual(random.uniform(0, 1), a0)
+
+    def test_batches(self):
+        random.seed(0xdeadbeef)
+        values = random.uniforms(2, 3, 1000)
+        self.assertEqual(len(values), 1000)
+        self.assertTrue(all(2 <= x < 3 for x in values))
+        random.seed(0xdeadbeef)
+        self.assertEqual(random.uniform(2, 3), values[0])
+        self.assertEqual(len(random.stream('smearing').gausses(0, 1, 10)), 10)
+
 
 if __name__ == '__main__':
 
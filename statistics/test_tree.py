@@ -44,6 +44,25 @@ class TreeTestCase(unittest.TestCase):
         tr.tree.Fill()        
         fi.Write()
         fi.Close()
+
+    def test_resume(self):
+        fi = TFile('tree3.root','RECREATE')
+        tr = Tree('test_tree', 'A test tree')
+        tr.var('a')
+        tr.fill('a', 1)
+        tr.tree.Fill()
+        nentries = tr.checkpoint()
+        fi.Close()
+        fi = TFile('tree3.root','UPDATE')
+        tr = Tree('test_tree', 'A test tree', tree=fi.Get('test_tree'))
+        tr.var('a')
+        tr.restore(nentries)
+        tr.fill('a', 2)
+        tr.tree.Fill()
+        fi.Write()
+        fi.Close()
+        fi = TFile('tree3.root')
+        self.assertEqual([ev.a for ev in fi.Get('test_tree')], [1, 2])
         
 
 if __name__ == '__main__':
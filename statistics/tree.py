@@ -1,13 +1,17 @@
-import numpy
-from ROOT import TTree
-import ROOT
+from heppy.utils.lazyimport import LazyModule, ROOT
+
+numpy = LazyModule('numpy')
 
 class Tree(object):
     
-    def __init__(self, name, title, defaultFloatType="D", defaultIntType="I"):
+    def __init__(self, name, title, defaultFloatType="D", defaultIntType="I",
+                 tree=None):
+        '''If tree is provided, this existing TTree is filled instead of
+        a new one, e.g. to resume a loop from a checkpoint. 
+        The variables must then be booked again, in the same way.'''
         self.vars = {}
         self.vecvars = {}
-        self.tree = TTree(name, title)
+        self.tree = tree if tree is not None else ROOT.TTree(name, title)
         self.defaults = {}
         self.vecdefaults = {}
         self.defaultFloatType = defaultFloatType
@@ -29,6 +33,14 @@ class Tree(object):
                 the_type = int
             self.var(name, the_type)            
     
+    def _branch(self, name, address, *args):
+        '''Creates branch name with TTree.Branch(name, *args),
+        or sets its address if the branch already exists.'''
+        if self.tree.GetBranch(name):
+            self.tree.SetBranchAddress(name, address)
+        else:
+            self.tree.Branch(name, *args)
+
     def branch_(self, selfmap, varName, the_type, length,
                 postfix="", storageType="default", title=None):
         """Backend function used to create scalar and vector branches. 
@@ -38,10 +50,10 @@ class Tree(object):
         if the_type is float  :
             if storageType == "F": 
                 selfmap[varName]=numpy.zeros(length,numpy.float32)
-                self.tree.Branch(varName,selfmap[varName],varName+postfix+'/F')
+                self._branch(varName, selfmap[varName], varName+postfix+'/F')
             elif storageType == "D":
                 selfmap[varName]=numpy.zeros(length,numpy.float64)
-                self.tree.Branch(varName,selfmap[varName],varName+postfix+'/D')
+                self._branch(varName, selfmap[varName], varName+postfix+'/D')
             else:
                 raise RuntimeError('Unknown storage type %s for branch %s' % (storageType, varName))
         elif the_type is int: 
@@ -58,7 +70,7 @@ class Tree(object):
             if storageType not in dtypes: 
                 raise RuntimeError('Unknown storage type %s for branch %s' % (storageType, varName))
             selfmap[varName]=numpy.zeros(length,dtypes[storageType])
-            self.tree.Branch(varName,selfmap[varName],varName+postfix+'/'+storageType)
+            self._branch(varName, selfmap[varName], varName+postfix+'/'+storageType)
         else:
             raise RuntimeError('Unknown type %s for branch %s' % (the_type, varName))
         if title:
@@ -72,9 +84,9 @@ class Tree(object):
             # create a value, looking up the type from ROOT and calling the default constructor
             self.vars[varName] = getattr(ROOT,the_type)()
             if the_type in [ "TLorentzVector" ]: # custom streamer classes
-                self.tree.Branch(varName+".", the_type, self.vars[varName], 8000,-1)
+                self._branch(varName+".", self.vars[varName], the_type, self.vars[varName], 8000,-1)
             else:
-                self.tree.Branch(varName+".", the_type, self.vars[varName])
+                self._branch(varName+".", self.vars[varName], the_type, self.vars[varName])
             if filler is None:
                 raise RuntimeError("Error: when brancing with an object, filler should be set to a function that takes as argument an object instance and a value, and set the instance to the value (as otherwise python assignment of objects changes the address as well)")
             self.fillers[varName] = filler
@@ -94,9 +106,9 @@ class Tree(object):
         elif __builtins__['type'](the_type) == str:
             self.vecvars[varName] = ROOT.TClonesArray(the_type,(lenvar if __builtins__['type'](lenvar) == int else maxlen))
             if the_type in [ "TLorentzVector" ]: # custom streamer classes
-                self.tree.Branch(varName+".", self.vecvars[varName], 32000, -1)
+                self._branch(varName+".", self.vecvars[varName], self.vecvars[varName], 32000, -1)
             else:
-                self.tree.Branch(varName+".", self.vecvars[varName])
+                self._branch(varName+".", self.vecvars[varName], self.vecvars[varName])
             if filler is None:
                 raise RuntimeError("Error: when brancing with an object, filler should be set to a function that takes as argument an object instance and a value, and set the instance to the value (as otherwise python assignment of objects changes the address as well)")
             self.fillers[varName] = filler
@@ -132,3 +144,25 @@ class Tree(object):
             fillit = self.fillers[varName]
             for (i,v) in enumerate(values):
                 fillit(a[i],v)
+
+    def checkpoint(self):
+        '''Flushes the tree to its file, and returns its number of entries,
+        to be passed to restore when resuming.
+
+        The automatic saving of the tree by ROOT is disabled,
+        so that the entries filled after the checkpoint are not visible in 
+        the file if the job dies.'''
+        self.tree.SetAutoSave(0)
+        self.tree.AutoSave('SaveSelf')
+        return self.tree.GetEntries()
+
+    def restore(self, nentries):
+        '''Checks that the tree, reopened from its file,
+        has the nentries entries recorded at the checkpoint.'''
+        self.tree.SetAutoSave(0)
+        if self.tree.GetEntries() != nentries:
+            msg = 'tree {name} has {nfile} entries in file, instead of {nentries}' \
+                  ' at the last checkpoint'
+            raise RuntimeError(msg.format(name=self.tree.GetName(),
+                                          nfile=self.tree.GetEntries(),
+                                          nentries=nentries))
@@ -0,0 +1,57 @@
+'''Time taken by the PAPAS block builder, as a function of the number
+of elements (tracks and clusters), when the ruler measures all pairs of
+elements, and when it only measures the pairs of neighbouring elements,
+found with a grid.
+
+The events are toy events, see papas.toyevents.pf_event, with three
+elements per particle. The blocks are checked to be the same.
+Measuring all pairs takes too long for large numbers of elements,
+and is only done up to --max-all elements.
+
+Usage:
+  python benchmark_blockbuilder.py [-m max_all] [nelements ...]
+'''
+
+import time
+
+import heppy.statistics.rrandom as random
+from heppy.papas.toyevents import pf_event
+from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder
+from heppy.papas.pfalgo.distance import distance
+from heppy.papas.pfalgo.neighbours import all_pairs, grid_neighbours
+
+def build(pfevent, neighbours):
+    '''Returns the time taken to build the blocks, and the blocks,
+    as sorted lists of element ids.'''
+    start = time.time()
+    builder = PFBlockBuilder(pfevent, distance, neighbours=neighbours)
+    elapsed = time.time() - start
+    blocks = sorted(block.element_uniqueids
+                    for block in builder.blocks.itervalues())
+    return elapsed, blocks
+
+
+if __name__ == '__main__':
+
+    from optparse import OptionParser
+    parser = OptionParser(usage=__doc__)
+    parser.add_option("-m", "--max-all", dest="max_all", type="int",
+                      default=3000,
+                      help="maximum number of elements to measure all pairs")
+    (options, args) = parser.parse_args()
+    sizes = [int(arg) for arg in args] or [10, 100, 1000, 10000]
+
+    random.seed(0xdeadbeef)
+    print '{:>10} {:>8} {:>10} {:>10}'.format('elements', 'blocks',
+                                              'all (s)', 'grid (s)')
+    for nelements in sizes:
+        pfevent = pf_event(max(1, nelements / 3),
+                           ecal_size=0.02, hcal_size=0.05, width=0.01)
+        grid_time, blocks = build(pfevent, grid_neighbours)
+        all_time = '-'
+        if nelements <= options.max_all:
+            elapsed, ref_blocks = build(pfevent, all_pairs)
+            assert blocks == ref_blocks
+            all_time = '{:10.4f}'.format(elapsed)
+        print '{:10} {:8} {:>10} {:10.4f}'.format(nelements, len(blocks),
+                                                 all_time, grid_time)
@@ -0,0 +1,70 @@
+'''Reading speed of a Chain, with the default and tuned reading options.
+
+A wide tree is created, with many branches, and read with:
+- the default options: all branches are read;
+- a selection of branches read through a TTreeCache,
+  as an analysis reading only a few collections of an FCC EDM tree would.
+
+Usage:
+  python benchmark_chain.py [-n nentries] [-b nbranches] [-t nthreads]
+'''
+
+import os
+import time
+
+from ROOT import TFile
+from heppy.statistics.tree import Tree
+from heppy.framework.chain import Chain
+
+FNAME = 'benchmark_chain_tmp.root'
+
+def create_wide_tree(filename, nentries, nbranches):
+    outfile = TFile(filename, 'recreate')
+    tree = Tree('wide_tree', 'A wide test tree')
+    names = ['var{}'.format(i) for i in range(nbranches)]
+    for name in names:
+        tree.var(name)
+    for i in range(nentries):
+        for name in names:
+            tree.fill(name, i)
+        tree.tree.Fill()
+    outfile.Write()
+    outfile.Close()
+
+def events_per_second(options):
+    chain = Chain(FNAME, 'wide_tree', options=options)
+    start = time.time()
+    for event in chain:
+        event.var0
+    return len(chain) / (time.time() - start)
+
+
+if __name__ == '__main__':
+
+    from optparse import OptionParser
+    parser = OptionParser(usage=__doc__)
+    parser.add_option("-n", "--nentries", dest="nentries", type="int",
+                      default=100000, help="number of entries")
+    parser.add_option("-b", "--nbranches", dest="nbranches", type="int",
+                      default=200, help="number of branches")
+    parser.add_option("-t", "--nthreads", dest="nthreads", type="int",
+                      default=None,
+                      help="number of threads for the implicit multi-threading")
+    (options, args) = parser.parse_args()
+
+    create_wide_tree(FNAME, options.nentries, options.nbranches)
+    settings = [
+        ('default', None),
+        ('cache', dict(cache_size=30000000)),
+        ('branches + cache', dict(branches=['var0', 'var1'],
+                                  cache_size=30000000)),
+    ]
+    if options.nthreads:
+        settings.append(('branches + cache + mt',
+                         dict(branches=['var0', 'var1'],
+                              cache_size=30000000,
+                              implicit_mt=options.nthreads)))
+    for name, chain_options in settings:
+        print '{:25} {:10.0f} events/s'.format(name,
+                                                 events_per_second(chain_options))
+    os.remove(FNAME)
@@ -0,0 +1,75 @@
+'''Throughput of the Looper, with and without the reader/worker pipeline.
+
+The sequence has a reader stage building a list of objects for each event,
+like the fcc Reader, and an analysis stage doing some computations
+on these objects.
+The events per second are measured with the single-process Looper,
+and with the pipeline with 1, 4, and 16 worker processes.
+
+Usage:
+  python benchmark_pipeline.py [-n nentries] [-w 1,4,16]
+'''
+
+import os
+import math
+import time
+import shutil
+import tempfile
+
+import heppy.framework.config as cfg
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.looper import Looper
+from heppy.framework.chain import Chain as Events
+from heppy.utils.testtree import create_tree
+
+class Decoder(Analyzer):
+    '''Builds 100 objects per event from the input.'''
+    def process(self, event):
+        var1 = event.input.var1
+        event.objects = [(var1 + i, math.sqrt(var1 + i)) for i in range(100)]
+
+
+class Analysis(Analyzer):
+    '''Computes a quantity for all pairs of objects.'''
+    def process(self, event):
+        objects = event.objects
+        event.result = sum(math.atan2(o1[1], o2[0])
+                           for o1 in objects for o2 in objects)
+
+
+def events_per_second(outdir, config, nworkers):
+    name = '/'.join([outdir, 'workers{}'.format(nworkers)])
+    looper = Looper(name, config, quiet=True, nWorkers=nworkers)
+    start = time.time()
+    looper.loop()
+    looper.write()
+    return looper.nEvProcessed / (time.time() - start)
+
+
+if __name__ == '__main__':
+
+    from optparse import OptionParser
+    parser = OptionParser(usage=__doc__)
+    parser.add_option("-n", "--nentries", dest="nentries", type="int",
+                      default=2000, help="number of entries")
+    parser.add_option("-w", "--workers", dest="workers",
+                      default='1,4,16',
+                      help="comma-separated numbers of worker processes")
+    (options, args) = parser.parse_args()
+
+    outdir = tempfile.mkdtemp()
+    fname = create_tree('/'.join([outdir, 'benchmark_pipeline.root']),
+                        options.nentries)
+    comp = cfg.Component('benchmark', files=[fname])
+    config = cfg.Config(components=[comp],
+                        sequence=cfg.Sequence([cfg.Analyzer(Decoder),
+                                               cfg.Analyzer(Analysis)]),
+                        services=[],
+                        events_class=Events)
+    print '{:20} {:10.0f} events/s'.format(
+        'single process', events_per_second(outdir, config, 0))
+    for nworkers in map(int, options.workers.split(',')):
+        print '{:20} {:10.0f} events/s'.format(
+            '{} workers'.format(nworkers),
+            events_per_second(outdir, config, nworkers))
+    shutil.rmtree(outdir)
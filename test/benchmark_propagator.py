@@ -0,0 +1,81 @@
+'''Time taken to propagate particles to all the cylinders of the CMS
+detector, as a function of the number of particles, with propagate_one
+called for each particle and cylinder, and with a BatchPropagator.
+
+The particles are charged and neutral pions with random momenta and
+vertices. The batch time includes making the points of all particles
+on all cylinders, which are checked to be the same.
+
+Usage:
+  python benchmark_propagator.py [nparticles ...]
+'''
+
+import time
+import math
+
+import heppy.statistics.rrandom as random
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.pfobjects import Particle
+from heppy.papas.propagator import propagator, BatchPropagator
+from heppy.papas.vectors import LorentzVector, Point
+
+def make_particles(nparticles):
+    '''Returns the charges, momenta, and vertices of nparticles pions'''
+    charges, momenta, vertices = [], [], []
+    for i in range(nparticles):
+        momentum = LorentzVector()
+        momentum.SetPtEtaPhiM(random.uniform(0.3, 20.),
+                              random.uniform(-3., 3.),
+                              random.uniform(-math.pi, math.pi),
+                              0.14)
+        charges.append(random.choice([-1, 0, 1]))
+        momenta.append((momentum.Px(), momentum.Py(),
+                        momentum.Pz(), momentum.E()))
+        vertices.append((random.gauss(0, 1e-4), random.gauss(0, 1e-4),
+                         random.gauss(0, 1e-2)))
+    return charges, momenta, vertices
+
+def particles(charges, momenta, vertices):
+    return [Particle(LorentzVector(*momentum), Point(*vertex), charge)
+            for charge, momentum, vertex in zip(charges, momenta, vertices)]
+
+def propagate_one(detector, inputs):
+    '''Returns the time taken by propagate_one, and the particles'''
+    ptcs = particles(*inputs)
+    field = detector.elements['field'].magnitude
+    start = time.time()
+    for ptc in ptcs:
+        for cylinder in detector.cylinders():
+            propagator(ptc.q()).propagate_one(ptc, cylinder, field)
+    return time.time() - start, ptcs
+
+def propagate_batch(detector, inputs):
+    '''Returns the time taken by the BatchPropagator, and the particles'''
+    ptcs = particles(*inputs)
+    start = time.time()
+    batch = BatchPropagator(inputs[0], inputs[1], inputs[2],
+                            detector.cylinders(),
+                            detector.elements['field'].magnitude)
+    for i, ptc in enumerate(ptcs):
+        for cylinder in detector.cylinders():
+            batch.propagate_one(i, ptc, cylinder)
+    return time.time() - start, ptcs
+
+
+if __name__ == '__main__':
+
+    import sys
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 10000]
+
+    random.seed(0xdeadbeef)
+    detector = CMS()
+    print '{:>10} {:>10} {:>10}'.format('particles', 'one (s)', 'batch (s)')
+    for nparticles in sizes:
+        inputs = make_particles(nparticles)
+        one_time, ref_ptcs = propagate_one(detector, inputs)
+        batch_time, ptcs = propagate_batch(detector, inputs)
+        for ptc, ref_ptc in zip(ptcs, ref_ptcs):
+            assert ptc.points.keys() == ref_ptc.points.keys()
+            for name, point in ptc.points.iteritems():
+                assert (point - ref_ptc.points[name]).Mag() < 1e-6
+        print '{:10} {:10.4f} {:10.4f}'.format(nparticles, one_time, batch_time)
@@ -0,0 +1,64 @@
+'''Startup time of heppy processes.
+
+Each python statement is executed in a fresh python process,
+several times, and the best wall-clock time is reported,
+together with the heavy modules that the statement imported.
+
+Usage:
+  python benchmark_startup.py [-n ntimes]
+'''
+
+import sys
+import time
+import subprocess
+
+HEAVY = ['ROOT', 'scipy', 'numpy']
+
+STATEMENTS = [
+    ('python', 'pass'),
+    ('import ROOT', 'import ROOT; ROOT.gROOT'),
+    ('heppy_loop module', 'import heppy.framework.heppy_loop'),
+    ('looper', 'import heppy.framework.looper'),
+    ('config', 'import heppy.framework.config'),
+    ('simple_example_cfg', 'import heppy.test.simple_example_cfg'),
+    ('papas path', 'import heppy.papas.path'),
+]
+
+REPORT = '''
+import sys
+print ' '.join(name for name in {heavy} if name in sys.modules)
+'''
+
+def startup_time(statement, ntimes):
+    '''Returns the best time to run statement in a new python process,
+    and the heavy modules imported.'''
+    code = statement + '\n' + REPORT.format(heavy=HEAVY)
+    best = None
+    for i in range(ntimes):
+        start = time.time()
+        process = subprocess.Popen([sys.executable, '-c', code],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        out, err = process.communicate()
+        elapsed = time.time() - start
+        if process.returncode != 0:
+            return None, err.strip().splitlines()[-1]
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, out.strip()
+
+
+if __name__ == '__main__':
+
+    from optparse import OptionParser
+    parser = OptionParser(usage=__doc__)
+    parser.add_option("-n", "--ntimes", dest="ntimes", type="int",
+                      default=5, help="number of processes for each statement")
+    (options, args) = parser.parse_args()
+
+    for name, statement in STATEMENTS:
+        elapsed, modules = startup_time(statement, options.ntimes)
+        if elapsed is None:
+            print '{:20} failed: {}'.format(name, modules)
+        else:
+            print '{:20} {:8.3f} s   {}'.format(name, elapsed, modules)
@@ -0,0 +1,96 @@
+'''Cost of the disabled debug output of PAPAS and of the analyzers.
+
+1) Cost of a disabled pdebugger.info call, for a message built from an
+object with a PAPAS-like __str__:
+
+* eager: the message is formatted before the call, as was done in PAPAS;
+* lazy: the object is passed as an argument, and only formatted if the
+  output is enabled;
+* guarded: the call is skipped if pdebugger.enabled is False.
+
+2) With a configuration file, events/s of the looper with the pdebug
+output disabled (default), and with the pdebug messages formatted
+but discarded, which was the cost of the disabled output before the
+messages were made lazy.
+
+Usage:
+  python benchmark_tracing.py [-n ncalls] [config_file.py -N nevents]
+'''
+
+import os
+import imp
+import time
+import shutil
+import logging
+import tempfile
+import timeit
+
+from heppy.utils.pdebug import pdebugger
+
+class Cluster(object):
+    '''Same __str__ as the PAPAS clusters.'''
+    def __init__(self):
+        self.energy, self.theta, self.phi = 12.345, 0.4, 1.2
+        self.uniqueid = 1234
+
+    def __str__(self):
+        info = '{energy:7.2f} {theta:5.2f} {phi:5.2f}'.format(
+            energy=self.energy, theta=self.theta, phi=self.phi)
+        return '{classname}: {pretty:6}:{id}: {info}'.format(
+            classname=self.__class__.__name__,
+            pretty='ec1234', id=self.uniqueid, info=info)
+
+STYLES = [
+    ('eager', "pdebugger.info(str('Made {}'.format(cluster)))"),
+    ('lazy', "pdebugger.info('Made %s', cluster)"),
+    ('guarded', "if pdebugger.enabled: pdebugger.info('Made %s', cluster)"),
+]
+
+def call_costs(ncalls):
+    '''Returns the time per call, in ns, for each style.'''
+    setup = 'from __main__ import pdebugger, Cluster; cluster = Cluster()'
+    return [(name, min(timeit.Timer(stmt, setup).repeat(3, ncalls)) / ncalls * 1e9)
+            for name, stmt in STYLES]
+
+
+def events_per_second(cfgname, nevents, formatted):
+    '''Runs the configuration, and returns the events per second.
+    If formatted is True, the pdebug messages are formatted and discarded.'''
+    from heppy.framework.looper import Looper
+    handlers = pdebugger.handlers[:]
+    if formatted:
+        pdebugger.handlers = [logging.NullHandler()]
+        pdebugger.setLevel(logging.INFO)
+    cfg = imp.load_source('benchmark_cfg', cfgname)
+    outdir = tempfile.mkdtemp()
+    config = cfg.config
+    config.components = config.components[:1]
+    looper = Looper('/'.join([outdir, 'looper']), config, nevents, quiet=True)
+    start = time.time()
+    looper.loop()
+    elapsed = time.time() - start
+    looper.write()
+    shutil.rmtree(outdir)
+    pdebugger.setLevel(logging.ERROR)
+    pdebugger.handlers = handlers
+    return looper.nEvProcessed / elapsed
+
+
+if __name__ == '__main__':
+
+    from optparse import OptionParser
+    parser = OptionParser(usage=__doc__)
+    parser.add_option("-n", "--ncalls", dest="ncalls", type="int",
+                      default=100000, help="number of calls")
+    parser.add_option("-N", "--nevents", dest="nevents", type="int",
+                      default=100, help="number of events")
+    (options, args) = parser.parse_args()
+
+    for name, cost in call_costs(options.ncalls):
+        print '{:10} {:8.0f} ns per disabled call'.format(name, cost)
+    if args:
+        cfgname = os.path.abspath(args[0])
+        for formatted in [True, False]:
+            label = 'formatted' if formatted else 'disabled'
+            print '{:10} {:8.1f} events/s'.format(
+                label, events_per_second(cfgname, options.nevents, formatted))
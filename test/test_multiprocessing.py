@@ -53,6 +53,29 @@ class TestMultiProcessing(unittest.TestCase):
         output_root_files = glob.glob(wcard)
         self.assertEqual(len(output_root_files),2)
                 
+    def test_nworkers(self):
+        '''Test the processing of each component by several workers'''
+        from heppy.framework.heppy_loop import create_parser, main
+        parser = create_parser()
+        options, args = parser.parse_args()
+        options.iEvent = None
+        options.nprint = 0
+        options.nworkers = 3
+        cfg = '/'.join( [ context.heppy_path, 
+                          'test/simple_multi_example_cfg.py' ] )
+        main(options, [self.outdir, cfg], parser)
+        # the ranges are merged back in one directory per chunk
+        self.assertEqual(len(glob.glob('/'.join([self.outdir, '*_Range*']))), 0)
+        wcard = '/'.join([self.outdir, 
+                          'test_component_Chunk*',
+                          'heppy.analyzers.examples.simple.SimpleTreeProducer.SimpleTreeProducer_tree/simple_tree.root'
+                          ])
+        output_root_files = glob.glob(wcard)
+        self.assertEqual(len(output_root_files),2)
+        for fname in output_root_files:
+            rootfile = TFile(fname)
+            self.assertEqual(rootfile.Get('tree').GetEntries(), self.nevents)
+                
 ##    def test_heppy_batch(self):
 ##        cmd = ['heppy_batch.py',
 ##               '-o',
@@ -57,6 +57,53 @@ class TestSimpleExample(unittest.TestCase):
         # we skip 10 entries, so we process 190.
         self.assertEqual(loop.nEvProcessed, self.nevents-first)
 
+    def test_batch(self):
+        loop = Looper( self.outdir, config,
+                       nEvents=None,
+                       nPrint=0,
+                       timeReport=True,
+                       batchSize=7)
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, self.nevents)
+        rootfile = TFile('/'.join([loop.analyzers[-1].dirName, 'simple_tree.root']))
+        tree = rootfile.Get('tree')
+        self.assertEqual(tree.GetEntries(), self.nevents)
+        # the input is read again for each event of the batch
+        tree.GetEntry(self.nevents - 1)
+        self.assertEqual(tree.test_variable, self.nevents - 1)
+
+    def test_resume(self):
+        class StopFlag(object):
+            '''stop flag raised after 100 events'''
+            loop = None
+            @property
+            def value(self):
+                return self.loop.nEvProcessed >= 100
+        stopFlag = StopFlag()
+        loop = Looper( self.outdir, config,
+                       nEvents=None,
+                       nPrint=0,
+                       stopFlag=stopFlag,
+                       checkpointInterval=30)
+        stopFlag.loop = loop
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, 100)
+        loop = Looper( self.outdir, config,
+                       nEvents=None,
+                       nPrint=0,
+                       checkpointInterval=30,
+                       resume=True)
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, self.nevents)
+        rootfile = TFile('/'.join([loop.analyzers[-1].dirName, 'simple_tree.root']))
+        tree = rootfile.Get('tree')
+        self.assertEqual(tree.GetEntries(), self.nevents)
+        self.assertEqual([ev.test_variable for ev in tree], range(self.nevents))
+        self.assertRaises(ValueError, Looper, self.outdir, config, resume=True)
+
     def test_process_event(self):
         loop = Looper( self.outdir, config,
                        nEvents=None,
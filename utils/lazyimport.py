@@ -0,0 +1,85 @@
+'''Modules imported when first used.
+
+Importing ROOT, scipy, or loading C++ libraries takes seconds, which is
+paid by every heppy process at startup, even when these modules are never
+used, e.g. by heppy_check or when inspecting a configuration.
+
+The heavy modules are instead accessed through a LazyModule::
+
+  from heppy.utils.lazyimport import ROOT
+
+  def make_vector():
+      return ROOT.TVector3(0, 0, 1)
+
+The module is imported at the first access to one of its attributes.
+The attributes are then cached in the LazyModule, so that accessing
+them is as fast as for a normal module.
+
+preload imports all LazyModules, e.g. in a parent process before forking
+the worker processes, which then start with these modules already loaded.
+heppy_loop preloads ROOT before loading the configuration file, since most
+configurations import ROOT directly, and ROOT must then already be set up.
+'''
+
+import sys
+import importlib
+
+# all lazy modules, for preload
+_lazy_modules = []
+
+class LazyModule(object):
+    '''Module name, imported at the first access to one of its attributes.
+    setup(module) is called just after the import.'''
+
+    def __init__(self, name, setup=None):
+        self.__dict__['_name'] = name
+        self.__dict__['_setup'] = setup
+        self.__dict__['_module'] = None
+        _lazy_modules.append(self)
+
+    def _load(self):
+        if self._module is None:
+            # the command line options are hidden from the module,
+            # which could otherwise parse them (e.g. PyROOT)
+            argv = sys.argv
+            sys.argv = argv[:1]
+            try:
+                module = importlib.import_module(self._name)
+                if self._setup is not None:
+                    self._setup(module)
+            finally:
+                sys.argv = argv
+            self.__dict__['_module'] = module
+        return self._module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return '<lazy module {name}, {state}>'.format(name=self._name,
+                                                      state=state)
+
+
+def preload(names=None):
+    '''Imports the lazy modules with the given names, all of them by default.'''
+    for module in _lazy_modules:
+        if names is None or module._name in names:
+            module._load()
+
+
+# set to False by heppy_loop -i, to get the ROOT graphics
+root_batch = True
+
+def _setup_root(ROOT):
+    # Forbidding PyROOT to hijack the command line options and help system
+    ROOT.PyConfig.IgnoreCommandLineOptions = True
+    ROOT.gROOT.SetBatch(root_batch)
+
+ROOT = LazyModule('ROOT', _setup_root)
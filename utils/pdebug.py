@@ -37,11 +37,32 @@ import sys
        from pdebug import pdebugger
        pdebugger.info("A message")
 
+    the message is only formatted if the output is enabled when it is given
+    as a format string and its arguments:
+       pdebugger.info("Made %s", cluster)
+
+    in the hot paths, the call itself is skipped when the output is disabled
+    by guarding it with the enabled attribute, updated by setLevel:
+       if pdebugger.enabled:
+           pdebugger.info("Made %s", cluster)
+
 '''
 
+class PDebugLogger(logging.Logger):
+    '''Logger with an enabled attribute,
+    True if the info messages are output.'''
+
+    enabled = False
+
+    def setLevel(self, level):
+        logging.Logger.setLevel(self, level)
+        self.enabled = self.isEnabledFor(logging.INFO)
+
 #Note the first use of this header should come from the top level of the program
 #If not the stream output may be missing
+logging.setLoggerClass(PDebugLogger)
 pdebugger = logging.getLogger('pdebug')
+logging.setLoggerClass(logging.Logger)
 pdebugger.setLevel(logging.ERROR)
 pdebugger.propagate = False
 
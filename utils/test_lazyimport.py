@@ -0,0 +1,54 @@
+import unittest
+import sys
+
+from heppy.utils import lazyimport
+from heppy.utils.lazyimport import LazyModule, preload
+
+class LazyImportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.setups = []
+        for name in ['colorsys', 'xml.dom.minicompat']:
+            if name in sys.modules:
+                del sys.modules[name]
+
+    def test_lazy(self):
+        colorsys = LazyModule('colorsys', self.setups.append)
+        self.assertFalse('colorsys' in sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(1., 0., 0.), (0., 1., 1.))
+        self.assertTrue('colorsys' in sys.modules)
+        # the attribute is cached, and the setup done once
+        self.assertTrue('rgb_to_hsv' in colorsys.__dict__)
+        colorsys.hls_to_rgb(0., 0.5, 1.)
+        self.assertEqual(self.setups, [sys.modules['colorsys']])
+
+    def test_argv(self):
+        # the command line options are hidden from the module
+        argv = sys.argv
+        sys.argv = ['heppy', '-b', '10', 'Outdir', 'cfg.py']
+        try:
+            colorsys = LazyModule(
+                'colorsys', lambda module: self.setups.append(sys.argv[:]))
+            colorsys.rgb_to_hsv(1., 0., 0.)
+            self.assertEqual(self.setups, [['heppy']])
+            self.assertEqual(sys.argv, ['heppy', '-b', '10', 'Outdir', 'cfg.py'])
+        finally:
+            sys.argv = argv
+
+    def test_preload(self):
+        # not preloading ROOT
+        lazy_modules = lazyimport._lazy_modules
+        lazyimport._lazy_modules = []
+        try:
+            minicompat = LazyModule('xml.dom.minicompat')
+            self.assertFalse('xml.dom.minicompat' in sys.modules)
+            preload(['colorsys'])
+            self.assertFalse('xml.dom.minicompat' in sys.modules)
+            preload()
+            self.assertTrue('xml.dom.minicompat' in sys.modules)
+        finally:
+            lazyimport._lazy_modules = lazy_modules
+
+
+if __name__ == '__main__':
+    unittest.main()
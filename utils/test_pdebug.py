@@ -15,9 +15,11 @@ class TestPDebug(unittest.TestCase):
         pdebug.pdebugger.info('debug console')
         output = out.getvalue().strip()
         assert output == "error console"
+        assert not pdebug.pdebugger.enabled
 
 
         pdebug.pdebugger.setLevel(logging.INFO)
+        assert pdebug.pdebugger.enabled
         pdebug.pdebugger.error('error console')
         pdebug.pdebugger.info('info console')
         pdebug.pdebugger.debug('debug console')